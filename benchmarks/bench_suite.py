@@ -0,0 +1,316 @@
+"""Benchmark suite for the generation and validation hot paths.
+
+No API quota is used: generation runs against the fake client replaying
+canned records from `benchmarks/fixtures/orders.json`, and the datasets
+for parsing, file I/O and validation are synthesised locally (tiled to
+the requested row counts). Results are written as JSON so runs can be
+compared:
+
+    python benchmarks/bench_suite.py --sizes 1000 100000 1000000
+    python benchmarks/bench_suite.py --baseline benchmarks/results/<earlier>.json
+
+Scenarios:
+    prompt      build the prompt for every eval
+    generate    run every eval through `generate_all` (plain and streamed)
+    parse       decode a JSON response (whole and streamed) and ingest it
+    io          write and read a dataset in each available format
+    validate    run each eval's validator
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_validators import tiled_dataset  # noqa: E402
+from dataset_writer import FORMATS, read_dataset, write_dataset  # noqa: E402
+from fake_client import FakeClient, load_fixtures  # noqa: E402
+from generate_shipments import (  # noqa: E402
+    generate_all,
+    generate_prompt,
+    load_references,
+    parse_response_text,
+)
+from json_stream import ArrayStreamDecoder  # noqa: E402
+from shipment_schema import ingest  # noqa: E402
+from telemetry import Telemetry  # noqa: E402
+from validators import RULES_PATH, build_validators  # noqa: E402
+
+SCENARIOS = ["prompt", "generate", "parse", "io", "validate"]
+DEFAULT_FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures", "orders.json")
+DEFAULT_RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+# Larger inputs are skipped: JSON text grows ~300 bytes per row, the
+# streaming decoder is pure Python, and xlsx is slow well before its
+# million-row limit
+MAX_ROWS = {"parse": 1000000, "json stream": 100000, "xlsx": 10000}
+STREAM_CHUNK = 256
+
+
+def timed(func, repeat):
+    """Runs `func` `repeat` times; returns the wall-clock seconds of each run."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def tile(df, rows):
+    return df.iloc[np.resize(np.arange(len(df)), rows)].reset_index(drop=True)
+
+
+def synthetic_records(fixtures, rows):
+    """`rows` shipment records cycled from the fixtures, with unique IDs."""
+    records = []
+    for i in range(rows):
+        record = dict(fixtures[i % len(fixtures)])
+        record["shipmentId"] = f"SHIP-{i + 1:08d}"
+        records.append(record)
+    return records
+
+
+class Suite:
+    def __init__(self, args):
+        self.args = args
+        self.results = []
+        self.fixtures = load_fixtures(args.fixtures)
+        self.eval_meta = pd.read_csv(os.path.join(ROOT, "references", "Eval_set.csv"))
+
+    def eval_rows(self):
+        for _, row in self.eval_meta.iterrows():
+            yield f"EVAL-{str(row['#']).zfill(3)}", row
+
+    def add(self, scenario, name, rows, times):
+        result = {
+            "scenario": scenario,
+            "name": name,
+            "rows": rows,
+            "best_s": min(times),
+            "mean_s": sum(times) / len(times),
+            "rows_per_s": rows / min(times) if min(times) > 0 else None,
+        }
+        self.results.append(result)
+        rate = f"{result['rows_per_s']:,.0f}" if result["rows_per_s"] else "-"
+        print(f"{scenario:<10}{name:<22}{rows:>10}{min(times):>12.4f}{rate:>16}")
+
+    def prompt(self):
+        refs = load_references()
+        rows = [row for _, row in self.eval_rows()]
+        times = timed(
+            lambda: [generate_prompt(row, refs) for row in rows], self.args.repeat
+        )
+        self.add("prompt", "generate_prompt", len(rows), times)
+
+    def generate(self):
+        refs = load_references()
+        for stream in (False, True):
+            shipments = 0
+            times = []
+            for _ in range(self.args.repeat):
+                telemetry = Telemetry()
+                with tempfile.TemporaryDirectory() as out:
+                    jobs = [
+                        (eval_id, row, os.path.join(out, f"{eval_id}.csv"))
+                        for eval_id, row in self.eval_rows()
+                    ]
+                    llm = FakeClient(
+                        latency=self.args.fake_latency,
+                        jitter=self.args.fake_latency / 2,
+                        error_rate=self.args.fake_error_rate,
+                        fixtures=self.fixtures,
+                    )
+                    start = time.perf_counter()
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        asyncio.run(
+                            generate_all(
+                                jobs,
+                                refs,
+                                llm,
+                                concurrency=self.args.concurrency,
+                                rpm=0,
+                                tpm=0,
+                                stream=stream,
+                                telemetry=telemetry,
+                            )
+                        )
+                    times.append(time.perf_counter() - start)
+                shipments = sum(
+                    e["shipments"] for e in telemetry.events if e["event"] == "request"
+                )
+            name = "generate_all --stream" if stream else "generate_all"
+            self.add("generate", name, shipments, times)
+
+    def parse(self, rows):
+        if rows > MAX_ROWS["parse"]:
+            return
+        text = json.dumps(synthetic_records(self.fixtures, rows))
+        data = parse_response_text(text)
+        self.add("parse", "json", rows, timed(lambda: parse_response_text(text), 1))
+
+        def stream():
+            decoder = ArrayStreamDecoder()
+            for i in range(0, len(text), STREAM_CHUNK):
+                for _ in decoder.feed(text[i : i + STREAM_CHUNK]):
+                    pass
+            decoder.close()
+
+        if rows <= MAX_ROWS["json stream"]:
+            self.add("parse", "json stream", rows, timed(stream, 1))
+        self.add("parse", "ingest", rows, timed(lambda: ingest(data), 1))
+
+    def io(self, rows):
+        df = tile(ingest(self.fixtures)[0], rows)
+        with tempfile.TemporaryDirectory() as out:
+            for fmt, ext in FORMATS.items():
+                if rows > MAX_ROWS.get(fmt, rows):
+                    continue
+                path = os.path.join(out, f"bench{ext}")
+                try:
+                    times = timed(lambda: write_dataset(df, path), self.args.repeat)
+                except ImportError:  # parquet/feather without pyarrow
+                    continue
+                self.add("io", f"write {fmt}", rows, times)
+                times = timed(lambda: read_dataset(path), self.args.repeat)
+                self.add("io", f"read {fmt}", rows, times)
+
+    def validate(self, rows):
+        validators = build_validators(os.path.join(ROOT, RULES_PATH))
+        for eval_id, row in self.eval_rows():
+            df = tiled_dataset(row["User Prompt"], rows)
+            func = validators[eval_id]
+            self.add(
+                "validate", eval_id, rows, timed(lambda: func(df), self.args.repeat)
+            )
+
+    def run(self):
+        print(f"{'scenario':<10}{'name':<22}{'rows':>10}{'best (s)':>12}{'rows/s':>16}")
+        for scenario in self.args.scenarios:
+            if scenario in ("prompt", "generate"):
+                getattr(self, scenario)()
+                continue
+            for rows in self.args.sizes:
+                getattr(self, scenario)(rows)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(args):
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "pyarrow": importlib.util.find_spec("pyarrow") is not None,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": {k: v for k, v in vars(args).items() if k != "baseline"},
+    }
+
+
+def compare(baseline, current, tolerance):
+    """Prints best-time ratios against `baseline`; returns the regressed keys.
+
+    Results are matched on (scenario, name, rows). A result regresses when
+    it is more than `tolerance` (a fraction) slower than the baseline.
+    """
+    key = lambda r: (r["scenario"], r["name"], r["rows"])  # noqa: E731
+    before = {key(r): r for r in baseline["results"]}
+    regressions = []
+    print(
+        f"\nCompared with {baseline['meta'].get('git') or 'baseline'} "
+        f"({baseline['meta']['created']})"
+    )
+    print(
+        f"{'scenario':<10}{'name':<22}{'rows':>10}{'before':>10}{'after':>10}{'ratio':>8}"
+    )
+    for r in current["results"]:
+        old = before.get(key(r))
+        if old is None:
+            continue
+        ratio = r["best_s"] / old["best_s"] if old["best_s"] > 0 else float("inf")
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressions.append(key(r))
+        print(
+            f"{r['scenario']:<10}{r['name']:<22}{r['rows']:>10}"
+            f"{old['best_s']:>10.4f}{r['best_s']:>10.4f}{ratio:>8.2f}{flag}"
+        )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1000, 100000],
+        help="Synthetic dataset sizes, e.g. 1000 100000 1000000 10000000",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument("--fake-latency", type=float, default=0.05)
+    parser.add_argument("--fake-error-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--output", help="Results file (default: benchmarks/results/<timestamp>.json)"
+    )
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Slowdown (fraction) beyond which a result counts as a regression",
+    )
+    args = parser.parse_args(argv)
+
+    suite = Suite(args)
+    suite.run()
+    current = {"meta": metadata(args), "results": suite.results}
+    output = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"bench-{time.strftime('%Y%m%dT%H%M%S')}.json"
+    )
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(current, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(baseline, current, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Throughput benchmark for the validators in validators.py.
+
+Each eval's dataset is produced by the local constraint solver, typed with
+the shipment schema (as `read_dataset` returns it) and tiled to the
+requested row counts, then validated several times.
+
+    python benchmarks/bench_validators.py --sizes 1000 100000 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from validators import RULES_PATH, build_validators  # noqa: E402
+from constraint_solver import parse_spec, solve  # noqa: E402
+from shipment_schema import coerce  # noqa: E402
+
+
+def tiled_dataset(prompt, rows):
+    df, _ = solve(parse_spec(prompt))
+    df = coerce(df)
+    return df.iloc[np.resize(np.arange(len(df)), rows)].reset_index(drop=True)
+
+
+def bench(func, df, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(df)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    eval_meta = pd.read_csv(os.path.join(ROOT, "references", "Eval_set.csv"))
+    validators = build_validators(os.path.join(ROOT, RULES_PATH))
+    print(f"{'eval':<10}{'rows':>10}{'best (s)':>12}{'rows/s':>14}")
+    for _, row in eval_meta.iterrows():
+        eval_id = f"EVAL-{str(row['#']).zfill(3)}"
+        func = validators[eval_id]
+        for rows in args.sizes:
+            df = tiled_dataset(row["User Prompt"], rows)
+            seconds = bench(func, df, args.repeat)
+            print(f"{eval_id:<10}{rows:>10}{seconds:>12.4f}{rows / seconds:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
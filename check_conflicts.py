@@ -0,0 +1,120 @@
+"""List pickups that overbook their origin's dock doors or opening hours.
+
+    python check_conflicts.py [DATASET ...] [--limit N] [--output pairs.csv]
+
+Without DATASET arguments every dataset in generated_data/ is checked.
+"""
+
+import argparse
+import os
+
+from dataset_paths import FORMATS
+
+OUTPUT_DIR = "generated_data"
+COLUMNS = [
+    "shipmentId",
+    "shipFromLocationCode",
+    "pickupFromDateTime",
+    "pickupToDateTime",
+]
+
+
+def generated_datasets(output_dir=OUTPUT_DIR):
+    if not os.path.isdir(output_dir):
+        return []
+    return [
+        os.path.join(output_dir, name)
+        for name in sorted(os.listdir(output_dir))
+        if os.path.splitext(name)[1] in FORMATS.values() and ".partial" not in name
+    ]
+
+
+def pickup_conflicts(df, limit=None):
+    """Dock conflicts between a dataset's pickups, and pickups outside opening hours.
+
+    Returns (pairs, late, outside): `pairs` has a row for each pickup that
+    found every dock door at its origin taken and each pickup already
+    holding one (`heldBy*` columns), up to `limit`; `late` counts pickups
+    without a free dock door and `outside` those that do not fit their
+    origin's operating hours.
+    """
+    import pandas as pd
+
+    from reference_catalog import load_catalog
+    from window_conflicts import conflict_pairs, outside_hours, over_capacity
+
+    catalog = load_catalog()
+    positions = catalog.positions("origins", df["shipFromLocationCode"])
+    capacity = catalog.field("origins", "dock_doors", positions).to_numpy(float)
+    hours = catalog.field("origins", "operating_hours", positions)
+    start, end = df["pickupFromDateTime"], df["pickupToDateTime"]
+    origin = df["shipFromLocationCode"]
+    late = int(over_capacity(start, end, origin, capacity).sum())
+    pairs = conflict_pairs(start, end, origin, capacity, limit=limit)
+    rows = df[COLUMNS].reset_index(drop=True)
+    held = rows.iloc[pairs["first"]].reset_index(drop=True)
+    report = pd.concat(
+        [
+            rows.iloc[pairs["second"]].reset_index(drop=True),
+            held[["shipmentId", "pickupFromDateTime", "pickupToDateTime"]]
+            .rename(columns=lambda c: "heldBy" + c[0].upper() + c[1:])
+            .reset_index(drop=True),
+        ],
+        axis=1,
+    )
+    return report, late, int(outside_hours(start, end, hours).sum())
+
+
+def add_arguments(parser):
+    parser.add_argument(
+        "datasets", nargs="*", help=f"Datasets to check (default: all in {OUTPUT_DIR}/)"
+    )
+    parser.add_argument(
+        "--limit", type=int, default=10, help="Conflicting pairs printed per dataset"
+    )
+    parser.add_argument("--output", help="Write every conflicting pair to this CSV")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    run(parse_args(argv))
+
+
+def run(args):
+    import pandas as pd
+
+    from dataset_writer import read_dataset
+
+    paths = args.datasets or generated_datasets()
+    if not paths:
+        print(f"No datasets in {OUTPUT_DIR}/")
+        return
+    reports = []
+    for path in paths:
+        df = read_dataset(path, columns=COLUMNS)
+        limit = None if args.output else args.limit
+        pairs, late, outside = pickup_conflicts(df, limit=limit)
+        print(
+            f"{os.path.basename(path)}: {len(df)} pickups, {late} without a free "
+            f"dock door, {outside} outside operating hours"
+        )
+        for row in pairs.head(args.limit).itertuples(index=False):
+            print(
+                f"  {row.shipmentId} at {row.shipFromLocationCode} "
+                f"{row.pickupFromDateTime:%Y-%m-%d %H:%M}-{row.pickupToDateTime:%H:%M} "
+                f"overlaps {row.heldByShipmentId} "
+                f"({row.heldByPickupFromDateTime:%H:%M}-{row.heldByPickupToDateTime:%H:%M})"
+            )
+        reports.append(pairs.assign(dataset=os.path.basename(path)))
+    if args.output:
+        pd.concat(reports).to_csv(args.output, index=False)
+        print(f"Conflicting pairs saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
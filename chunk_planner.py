@@ -0,0 +1,273 @@
+import re
+import statistics
+
+DEFAULT_CHUNK_SIZE = 100
+
+COUNT_RE = re.compile(r"\b(\d[\d,]*)(\s+shipments)\b", re.IGNORECASE)
+DIVISIBLE_RE = re.compile(r"divisible by (\d+)", re.IGNORECASE)
+PER_DAY_RE = re.compile(r"exactly (\d+) shipments per day", re.IGNORECASE)
+DAYS_RE = re.compile(r"over (\d+) days", re.IGNORECASE)
+# "The mean weight should be 6000 pounds with standard deviation of 1200 pounds."
+SPREAD_RE = re.compile(
+    r"(?:(?<=\.)\s+|^)[^.]*\b(?:mean weight|standard deviation)\b[^.]*\.",
+    re.IGNORECASE,
+)
+# "from Atlanta to Miami." / "from Houston to various Texas cities over 7 days"
+ROUTE_RE = re.compile(
+    r"from ([A-Z][\w ]+?) to ([A-Z]?[\w ]+?)(?:\.| over)", re.IGNORECASE
+)
+
+_TOTAL_TAIL = (
+    r"(?: across all shipments)?(?:\s+(?:should|must))?(?:\s+be)?(?:\s+exactly)?\s+"
+)
+
+
+def _total_pattern(subject):
+    # The number must not continue as a decimal or ratio ("1.8", "1:60")
+    return re.compile(
+        rf"({subject}{_TOTAL_TAIL})(\d[\d,]*)(?![\d,]|\.\d|:)", re.IGNORECASE
+    )
+
+
+# (field, pattern) for aggregate targets that must be split across chunks
+TOTAL_PATTERNS = [
+    ("totalWeightLbs", _total_pattern(r"total (?:aggregate )?weight")),
+    ("totalCaseCount", _total_pattern(r"total cases")),
+    ("totalPalletCount", _total_pattern(r"total pallets")),
+    ("totalVolumeCuFt", _total_pattern(r"total volume")),
+]
+
+
+def _to_int(text):
+    return int(text.replace(",", ""))
+
+
+def requested_count(prompt):
+    """Number of shipments a prompt asks for, or None."""
+    match = COUNT_RE.search(prompt)
+    return _to_int(match.group(1)) if match else None
+
+
+def allocate(total, sizes, step=1):
+    """Splits `total` across chunks proportionally to `sizes` (largest remainder).
+
+    Each share is a multiple of `step` when `total` is; any remainder goes to
+    the last chunk. Shares always sum to `total`.
+    """
+    units, leftover = divmod(total, step)
+    weight = sum(sizes)
+    raw = [units * size / weight for size in sizes]
+    shares = [int(r) for r in raw]
+    by_fraction = sorted(
+        range(len(sizes)), key=lambda i: raw[i] - shares[i], reverse=True
+    )
+    for i in by_fraction[: units - sum(shares)]:
+        shares[i] += 1
+    shares = [s * step for s in shares]
+    shares[-1] += leftover
+    return shares
+
+
+def _number(value):
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class ChunkPlan:
+    """Splits a large generation request into chunk prompts.
+
+    Aggregate targets (total weight, cases, pallets, volume) are allocated to
+    chunks up front so the merged dataset still meets them, respecting any
+    "divisible by" granularity. When the prompt groups shipments per day,
+    chunk boundaries are aligned to whole days. Each chunk prompt is the
+    original with the count and totals replaced by the chunk's share.
+
+    Constraints on how weights are distributed are split too. When no two
+    shipments may share a weight, the weights are chosen up front (distinct,
+    with the requested total and spread) and each chunk gets its own
+    disjoint share of them. When daily totals must increase, each chunk
+    gets a band of daily totals above the previous chunk's. Merged records
+    are fed to `add`, and `check` reports what the merged dataset misses.
+    """
+
+    def __init__(self, prompt, chunk_size=DEFAULT_CHUNK_SIZE):
+        # Imported here as the solver imports this module's patterns
+        from constraint_solver import parse_spec
+
+        self.prompt = prompt
+        self.total = requested_count(prompt) or 0
+        self.targets = {}
+        for field, pattern in TOTAL_PATTERNS:
+            match = pattern.search(prompt)
+            if match:
+                self.targets[field] = _to_int(match.group(2))
+
+        per_day = PER_DAY_RE.search(prompt)
+        self.per_day = int(per_day.group(1)) if per_day else None
+        if self.per_day:
+            # Never split a day's shipments across chunks
+            chunk_size = max(self.per_day, chunk_size - chunk_size % self.per_day)
+        self.chunk_size = chunk_size
+
+        divisible = DIVISIBLE_RE.search(prompt)
+        step = int(divisible.group(1)) if divisible else 1
+
+        spec = parse_spec(prompt) or {"weight": {}}
+        self.unique = bool(spec["weight"].get("unique"))
+        self.std = spec["weight"].get("std")
+        self.increasing = bool(spec.get("days", {}).get("increasing_totals"))
+
+        sizes = [
+            min(chunk_size, self.total - start)
+            for start in range(0, self.total, chunk_size)
+        ]
+        shares = {
+            field: allocate(total, sizes, step if field == "totalWeightLbs" else 1)
+            for field, total in self.targets.items()
+        }
+        pools = self._weight_pools(spec, sizes, step) if self.unique else None
+        if pools and "totalWeightLbs" in shares:
+            shares["totalWeightLbs"] = [sum(pool) for pool in pools]
+        bands = self._day_bands(spec, sizes) if self.increasing else None
+
+        self.chunks = []
+        offset = 0
+        for index, size in enumerate(sizes):
+            chunk = {
+                "index": index,
+                "offset": offset,
+                "count": size,
+                "targets": {field: shares[field][index] for field in self.targets},
+                "weights": pools[index] if pools else None,
+                "day_band": bands[index] if bands else None,
+            }
+            chunk["prompt"] = self._chunk_prompt(chunk, len(sizes))
+            self.chunks.append(chunk)
+            offset += size
+
+        self.sums = {field: 0 for field in self.targets}
+        self.weights = []
+        self.daily = {}
+
+    @property
+    def is_chunked(self):
+        return len(self.chunks) > 1
+
+    def _weight_pools(self, spec, sizes, step):
+        """Disjoint lists of distinct weights, one per chunk."""
+        from constraint_solver import DEFAULT_WEIGHT_RANGE, spread_unique
+
+        weight = spec["weight"]
+        total = weight.get(
+            "total", weight["mean"] * self.total if "mean" in weight else None
+        )
+        if total is not None:
+            values = spread_unique(total, self.total, step, self.std).tolist()
+        else:
+            lo = weight.get("min", DEFAULT_WEIGHT_RANGE[0])
+            hi = weight.get("max", DEFAULT_WEIGHT_RANGE[1])
+            first = -(-lo // step) * step
+            gap = max(1, (hi - first) // step // max(1, self.total - 1)) * step
+            values = [first + i * gap for i in range(self.total)]
+        # Deal the sorted values so each chunk's share spans the whole range
+        order = sorted(
+            ((j + 0.5) / size, index)
+            for index, size in enumerate(sizes)
+            for j in range(size)
+        )
+        pools = [[] for _ in sizes]
+        for value, (_, index) in zip(sorted(values), order):
+            pools[index].append(value)
+        return pools
+
+    def _day_bands(self, spec, sizes):
+        """(low, high) daily total weight per chunk, rising chunk by chunk, or None."""
+        days = spec["days"]
+        if len(days["categories"]) != days["per_day"]:
+            return None
+        lo = sum(low for low, _ in days["categories"])
+        hi = sum(high for _, high in days["categories"])
+        n_days = days["count"]
+        edges = [lo + (hi - lo) * day // n_days for day in range(n_days + 1)]
+        bands = []
+        first = 0
+        for size in sizes:
+            last = min(n_days, first + size // self.per_day)
+            bands.append((edges[first], hi if last == n_days else edges[last] - 1))
+            first = last
+        return bands
+
+    def _chunk_prompt(self, chunk, n_chunks):
+        index, offset, size = chunk["index"], chunk["offset"], chunk["count"]
+        targets = chunk["targets"]
+        text = COUNT_RE.sub(lambda m: f"{size}{m.group(2)}", self.prompt, count=1)
+        for field, pattern in TOTAL_PATTERNS:
+            if field in targets:
+                text = pattern.sub(
+                    lambda m: f"{m.group(1)}{targets[field]}", text, count=1
+                )
+        note = (
+            f" (This is chunk {index + 1} of {n_chunks} of a {self.total}-shipment "
+            f"dataset; the shipment count and totals above apply to this chunk only.)"
+        )
+        if chunk["weights"]:
+            # The chunk's weights are fixed, and their mean and spread with them
+            text = SPREAD_RE.sub("", text).lstrip()
+            note += (
+                " Weights must not repeat anywhere in the dataset, so give this "
+                "chunk's shipments exactly these weights, each used once: "
+                f"{', '.join(map(str, chunk['weights']))} lbs."
+            )
+        if self.per_day:
+            first_day = offset // self.per_day + 1
+            last_day = (offset + size) // self.per_day
+            days = DAYS_RE.search(self.prompt)
+            of_days = f" of the {days.group(1)}-day period" if days else ""
+            note += f" This chunk covers days {first_day}-{last_day}{of_days} only."
+        if chunk["day_band"]:
+            low, high = chunk["day_band"]
+            note += (
+                " Daily totals must keep increasing across chunks, so every daily "
+                f"total weight in this chunk must be between {low} and {high} lbs, "
+                "still strictly increasing day by day."
+            )
+        return text + note
+
+    def shipment_id(self, position):
+        """Globally unique ID for the record at `position` in the merged dataset."""
+        width = max(4, len(str(self.total)))
+        return f"SHIP-{position + 1:0{width}d}"
+
+    def add(self, record):
+        """Tallies a merged record for `check`."""
+        for field in self.sums:
+            self.sums[field] += _number(record.get(field))
+        weight = _number(record.get("totalWeightLbs"))
+        if self.unique or self.std:
+            self.weights.append(weight)
+        if self.increasing:
+            day = str(record.get("pickupFromDateTime") or "")[:10]
+            self.daily[day] = self.daily.get(day, 0) + weight
+
+    def check(self, rows):
+        """Returns findings for the merged dataset: count, totals and distribution."""
+        findings = []
+        if rows != self.total:
+            findings.append(f"Expected {self.total} shipments, merged {rows}")
+        for field, target in self.targets.items():
+            if self.sums[field] != target:
+                findings.append(f"{field} total {self.sums[field]} != {target}")
+        repeated = len(self.weights) - len(set(self.weights))
+        if self.unique and repeated:
+            findings.append(f"{repeated} shipments repeat another's totalWeightLbs")
+        if self.std and self.weights:
+            actual = statistics.pstdev(self.weights)
+            if abs(actual - self.std) > self.std * 0.1:
+                findings.append(f"totalWeightLbs std dev {actual:.0f} != {self.std}")
+        totals = [self.daily[day] for day in sorted(self.daily)]
+        drops = sum(1 for before, after in zip(totals, totals[1:]) if after <= before)
+        if drops:
+            findings.append(f"Daily totalWeightLbs fails to increase on {drops} days")
+        return findings
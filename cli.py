@@ -0,0 +1,49 @@
+"""Shipment generator command line.
+
+    python cli.py generate [--fake] [--stream] ...
+    python cli.py validate [--workers N] ...
+    python cli.py report
+    python cli.py ingest orders.json
+    python cli.py conflicts [DATASET ...]
+
+Each subcommand takes the same options as the script it wraps
+(generate_shipments.py, run_validations.py, report.py, order_ingest.py,
+check_conflicts.py).
+Those modules keep their heavy imports inside the functions that need them,
+so building the parsers here is cheap.
+"""
+
+import argparse
+
+import check_conflicts
+import generate_shipments
+import order_ingest
+import report
+import run_validations
+
+COMMANDS = {
+    "generate": (generate_shipments, "Generate synthetic shipment datasets."),
+    "validate": (run_validations, "Validate generated datasets."),
+    "report": (report, "Summarise the last generation and validation runs."),
+    "ingest": (order_ingest, "Convert customer orders into a shipment dataset."),
+    "conflicts": (check_conflicts, "List pickups that overbook their origin's docks."),
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, (module, description) in COMMANDS.items():
+        sub = commands.add_parser(name, help=description, description=description)
+        module.add_arguments(sub)
+        sub.set_defaults(run=module.run)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,503 @@
+import re
+import numpy as np
+import pandas as pd
+
+from chunk_planner import DIVISIBLE_RE, ROUTE_RE, TOTAL_PATTERNS, requested_count
+from geo_index import GeoIndex, min_transit_hours
+from window_conflicts import plan_windows
+
+MONTHS = {
+    name: i + 1
+    for i, name in enumerate(
+        [
+            "january", "february", "march", "april", "may", "june", "july",
+            "august", "september", "october", "november", "december",
+        ]
+    )
+}  # fmt: skip
+
+DEFAULT_START = "2026-03-01"
+DEFAULT_WEIGHT_RANGE = (3000, 8000)
+DEFAULT_PALLET_RANGE = (10, 26)
+DEFAULT_CASES_PER_PALLET = 60
+DEFAULT_LBS_PER_CUFT = 1.8
+PICKUP_HOURS = 2
+DELIVERY_HOURS = 2
+
+_NUM = r"(\d[\d,]*)"
+
+
+def _int(text):
+    return int(text.replace(",", ""))
+
+
+def _search(pattern, text):
+    return re.search(pattern, text, re.IGNORECASE)
+
+
+def _date(month, day, year):
+    return np.datetime64(f"{int(year):04d}-{MONTHS[month.lower()]:02d}-{int(day):02d}")
+
+
+def _hour(text):
+    hour, meridiem = text.split()
+    hour = int(hour) % 12
+    return hour + 12 if meridiem.upper() == "PM" else hour
+
+
+def parse_spec(prompt):
+    """Extracts a structured constraint spec from an eval prompt.
+
+    Returns a dict of per-field constraints, or None if the prompt does not
+    state a shipment count. Unrecognised wording is simply left out, so the
+    solver falls back to defaults for those fields.
+    """
+    count = requested_count(prompt)
+    if not count:
+        return None
+    spec = {"count": count, "weight": {}, "volume": {}, "pallets": {}, "cases": {}}
+    weight, volume, pallets, cases = (
+        spec["weight"], spec["volume"], spec["pallets"], spec["cases"]
+    )  # fmt: skip
+
+    route = ROUTE_RE.search(prompt)
+    if route:
+        spec["origin"], spec["destination"] = route.group(1), route.group(2)
+
+    # Daily categorical distribution (e.g. "Light 2000-3000 lbs Medium 4000-5000 lbs")
+    days = _search(r"over (\d+) days (\w+) (\d+)-(\d+) (\d{4})", prompt)
+    per_day = _search(r"exactly (\d+) shipments per day", prompt)
+    if days and per_day:
+        categories = re.findall(r"([A-Z]\w+) (\d+)-(\d+) lbs", prompt)
+        spec["days"] = {
+            "count": int(days.group(1)),
+            "start": str(_date(days.group(2), days.group(3), days.group(5))),
+            "per_day": int(per_day.group(1)),
+            "categories": [(int(lo), int(hi)) for _, lo, hi in categories],
+            "increasing_totals": bool(_search(r"strictly increasing", prompt)),
+        }
+
+    m = _search(r"weigh exactly " + _NUM, prompt) or _search(
+        r"weight " + _NUM + r" lbs", prompt
+    )
+    if m:
+        weight["exact"] = _int(m.group(1))
+    elif "days" not in spec:
+        m = _search(_NUM + r"\s*(?:and|-)\s*" + _NUM + r"\s*(?:pounds|lbs)", prompt)
+        if m:
+            weight["min"], weight["max"] = _int(m.group(1)), _int(m.group(2))
+    for field, pattern in TOTAL_PATTERNS:
+        m = pattern.search(prompt)
+        if m:
+            key = {"totalWeightLbs": weight, "totalVolumeCuFt": volume,
+                   "totalPalletCount": pallets, "totalCaseCount": cases}[field]  # fmt: skip
+            key["total"] = _int(m.group(2))
+    m = DIVISIBLE_RE.search(prompt)
+    if m:
+        weight["step"] = int(m.group(1))
+    if _search(r"no two shipments .*same weight", prompt):
+        weight["unique"] = True
+    m = _search(r"mean weight should be " + _NUM, prompt)
+    if m:
+        weight["mean"] = _int(m.group(1))
+    m = _search(r"standard deviation of " + _NUM, prompt)
+    if m:
+        weight["std"] = _int(m.group(1))
+    if _search(r"arithmetic sequence", prompt):
+        weight["arithmetic"] = True
+
+    m = _search(r"volume " + _NUM + r"-" + _NUM, prompt)
+    if m:
+        volume["min"], volume["max"] = _int(m.group(1)), _int(m.group(2))
+    m = _search(r"volume " + _NUM + r" cu", prompt)
+    if m:
+        volume["exact"] = _int(m.group(1))
+    m = _search(r"total weight to total volume must be ([\d.]+)", prompt)
+    if m:
+        spec["lbs_per_cuft"] = float(m.group(1))
+
+    m = _search(r"pallet counts must be:?\s*((?:\d+\s+)+)", prompt)
+    if m:
+        pallets["pattern"] = [int(p) for p in m.group(1).split()]
+    m = _search(r"\b(\d+)-(\d+) pallets", prompt)
+    if m:
+        pallets["min"], pallets["max"] = int(m.group(1)), int(m.group(2))
+    m = _search(r"\b(\d+) pallets", prompt)
+    if m and "min" not in pallets:
+        pallets["exact"] = int(m.group(1))
+    m = _search(r"average pallets per shipment should be (\d+)", prompt)
+    if m:
+        pallets["mean"] = int(m.group(1))
+
+    m = _search(r"\b(\d+)-(\d+) cases", prompt)
+    if m:
+        cases["min"], cases["max"] = int(m.group(1)), int(m.group(2))
+    m = _search(r"\b(\d+) cases", prompt)
+    if m and "min" not in cases:
+        cases["exact"] = int(m.group(1))
+    m = _search(r"pallets to total cases must be exactly 1:(\d+)", prompt)
+    if m:
+        cases["per_pallet"] = int(m.group(1))
+    if _search(r"cases per pallet must be inversely proportional", prompt):
+        cases["inverse_per_pallet"] = True
+    if _search(r"weight proportional to total cases", prompt):
+        weight["follows_cases"] = True
+
+    m = _search(r"(\d+)-hour delivery window", prompt)
+    if m:
+        window = {"hours": int(m.group(1))}
+        window["no_overlap"] = bool(_search(r"can overlap|non-overlapping", prompt))
+        m = _search(r"between (\w+) (\d+)\w* and (\w+) (\d+)\w* (\d{4})", prompt)
+        if m:
+            window["start"] = str(_date(m.group(1), m.group(2), m.group(5)))
+            window["end"] = str(_date(m.group(3), m.group(4), m.group(5)))
+        m = _search(r"start at these times:?(.*?)\.", prompt)
+        if m:
+            window["start_hours"] = [
+                _hour(t) for t in re.findall(r"\d+ [AP]M", m.group(1))
+            ]
+        spec["delivery_window"] = window
+    return spec
+
+
+class Infeasible(ValueError):
+    """A constraint that cannot be met; the solver keeps the closest values."""
+
+
+def fixed_sum(total, n, lo, hi, rng, step=1):
+    """n integers in [lo, hi], multiples of `step`, summing exactly to `total`."""
+    units = total // step
+    values = np.full(n, units // n, dtype=np.int64)
+    values[: units % n] += 1
+    values *= step
+    values[-1] += total - units * step
+    # Zero-sum jitter on disjoint pairs keeps the total and the bounds
+    slack = int(min(hi - values.max(), values.min() - lo) // step)
+    if slack > 0 and n > 1:
+        pairs = n // 2
+        delta = rng.integers(0, slack + 1, size=pairs) * step
+        values[0 : 2 * pairs : 2] += delta
+        values[1 : 2 * pairs : 2] -= delta
+    return values
+
+
+def arithmetic_sequence(total, n, lo, hi):
+    """n integers in [lo, hi] with constant sorted differences summing to `total`."""
+    span = n * (n - 1) // 2
+    for d in range((hi - lo) // max(n - 1, 1), -1, -1):
+        first, rem = divmod(total - d * span, n)
+        if rem == 0 and first >= lo and first + d * (n - 1) <= hi:
+            return first + d * np.arange(n, dtype=np.int64)
+    raise Infeasible(
+        f"No arithmetic sequence of {n} values in [{lo}, {hi}] sums to {total}"
+    )
+
+
+def spread_unique(total, n, step, std):
+    """Distinct multiples of `step` summing to `total` with std close to `std`."""
+    offsets = np.arange(n, dtype=np.int64) - n // 2
+    base_std = float(np.std(offsets * step))
+    scale = max(1, round(std / base_std)) if std else 1
+    values = total // n + offsets * step * scale
+    values[-1] += total - values.sum()
+    return values
+
+
+def _weights(spec, rng):
+    n, w = spec["count"], spec["weight"]
+    lo, hi = w.get("min", DEFAULT_WEIGHT_RANGE[0]), w.get(
+        "max", DEFAULT_WEIGHT_RANGE[1]
+    )
+    step = w.get("step", 1)
+    if "exact" in w:
+        return np.full(n, w["exact"], dtype=np.int64)
+    total = w.get("total", w["mean"] * n if "mean" in w else None)
+    if w.get("arithmetic") and total is not None:
+        return arithmetic_sequence(total, n, lo, hi)
+    if w.get("unique") and total is not None:
+        return spread_unique(total, n, step, w.get("std"))
+    if total is not None:
+        return fixed_sum(total, n, lo, hi, rng, step)
+    return rng.integers(lo // step, hi // step + 1, size=n) * step
+
+
+def _pallets(spec, rng):
+    n, p = spec["count"], spec["pallets"]
+    if "pattern" in p:
+        return np.resize(np.array(p["pattern"], dtype=np.int64), n)
+    if "exact" in p:
+        return np.full(n, p["exact"], dtype=np.int64)
+    lo, hi = p.get("min", DEFAULT_PALLET_RANGE[0]), p.get(
+        "max", DEFAULT_PALLET_RANGE[1]
+    )
+    if "mean" in p:
+        lo, hi = min(lo, p["mean"] - 4), max(hi, p["mean"] + 4)
+        return fixed_sum(p["mean"] * n, n, lo, hi, rng)
+    if "total" in p:
+        return fixed_sum(p["total"], n, lo, hi, rng)
+    return rng.integers(lo, hi + 1, size=n)
+
+
+def _cases(spec, pallets, rng):
+    n, c = spec["count"], spec["cases"]
+    if "exact" in c:
+        return np.full(n, c["exact"], dtype=np.int64)
+    if c.get("inverse_per_pallet") and "total" in c:
+        # Equal cases per shipment makes cases-per-pallet inversely proportional
+        return fixed_sum(c["total"], n, 0, c["total"], rng)
+    per_pallet = c.get("per_pallet", DEFAULT_CASES_PER_PALLET)
+    cases = pallets * per_pallet
+    if "min" in c:
+        cases = np.clip(cases, c["min"], c["max"])
+    if "total" in c:
+        cases = fixed_sum(c["total"], n, c.get("min", 0), c.get("max", c["total"]), rng)
+    return cases
+
+
+def _daily_weights(spec, rng):
+    """Per-day categorical weights whose daily totals strictly increase."""
+    days = spec["days"]
+    n_days, categories = days["count"], days["categories"]
+    weights = np.empty((n_days, len(categories)), dtype=np.int64)
+    for j, (lo, hi) in enumerate(categories):
+        # Distinct sorted picks per category make every daily total increase
+        weights[:, j] = np.sort(
+            rng.choice(np.arange(lo, hi + 1), size=n_days, replace=False)
+        )
+    return weights.reshape(-1)
+
+
+def _delivery_windows(spec, n, rng):
+    window = spec["delivery_window"]
+    start = np.datetime64(window.get("start", DEFAULT_START), "h")
+    end = np.datetime64(window.get("end", window.get("start", DEFAULT_START)), "h")
+    hours = window.get("start_hours") or list(range(6, 19, window["hours"]))
+    n_days = int((end - start) / np.timedelta64(24, "h")) + 1
+    slots = (
+        start + np.arange(n_days)[:, None] * 24 + np.array(hours)[None, :]
+    ).reshape(-1)
+    if window.get("no_overlap"):
+        if len(slots) < n:
+            raise Infeasible(
+                f"Only {len(slots)} non-overlapping windows for {n} shipments"
+            )
+        picked = np.sort(rng.choice(slots, size=n, replace=False))
+    else:
+        picked = rng.choice(slots, size=n)
+    return picked, picked + np.timedelta64(window["hours"], "h")
+
+
+def _iso(values):
+    # Timestamps repeat heavily (slots, days), so format each distinct one once
+    unique, inverse = np.unique(values.astype("datetime64[s]"), return_inverse=True)
+    return np.datetime_as_string(unique, unit="s")[inverse]
+
+
+def solve(spec, facility=None, seed=0):
+    """Builds a dataset that meets `spec` using vectorized NumPy arithmetic.
+
+    `facility` supplies descriptive fields (a dict with origin_id, city,
+    state, zip_code, commodity_code, equipment_code, and equipment_options
+    and all_equipment_options to pick equipment whose capacity fits the
+    largest shipment). Given the origin's dock_doors and operating_hours,
+    pickups are planned within its opening hours and never need more dock
+    doors than it has; given transit_hours, deliveries are whole days after
+    pickup and never sooner than the lane allows. Returns (DataFrame,
+    findings) where findings lists any constraint that could not be met
+    exactly.
+    """
+    rng = np.random.default_rng(seed)
+    n = spec["count"]
+    findings = []
+    facility = facility or {}
+
+    if "days" in spec:
+        weights = _daily_weights(spec, rng)
+        n = len(weights)
+    else:
+        try:
+            weights = _weights(spec, rng)
+        except Infeasible as e:
+            findings.append(str(e))
+            spec = dict(
+                spec,
+                weight={k: v for k, v in spec["weight"].items() if k != "arithmetic"},
+            )
+            weights = _weights(spec, rng)
+    if spec["weight"].get("unique") and spec["weight"].get("std"):
+        actual = float(np.std(weights))
+        if abs(actual - spec["weight"]["std"]) > spec["weight"]["std"] * 0.1:
+            findings.append(
+                f"Std dev {actual:.0f} is the closest reachable to {spec['weight']['std']}"
+            )
+
+    pallets = _pallets(spec, rng)
+    cases = _cases(spec, pallets, rng)
+    if spec["weight"].get("follows_cases"):
+        lo = spec["weight"].get("min", DEFAULT_WEIGHT_RANGE[0])
+        hi = spec["weight"].get("max", DEFAULT_WEIGHT_RANGE[1])
+        weights = np.clip(np.rint(cases * (lo + hi) / 2 / cases.mean()), lo, hi).astype(
+            np.int64
+        )
+
+    volume = spec["volume"]
+    if "exact" in volume:
+        volumes = np.full(n, volume["exact"], dtype=np.int64)
+    elif "min" in volume:
+        volumes = rng.integers(volume["min"], volume["max"] + 1, size=n)
+    else:
+        volumes = np.rint(
+            weights / spec.get("lbs_per_cuft", DEFAULT_LBS_PER_CUFT)
+        ).astype(np.int64)
+        if "lbs_per_cuft" not in spec:
+            # Unconstrained volumes are kept within what the equipment can hold
+            cap = _volume_cap(facility, int(weights.max()))
+            if cap:
+                volumes = np.minimum(volumes, cap)
+
+    if "delivery_window" in spec:
+        try:
+            delivery_from, delivery_to = _delivery_windows(spec, n, rng)
+        except Infeasible as e:
+            findings.append(str(e))
+            spec = dict(spec)
+            spec.pop("delivery_window")
+    # Whole days from pickup to delivery, enough to drive the lane
+    transit = facility.get("transit_hours", 0)
+    lead = np.timedelta64(
+        24 * max(1, int(np.ceil((transit - DELIVERY_HOURS) / 24))), "h"
+    )
+    if "delivery_window" in spec:
+        pickup_from = delivery_from - lead
+    elif "days" in spec:
+        day = np.arange(n) // spec["days"]["per_day"]
+        pickup_from = np.datetime64(spec["days"]["start"], "h") + day * 24 + 8
+    else:
+        pickup_from = np.datetime64(DEFAULT_START, "h") + (np.arange(n) % 7) * 24 + 8
+    if "dock_doors" in facility or "operating_hours" in facility:
+        pickup_from = plan_windows(
+            pickup_from,
+            PICKUP_HOURS,
+            capacity=facility.get("dock_doors", np.nan),
+            hours=np.full(n, facility.get("operating_hours"), dtype=object),
+        )
+    pickup_to = pickup_from + np.timedelta64(PICKUP_HOURS, "h")
+    if "delivery_window" in spec and (pickup_to > delivery_from).any():
+        findings.append(
+            f"{int((pickup_to > delivery_from).sum())} pickups only fit the "
+            "origin's dock schedule after their delivery window opens"
+        )
+    if "delivery_window" not in spec:
+        delivery_from = pickup_from + lead
+        delivery_to = delivery_from + np.timedelta64(DELIVERY_HOURS, "h")
+    too_soon = (delivery_to - pickup_from) / np.timedelta64(1, "h") < transit
+    if too_soon.any():
+        findings.append(
+            f"{int(too_soon.sum())} deliveries end sooner after pickup than "
+            f"the {transit:.0f}-hour lane allows"
+        )
+
+    width = max(4, len(str(n)))
+    df = pd.DataFrame(
+        {
+            "shipmentId": [f"SHIP-{i:0{width}d}" for i in range(1, n + 1)],
+            "shipFromLocationCode": facility.get("origin_id", ""),
+            "city": facility.get("city", spec.get("origin", "")),
+            "state": facility.get("state", ""),
+            "zipCode": str(facility.get("zip_code", "")),
+            "countryCode": "US",
+            "commodityCode": facility.get("commodity_code", ""),
+            "equipmentTypeCode": _fitting_equipment(
+                facility, int(weights.max()), int(volumes.max()), findings
+            ),
+            "pickupFromDateTime": _iso(pickup_from),
+            "pickupToDateTime": _iso(pickup_to),
+            "deliveryFromDateTime": _iso(delivery_from),
+            "deliveryToDateTime": _iso(delivery_to),
+            "totalWeightLbs": weights,
+            "totalVolumeCuFt": volumes,
+            "totalPalletCount": pallets,
+            "totalCaseCount": cases,
+        }
+    )
+    return df, findings
+
+
+def facility_for(spec, context):
+    """Descriptive fields for the spec's origin, looked up in the reference index.
+
+    Of several matching origins, the one closest to the spec's destination
+    is used, with the minimum transit time of that lane.
+    """
+    selected = context.select(spec.get("origin", ""))
+    facility = {}
+    origins = selected.get("origins")
+    if origins is not None and len(origins):
+        origin = origins.iloc[0]
+        if spec.get("destination") and context.origin_index.match(spec["origin"]):
+            lanes = GeoIndex(context.frames["origins"]).lane_km(
+                pd.to_numeric(origins["latitude"], errors="coerce"),
+                pd.to_numeric(origins["longitude"], errors="coerce"),
+                spec["destination"],
+            )
+            if not np.isnan(lanes).all():
+                closest = int(np.nanargmin(lanes))
+                origin = origins.iloc[closest]
+                facility["transit_hours"] = float(min_transit_hours(lanes[closest]))
+        facility.update(origin[["origin_id", "city", "state", "zip_code"]].to_dict())
+        # Dock schedule limits for planning pickups
+        dock_doors = pd.to_numeric(origin["dock_doors"], errors="coerce")
+        if dock_doors == dock_doors:
+            facility["dock_doors"] = int(dock_doors)
+        facility["operating_hours"] = origin["operating_hours"]
+    for name, column in (
+        ("equipment", "equipment_code"),
+        ("commodities", "commodity_code"),
+    ):
+        frame = selected.get(name)
+        if frame is not None and len(frame):
+            facility[column] = frame.iloc[0][column]
+    for key, equipment in (
+        ("equipment_options", selected.get("equipment")),
+        ("all_equipment_options", context.frames.get("equipment")),
+    ):
+        if equipment is not None and len(equipment):
+            # Capacity limits; non-numeric ones ("Open deck") mean no fixed limit
+            facility[key] = list(
+                zip(
+                    equipment["equipment_code"],
+                    pd.to_numeric(equipment["max_payload_lbs"], errors="coerce"),
+                    pd.to_numeric(equipment["internal_volume_cuft"], errors="coerce"),
+                )
+            )
+    return facility
+
+
+def _volume_cap(facility, max_weight):
+    """Largest internal volume among equipment options that carry `max_weight`."""
+    caps = [
+        volume
+        for _, payload, volume in facility.get("equipment_options", [])
+        if not payload < max_weight and volume == volume
+    ]
+    return int(max(caps)) if caps else None
+
+
+def _fitting_equipment(facility, max_weight, max_volume, findings):
+    """First equipment option whose payload and volume fit the largest shipment.
+
+    When none of the selected options fits, the first fitting type of the
+    whole equipment table is used instead.
+    """
+    for key in ("equipment_options", "all_equipment_options"):
+        for code, payload, volume in facility.get(key, []):
+            if not payload < max_weight and not volume < max_volume:
+                if key != "equipment_options" and facility.get("equipment_options"):
+                    findings.append(
+                        f"No selected equipment fits {max_weight} lbs / "
+                        f"{max_volume} cu ft; using {code}"
+                    )
+                return code
+    if facility.get("all_equipment_options"):
+        findings.append(f"No equipment fits {max_weight} lbs / {max_volume} cu ft")
+    return facility.get("equipment_code", "")
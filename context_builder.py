@@ -0,0 +1,180 @@
+import os
+import re
+import pandas as pd
+
+from rate_limit import estimate_tokens
+
+REF_DIR = "references"
+
+# Columns the model actually needs to pick valid codes
+ORIGIN_COLUMNS = ["origin_id", "facility_name", "city", "state", "zip_code"]
+EQUIPMENT_COLUMNS = [
+    "equipment_code",
+    "equipment_name",
+    "equipment_category",
+    "internal_volume_cuft",
+    "max_payload_lbs",
+]
+COMMODITY_COLUMNS = ["commodity_code", "commodity_name", "category"]
+
+STATE_NAMES = {
+    "alabama": "AL", "alaska": "AK", "arizona": "AZ", "arkansas": "AR",
+    "california": "CA", "colorado": "CO", "connecticut": "CT", "delaware": "DE",
+    "florida": "FL", "georgia": "GA", "hawaii": "HI", "idaho": "ID",
+    "illinois": "IL", "indiana": "IN", "iowa": "IA", "kansas": "KS",
+    "kentucky": "KY", "louisiana": "LA", "maine": "ME", "maryland": "MD",
+    "massachusetts": "MA", "michigan": "MI", "minnesota": "MN",
+    "mississippi": "MS", "missouri": "MO", "montana": "MT", "nebraska": "NE",
+    "nevada": "NV", "new hampshire": "NH", "new jersey": "NJ",
+    "new mexico": "NM", "new york": "NY", "north carolina": "NC",
+    "north dakota": "ND", "ohio": "OH", "oklahoma": "OK", "oregon": "OR",
+    "pennsylvania": "PA", "rhode island": "RI", "south carolina": "SC",
+    "south dakota": "SD", "tennessee": "TN", "texas": "TX", "utah": "UT",
+    "vermont": "VT", "virginia": "VA", "washington": "WA",
+    "west virginia": "WV", "wisconsin": "WI", "wyoming": "WY",
+}  # fmt: skip
+
+EQUIPMENT_HINTS = {
+    "refrigerat": "Refrigerated",
+    "reefer": "Refrigerated",
+    "frozen": "Refrigerated",
+    "temperature": "Refrigerated",
+    "flatbed": "Flatbed",
+    "step deck": "Flatbed",
+    "tanker": "Tanker",
+    "liquid": "Tanker",
+    "container": "Intermodal",
+    "intermodal": "Intermodal",
+    "curtain": "Curtainside",
+    "conestoga": "Curtainside",
+    "dry van": "Dry Van",
+}
+DEFAULT_EQUIPMENT_CATEGORY = "Dry Van"
+
+
+def load_reference_frames(ref_dir=REF_DIR):
+    """Loads the reference CSVs as DataFrames."""
+    frames = {}
+    for name, filename in (
+        ("origins", "Origins.csv"),
+        ("equipment", "EquipmentTypes.csv"),
+        ("commodities", "CommodityCodes.csv"),
+    ):
+        try:
+            frames[name] = pd.read_csv(os.path.join(ref_dir, filename))
+        except Exception as e:
+            print(f"Warning: Could not load {filename}: {e}")
+    return frames
+
+
+def _contains(text, phrase):
+    return re.search(rf"\b{re.escape(phrase)}\b", text) is not None
+
+
+class OriginIndex:
+    """Maps lower-cased city, metro area and state names to Origins row labels."""
+
+    def __init__(self, origins):
+        self.origins = origins
+        self.index = {}
+        for label, row in origins[["city", "state", "metro_area"]].iterrows():
+            metro = re.sub(r"\s+Metro$", "", str(row["metro_area"]))
+            for key in {str(row["city"]), metro, *metro.split("-")}:
+                self.index.setdefault(key.strip().lower(), set()).add(label)
+            self.index.setdefault(("state", row["state"]), set()).add(label)
+
+    def match(self, text):
+        """Returns the Origins row labels mentioned (by place name) in `text`."""
+        text = text.lower()
+        labels = set()
+        for key, rows in self.index.items():
+            if isinstance(key, str) and key and _contains(text, key):
+                labels |= rows
+        for name, code in STATE_NAMES.items():
+            if _contains(text, name):
+                labels |= self.index.get(("state", code), set())
+        return sorted(labels)
+
+
+def equipment_categories(text):
+    text = text.lower()
+    return {cat for hint, cat in EQUIPMENT_HINTS.items() if hint in text}
+
+
+def commodity_categories(text, commodities):
+    text = text.lower()
+    found = set()
+    for category in commodities["category"].unique():
+        words = [w for w in re.split(r"\W+", category.lower()) if len(w) > 3]
+        if any(_contains(text, w) or _contains(text, w.rstrip("s")) for w in words):
+            found.add(category)
+    return found
+
+
+class ContextBuilder:
+    """Builds a compact, prompt-specific reference context.
+
+    Only origins mentioned in the request (by city, metro area or state) and
+    equipment/commodity categories hinted at are kept, restricted to the
+    columns needed to choose valid codes and rendered as CSV.
+    """
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.origin_index = (
+            OriginIndex(frames["origins"]) if "origins" in frames else None
+        )
+
+    def select(self, text):
+        """Returns {name: DataFrame} with the rows relevant to `text`."""
+        selected = {}
+        origins = self.frames.get("origins")
+        if origins is not None:
+            labels = self.origin_index.match(text)
+            selected["origins"] = origins.loc[labels] if labels else origins
+        equipment = self.frames.get("equipment")
+        if equipment is not None:
+            cats = equipment_categories(text) or {DEFAULT_EQUIPMENT_CATEGORY}
+            selected["equipment"] = equipment[
+                equipment["equipment_category"].isin(cats)
+            ]
+        commodities = self.frames.get("commodities")
+        if commodities is not None:
+            cats = commodity_categories(text, commodities)
+            selected["commodities"] = (
+                commodities[commodities["category"].isin(cats)] if cats else commodities
+            )
+        return selected
+
+    def build(self, text):
+        """Returns {name: csv_text} for the prompt header."""
+        columns = {
+            "origins": ORIGIN_COLUMNS,
+            "equipment": EQUIPMENT_COLUMNS,
+            "commodities": COMMODITY_COLUMNS,
+        }
+        return {
+            name: df[columns[name]].to_csv(index=False).strip()
+            for name, df in self.select(text).items()
+        }
+
+
+class LegacyContext:
+    """The original context, kept for comparison: whole tables rendered with
+    `to_string()`, origins and commodities cut at 5000 characters."""
+
+    def __init__(self, frames):
+        self.context = {name: df.to_string() for name, df in frames.items()}
+        for name in ("origins", "commodities"):
+            if name in self.context:
+                self.context[name] = self.context[name][:5000] + "..."
+
+    def build(self, text):
+        return self.context
+
+
+def tokens_saved(compact_prompt, legacy_prompt):
+    """(compact_tokens, legacy_tokens, saved_tokens) estimates for one prompt."""
+    compact = estimate_tokens(compact_prompt)
+    legacy = estimate_tokens(legacy_prompt)
+    return compact, legacy, legacy - compact
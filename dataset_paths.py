@@ -0,0 +1,36 @@
+import importlib.util
+import os
+
+# Extension per format, in the order readers look for an existing dataset
+FORMATS = {
+    "parquet": ".parquet",
+    "feather": ".feather",
+    "csv": ".csv",
+    "xlsx": ".xlsx",
+}
+# Checked without importing pyarrow, so resolving paths stays cheap
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+DEFAULT_FORMAT = "parquet" if HAS_PYARROW else "xlsx"
+# Rows per batch (Parquet row group, Feather record batch) for streamed writes
+DEFAULT_BATCH_ROWS = 10000
+
+
+def dataset_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    for fmt, fmt_ext in FORMATS.items():
+        if ext == fmt_ext:
+            return fmt
+    raise ValueError(f"Unsupported dataset format: {path}")
+
+
+def dataset_path(output_dir, eval_id, fmt=DEFAULT_FORMAT):
+    return os.path.join(output_dir, f"{eval_id}_Output{FORMATS[fmt]}")
+
+
+def find_dataset(output_dir, eval_id):
+    """Returns the first existing dataset for `eval_id` in FORMATS order, or None."""
+    for fmt in FORMATS:
+        path = dataset_path(output_dir, eval_id, fmt)
+        if os.path.exists(path):
+            return path
+    return None
@@ -0,0 +1,281 @@
+import itertools
+import os
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from shipment_schema import SHIPMENT_COLUMNS, SHIPMENT_SCHEMA, coerce, ingest
+from dataset_paths import (  # noqa: F401 (re-exported)
+    DEFAULT_BATCH_ROWS,
+    DEFAULT_FORMAT,
+    FORMATS,
+    dataset_format,
+    dataset_path,
+    find_dataset,
+)
+
+try:
+    import pyarrow as pa
+except ImportError:  # Parquet and Feather need pyarrow; CSV and xlsx do not
+    pa = None
+
+
+def _require_pyarrow(fmt):
+    if fmt in ("parquet", "feather") and pa is None:
+        raise ImportError(f"{fmt} output requires pyarrow (pip install pyarrow)")
+
+
+def write_dataset(df, path):
+    """Writes a shipment DataFrame to `path` in the format given by its extension."""
+    fmt = dataset_format(path)
+    _require_pyarrow(fmt)
+    df = coerce(df)
+    tmp_path = f"{path}.partial{FORMATS[fmt]}"
+    if fmt == "parquet":
+        df.to_parquet(tmp_path, index=False)
+    elif fmt == "feather":
+        df.reset_index(drop=True).to_feather(tmp_path)
+    elif fmt == "csv":
+        df.to_csv(tmp_path, index=False)
+    else:
+        df.to_excel(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def read_dataset(path, columns=None):
+    """Reads a dataset back with schema dtypes, loading only `columns` if given."""
+    fmt = dataset_format(path)
+    _require_pyarrow(fmt)
+    if fmt == "parquet":
+        df = pd.read_parquet(path, columns=columns)
+    elif fmt == "feather":
+        df = pd.read_feather(path, columns=columns)
+    elif fmt == "csv":
+        df = pd.read_csv(path, usecols=columns, dtype=str)
+    else:
+        df = pd.read_excel(path, usecols=columns)
+    return coerce(df, columns)
+
+
+def dataset_parts(path):
+    """Row counts of the separately readable parts of a dataset.
+
+    Parts are Parquet row groups or Feather record batches. Returns None for
+    CSV and xlsx, which can only be read front to back.
+    """
+    fmt = dataset_format(path)
+    _require_pyarrow(fmt)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        metadata = pq.ParquetFile(path).metadata
+        return [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+    if fmt == "feather":
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            return [
+                reader.get_batch(i).num_rows for i in range(reader.num_record_batches)
+            ]
+    return None
+
+
+def iter_dataset(path, columns=None, batch_rows=DEFAULT_BATCH_ROWS, parts=None):
+    """Reads a dataset as typed frames of at most `batch_rows` rows.
+
+    Frames are indexed by row position in the whole dataset, as with
+    `read_dataset`. `parts` (indices into `dataset_parts`) limits a Parquet
+    or Feather read to those parts.
+    """
+    fmt = dataset_format(path)
+    _require_pyarrow(fmt)
+    if fmt in ("parquet", "feather"):
+        sizes = dataset_parts(path)
+        offsets = np.cumsum([0] + sizes)
+        for part in range(len(sizes)) if parts is None else parts:
+            offset = offsets[part]
+            for batch in _part_batches(path, fmt, part, columns, batch_rows):
+                df = batch.to_pandas()
+                df.index = pd.RangeIndex(offset, offset + len(df))
+                offset += len(df)
+                yield coerce(df, columns)
+    elif fmt == "csv":
+        for df in pd.read_csv(path, usecols=columns, dtype=str, chunksize=batch_rows):
+            yield coerce(df, columns)
+    else:
+        yield from _xlsx_batches(path, columns, batch_rows)
+
+
+def _part_batches(path, fmt, part, columns, batch_rows):
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        yield from pq.ParquetFile(path).iter_batches(
+            batch_size=batch_rows, row_groups=[part], columns=columns
+        )
+        return
+    with pa.memory_map(path) as source:
+        batch = pa.ipc.open_file(source).get_batch(part)
+        if columns is not None:
+            batch = batch.select(columns)
+        for start in range(0, batch.num_rows, batch_rows):
+            yield batch.slice(start, batch_rows)
+
+
+def _xlsx_batches(path, columns, batch_rows):
+    workbook = load_workbook(path, read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        offset = 0
+        while batch := list(itertools.islice(rows, batch_rows)):
+            # Read-only sheets drop trailing empty cells
+            batch = [row + (None,) * (len(header) - len(row)) for row in batch]
+            df = pd.DataFrame(batch, columns=header, dtype=object)
+            df.index = pd.RangeIndex(offset, offset + len(df))
+            offset += len(df)
+            yield coerce(df, columns)
+    finally:
+        workbook.close()
+
+
+def arrow_schema():
+    # Categoricals are written as plain strings so every batch shares one schema
+    types = {"string": pa.string(), "category": pa.string(), "Int32": pa.int32()}
+    return pa.schema(
+        [
+            (c, types.get(dtype, pa.timestamp("ns")))
+            for c, dtype in SHIPMENT_SCHEMA.items()
+        ]
+    )
+
+
+def open_stream_writer(path, batch_rows=DEFAULT_BATCH_ROWS):
+    """Batched record writer for `path`'s format."""
+    if dataset_format(path) == "xlsx":
+        return XlsxStreamWriter(path, batch_rows)
+    return BatchStreamWriter(path, batch_rows)
+
+
+class StreamWriter:
+    """Writes shipment records to `path` in batches of `batch_rows`.
+
+    Each batch goes through `ingest`, so rows are typed and repaired (or
+    rejected, counted in `rejected` with reasons in `issues`) before they
+    reach disk, and memory is bounded by one batch. Output goes to a
+    temporary file that is renamed into place by `close()`, so an aborted
+    generation never leaves a partial file that a rerun would mistake for
+    a finished dataset. `received` counts records given to the writer and
+    `rows` the ones ingest accepted, so far.
+    """
+
+    def __init__(self, path, batch_rows=DEFAULT_BATCH_ROWS):
+        self.path = path
+        self.fmt = dataset_format(path)
+        _require_pyarrow(self.fmt)
+        self.batch_rows = batch_rows
+        self.received = 0
+        self.rows = 0
+        self.rejected = 0
+        self.issues = []
+        self.tmp_path = f"{path}.partial{FORMATS[self.fmt]}"
+        self.batch = []
+
+    def write(self, record):
+        self.batch.append(record)
+        self.received += 1
+        if len(self.batch) >= self.batch_rows:
+            self._flush()
+
+    def write_frame(self, df):
+        """Writes a frame already built in the shipment schema as one batch."""
+        if self.batch:
+            self._flush()
+        self.received += len(df)
+        self.rows += len(df)
+        self._write_frame(coerce(df))
+
+    def _flush(self):
+        df, issues = ingest(self.batch, offset=self.received - len(self.batch))
+        self.batch = []
+        self.rows += len(df)
+        self.rejected += len(issues)
+        self.issues.extend(issues)
+        self._write_frame(df)
+
+    def close(self):
+        if self.batch or not self._started():
+            self._flush()
+        self._finish()
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self):
+        self._abort()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class XlsxStreamWriter(StreamWriter):
+    """StreamWriter for xlsx, using openpyxl's write-only mode."""
+
+    def __init__(self, path, batch_rows=DEFAULT_BATCH_ROWS):
+        super().__init__(path, batch_rows)
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet()
+        self.sheet.append(SHIPMENT_COLUMNS)
+        self.written = 0
+
+    def _started(self):
+        return self.written > 0
+
+    def _write_frame(self, df):
+        values = df.astype(object).where(df.notna(), None)
+        for row in values.itertuples(index=False):
+            self.sheet.append(list(row))
+        self.written += len(df)
+
+    def _finish(self):
+        self.workbook.save(self.tmp_path)
+
+    def _abort(self):
+        # Finish the sheet's temporary XML stream so it can be removed cleanly
+        if not self.sheet.closed:
+            self.sheet.close()
+
+
+class BatchStreamWriter(StreamWriter):
+    """StreamWriter for Parquet row groups, Feather record batches or CSV blocks."""
+
+    def __init__(self, path, batch_rows=DEFAULT_BATCH_ROWS):
+        super().__init__(path, batch_rows)
+        self.sink = None
+
+    def _started(self):
+        return self.sink is not None
+
+    def _write_frame(self, df):
+        if self.fmt == "csv":
+            # The first batch truncates any partial file left by a killed run
+            first = self.sink is None
+            df.to_csv(
+                self.tmp_path, mode="w" if first else "a", header=first, index=False
+            )
+            self.sink = self.tmp_path
+            return
+        categories = [c for c, t in SHIPMENT_SCHEMA.items() if t == "category"]
+        df = df.astype({c: "string" for c in categories})
+        table = pa.Table.from_pandas(df, schema=arrow_schema(), preserve_index=False)
+        if self.sink is None:
+            if self.fmt == "parquet":
+                import pyarrow.parquet as pq
+
+                self.sink = pq.ParquetWriter(self.tmp_path, table.schema)
+            else:
+                self.sink = pa.ipc.new_file(self.tmp_path, table.schema)
+        self.sink.write_table(table)
+
+    def _finish(self):
+        if self.fmt != "csv":
+            self.sink.close()
+
+    def _abort(self):
+        if self.sink is not None and self.fmt != "csv":
+            self.sink.close()
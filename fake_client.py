@@ -0,0 +1,216 @@
+import asyncio
+import json
+import random
+import re
+import time
+
+from rate_limit import estimate_tokens
+
+
+class FakeAPIError(Exception):
+    """Mimics the SDK's API errors: carries an HTTP status code and details."""
+
+    def __init__(self, code, message, details=None):
+        super().__init__(f"{code} {message}")
+        self.code = code
+        self.details = details
+
+
+class FakeUsage:
+    """Mimics `usage_metadata` on SDK responses."""
+
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class FakeResponse:
+    def __init__(self, text, usage_metadata=None, model_version=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+        self.model_version = model_version
+
+
+def _shipment_count(goal):
+    """Pulls the requested shipment count out of a scenario description."""
+    match = re.search(r"(\d+)\s+shipments", goal)
+    return int(match.group(1)) if match else 5
+
+
+def _packed_scenarios(prompt):
+    """Returns {scenario_id: goal} for a packed multi-scenario prompt, else None."""
+    if "### The Goals" not in prompt:
+        return None
+    goals = prompt.split("### The Goals", 1)[1].split("### Instructions", 1)[0]
+    return dict(re.findall(r"^\s*\[([^\]]+)\]\s*(.+)$", goals, re.MULTILINE))
+
+
+def fake_shipments(count, seed=0):
+    """Builds `count` plausible shipment records."""
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        pallets = rng.randint(10, 26)
+        records.append(
+            {
+                "shipmentId": f"SHIP-{i + 1:04d}",
+                "shipFromLocationCode": "ATL-01",
+                "city": "Atlanta",
+                "state": "GA",
+                "zipCode": "30349",
+                "countryCode": "US",
+                "commodityCode": "ELEC-001",
+                "equipmentTypeCode": "DV-53",
+                "pickupFromDateTime": "2026-03-01T08:00:00",
+                "pickupToDateTime": "2026-03-01T10:00:00",
+                "deliveryFromDateTime": "2026-03-02T09:00:00",
+                "deliveryToDateTime": "2026-03-02T11:00:00",
+                "totalWeightLbs": rng.randint(3000, 8000),
+                "totalVolumeCuFt": rng.randint(2000, 3500),
+                "totalPalletCount": pallets,
+                "totalCaseCount": pallets * 60,
+            }
+        )
+    return records
+
+
+def load_fixtures(path):
+    """Loads canned shipment records for `FakeClient` to replay.
+
+    Accepts a JSON array of records, a JSON object holding one under
+    "orders" or "shipments" (as in an `orders.json` export), or JSONL.
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict):
+        data = data.get("orders", data.get("shipments"))
+    if not isinstance(data, list) or not data:
+        raise ValueError(f"{path} holds no shipment records")
+    return data
+
+
+class _FakeModels:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def generate_content(self, model, contents, config=None):
+        self._owner._maybe_fail()
+        time.sleep(self._owner._delay())
+        return self._owner._respond(contents, model)
+
+
+class _FakeAsyncModels:
+    def __init__(self, owner):
+        self._owner = owner
+
+    async def generate_content(self, model, contents, config=None):
+        self._owner._maybe_fail()
+        await asyncio.sleep(self._owner._delay())
+        return self._owner._respond(contents, model)
+
+    async def generate_content_stream(self, model, contents, config=None):
+        self._owner._maybe_fail()
+        response = self._owner._respond(contents, model)
+        text = response.text
+        chunk_size = self._owner.stream_chunk_size
+        pieces = max(1, -(-len(text) // chunk_size))
+        delay = self._owner._delay() / pieces
+
+        async def chunks():
+            for i in range(0, len(text), chunk_size):
+                await asyncio.sleep(delay)
+                # Like the real API, usage is reported on the final chunk
+                last = i + chunk_size >= len(text)
+                yield FakeResponse(
+                    text[i : i + chunk_size],
+                    response.usage_metadata if last else None,
+                    model,
+                )
+
+        return chunks()
+
+
+class _FakeAio:
+    def __init__(self, owner):
+        self.models = _FakeAsyncModels(owner)
+
+
+class FakeClient:
+    """Local stand-in for `genai.Client` that simulates latency, 429s and 5xx.
+
+    Responses are built by `fake_shipments`, or replayed from `fixtures`
+    (records cycled to the requested count, with fresh shipment IDs).
+    Exposes the same `client.models.generate_content`,
+    `client.aio.models.generate_content` and
+    `client.aio.models.generate_content_stream` surface used by the generator.
+    """
+
+    def __init__(
+        self,
+        latency=1.0,
+        jitter=0.5,
+        error_rate=0.0,
+        server_error_rate=0.0,
+        retry_delay=2,
+        stream_chunk_size=256,
+        seed=0,
+        fixtures=None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.server_error_rate = server_error_rate
+        self.retry_delay = retry_delay
+        self.stream_chunk_size = stream_chunk_size
+        self.fixtures = fixtures
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self.models = _FakeModels(self)
+        self.aio = _FakeAio(self)
+
+    def _delay(self):
+        return max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+
+    def _maybe_fail(self):
+        self.calls += 1
+        roll = self._rng.random()
+        if roll < self.error_rate:
+            details = {
+                "error": {
+                    "code": 429,
+                    "status": "RESOURCE_EXHAUSTED",
+                    "details": [{"retryDelay": f"{self.retry_delay}s"}],
+                }
+            }
+            raise FakeAPIError(429, "RESOURCE_EXHAUSTED", details)
+        if roll < self.error_rate + self.server_error_rate:
+            raise FakeAPIError(503, "UNAVAILABLE: simulated overload")
+
+    def _shipments(self, count):
+        if not self.fixtures:
+            return fake_shipments(count, seed=self.calls)
+        records = []
+        for i in range(count):
+            record = dict(self.fixtures[(self.calls + i) % len(self.fixtures)])
+            record["shipmentId"] = f"SHIP-{i + 1:04d}"
+            records.append(record)
+        return records
+
+    def _respond(self, prompt, model=None):
+        scenarios = _packed_scenarios(prompt)
+        if scenarios is not None:
+            payload = {
+                scenario_id: self._shipments(_shipment_count(goal))
+                for scenario_id, goal in scenarios.items()
+            }
+        else:
+            goal = prompt.split("### The Goal", 1)[-1]
+            payload = self._shipments(_shipment_count(goal))
+        text = json.dumps(payload)
+        usage = FakeUsage(estimate_tokens(prompt), estimate_tokens(text))
+        return FakeResponse(text, usage, model)
@@ -1,59 +1,98 @@
 import os
 import json
-import pandas as pd
-from google import genai
-from google.genai import types
+import asyncio
+import argparse
+import csv
+import functools
 from dotenv import load_dotenv
 import time
 from datetime import datetime
+from rate_limit import RateLimiter, RetryStats, call_with_retries, estimate_tokens
+from fake_client import FakeClient, load_fixtures
+from providers import DISPATCH, OpenAICompatibleClient, ProviderPool
+from response_cache import DEFAULT_CACHE_PATH, ResponseCache, cache_key
+from telemetry import DEFAULT_TELEMETRY_PATH, Telemetry, usage_tokens
+from json_stream import ArrayStreamDecoder
+from dataset_paths import DEFAULT_FORMAT, FORMATS, dataset_path
+from chunk_planner import DEFAULT_CHUNK_SIZE, ChunkPlan
+from job_queue import (
+    DEFAULT_LEASE_SECONDS,
+    DEFAULT_MAX_ATTEMPTS,
+    DEFAULT_QUEUE_PATH,
+    JobQueue,
+    expand_scenarios,
+    load_cities,
+)
 
-# Load environment variables
-load_dotenv()
+# pandas, the genai SDK and the modules built on pandas (dataset_writer,
+# validators, repair, ...) are imported inside the functions that use them,
+# so `--help`, runs where every output exists and imports of the prompt
+# helpers start quickly and need no API key.
 
-API_KEY = os.getenv("GEMINI_API_KEY")
-if not API_KEY:
-    print("Error: GEMINI_API_KEY not found in .env file.")
-    exit(1)
 
+def api_keys():
+    """Gemini keys from the environment (or .env); GEMINI_API_KEYS is comma-separated."""
+    load_dotenv()
+    keys = os.getenv("GEMINI_API_KEYS") or os.getenv("GEMINI_API_KEY") or ""
+    return [key.strip() for key in keys.split(",") if key.strip()]
 
-client = genai.Client(api_key=API_KEY)
+
+class GeminiClient:
+    """`genai.Client` created on first use.
+
+    Runs served entirely from the response cache never import the SDK or
+    need the key.
+    """
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self._client = None
+
+    @property
+    def aio(self):
+        if self._client is None:
+            if not self.api_key:
+                raise RuntimeError("GEMINI_API_KEY not found in .env file.")
+            from google import genai
+
+            self._client = genai.Client(api_key=self.api_key)
+        return self._client.aio
+
+
+@functools.lru_cache(maxsize=None)
+def default_client():
+    keys = api_keys()
+    return GeminiClient(keys[0] if keys else None)
 
 
 def load_references():
-    """Loads reference data to provide context to the LLM."""
-    refs = {}
-    ref_dir = "references"
-    try:
-        refs["commodities"] = pd.read_csv(
-            os.path.join(ref_dir, "CommodityCodes.csv")
-        ).to_string()
-        refs["equipment"] = pd.read_csv(
-            os.path.join(ref_dir, "EquipmentTypes.csv")
-        ).to_string()
-        refs["origins"] = pd.read_csv(os.path.join(ref_dir, "Origins.csv")).to_string()
-        # Limiting context size if necessary, but flash generally handles large context well.
-    except Exception as e:
-        print(f"Warning: Could not load some reference files: {e}")
-    return refs
+    """Loads reference data and indexes it for per-prompt context selection."""
+    from context_builder import ContextBuilder, load_reference_frames
 
+    return ContextBuilder(load_reference_frames())
 
-def generate_prompt(eval_row, refs):
-    """Constructs the prompt for a specific evaluation set."""
 
-    prompt = f"""
+def prompt_header(context):
+    """Shared part of every prompt: role, reference data and output schema.
+
+    `context` maps origins/equipment/commodities to compact CSV text, as
+    produced by `ContextBuilder.build`.
+    """
+    return f"""
     You are a data generation assistant for a logistics company.
     Your task is to generate synthetic shipment data based on a specific requirement (Evaluation Prompt).
     
     ### Reference Data (Use these codes and details)
     
-    **Origins (Facilities):**
-    {refs.get('origins', '')[:5000]}... (truncated for brevity, assume full access if needed or rely on common US cities if strict lookup not required, but PREFER using valid Location Codes from context if matches found)
+    **Origins (Facilities relevant to the request):**
+    {context.get('origins', '')}
+    (PREFER these Location Codes; only create a plausible code if none match.)
     
     **Equipment Types:**
-    {refs.get('equipment', '')}
+    {context.get('equipment', '')}
     
     **Commodity Codes:**
-    {refs.get('commodities', '')[:5000]}...
+    {context.get('commodities', '')}
     
     ### Output Schema (JSON Array of Objects)
     Each object must have:
@@ -74,7 +113,14 @@ def generate_prompt(eval_row, refs):
     - totalPalletCount (Integer)
     - totalCaseCount (Integer)
 
-    ### The Goal
+"""
+
+
+def generate_prompt(eval_row, refs):
+    """Constructs the prompt for a specific evaluation set."""
+
+    context = refs.build(eval_row["User Prompt"])
+    prompt = prompt_header(context) + f"""    ### The Goal
     {eval_row['User Prompt']}
     
     ### Instructions
@@ -86,103 +132,962 @@ def generate_prompt(eval_row, refs):
     return prompt
 
 
-def generate_dataset(eval_id, prompt):
+def generate_packed_prompt(scenarios, refs):
+    """Packs several (eval_id, user_prompt) scenarios into one request.
+
+    The reference data is sent once; the model answers with a JSON object
+    keyed by scenario ID.
+    """
+    goals = "\n".join(
+        f"    [{eval_id}] {user_prompt}" for eval_id, user_prompt in scenarios
+    )
+    context = refs.build(" ".join(user_prompt for _, user_prompt in scenarios))
+    prompt = prompt_header(context) + f"""    ### The Goals
+    Generate an independent dataset for each scenario below. Each line starts with its scenario ID.
+{goals}
+    
+    ### Instructions
+    1. Output ONLY a valid JSON object mapping each scenario ID (e.g. "{scenarios[0][0]}") to a JSON array of shipment objects for that scenario. No markdown blocks.
+    2. Ensure ALL constraints in each scenario are met exactly (counts, sums, ranges, specific dates). Constraints never carry over between scenarios.
+    3. Use realistic dates in 2025 or 2026 as implied by prompt or default to future.
+    4. Validate logical consistency (delivery after pickup).
+    """
+    return prompt
+
+
+MODEL_NAME = "gemini-2.5-flash"
+REQUEST_TIMEOUT = 120
+
+
+def generation_config():
+    # A plain dict (accepted by the SDK) fingerprints exactly like the
+    # equivalent GenerateContentConfig, without importing the SDK
+    return {
+        "temperature": 0.0,
+        "top_p": 0.95,
+    }
+
+
+def parse_response_text(text):
+    """Strips markdown fences from a model response and decodes the JSON."""
+    text = text.strip()
+    # Clean markdown
+    if text.startswith("```json"):
+        text = text[7:]
+    if text.startswith("```"):
+        text = text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    text = text.strip()
+    return json.loads(text)
+
+
+def generate_dataset(eval_id, prompt, limiter=None, stats=None):
+    """Synchronous wrapper around `generate_dataset_async` using the default client."""
+    return asyncio.run(
+        generate_dataset_async(
+            eval_id,
+            prompt,
+            default_client(),
+            limiter or RateLimiter(),
+            stats or RetryStats(),
+        )
+    )
+
+
+def shipment_count(data):
+    """Records in a generated list, or across the lists of a packed response."""
+    if isinstance(data, dict):
+        return sum(len(v) for v in data.values() if isinstance(v, list))
+    return len(data) if isinstance(data, list) else 0
+
+
+def record_request(telemetry, eval_id, start, shipments, trace=None):
+    """Adds a per-request telemetry event; `trace` is None for cache hits."""
+    if telemetry is None:
+        return
+    trace = trace or {}
+    telemetry.record(
+        "request",
+        eval_id=eval_id,
+        cached=not trace,
+        ok=shipments > 0,
+        attempts=trace.get("attempts", 0),
+        retries=len(trace.get("retries", [])),
+        retry_kinds=trace.get("retries", []),
+        throttled_s=trace.get("throttled_seconds", 0.0),
+        latency_s=time.monotonic() - start,
+        shipments=shipments,
+    )
+
+
+async def generate_dataset_async(
+    eval_id, prompt, llm, limiter, stats, cache=None, telemetry=None, errors=None
+):
+    """Generates one dataset, retrying transient failures via `call_with_retries`.
+
+    When a `ResponseCache` is given, identical requests are served from disk
+    and successful responses are stored. When a `Telemetry` is given, each
+    attempt and the request as a whole are recorded. A request that still
+    fails returns [], with the error stored under `eval_id` in `errors`.
+    """
+    start = time.monotonic()
+    model = getattr(llm, "model", MODEL_NAME)
+    config = generation_config()
+    key = cache_key(prompt, model, config) if cache else None
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            print(f"Cache hit for {eval_id}")
+            try:
+                data = parse_response_text(cached)
+                record_request(telemetry, eval_id, start, shipment_count(data))
+                return data
+            except ValueError:
+                print(f"Discarding unparseable cache entry for {eval_id}")
+
     print(f"Generating for {eval_id}...")
-    retries = 3
-    for attempt in range(retries):
+    trace = {}
+
+    async def attempt():
+        event = {"eval_id": eval_id, "attempt": trace["attempts"]}
+        sent = time.monotonic()
         try:
-            response = client.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    temperature=0,
-                    top_p=0.95,
+            response = await asyncio.wait_for(
+                llm.aio.models.generate_content(
+                    model=model,
+                    contents=prompt,
+                    config=config,
                 ),
+                timeout=REQUEST_TIMEOUT,
+            )
+            event["latency_s"] = time.monotonic() - sent
+            event["model"] = getattr(response, "model_version", None) or model
+            event["prompt_tokens"], event["output_tokens"] = usage_tokens(response)
+            parsed = time.monotonic()
+            data = parse_response_text(response.text)
+            event["parse_s"] = time.monotonic() - parsed
+            return response.text, data, getattr(response, "served_by", model)
+        except Exception as e:
+            event["error"] = type(e).__name__
+            raise
+        finally:
+            if telemetry:
+                telemetry.record("attempt", **event)
+
+    try:
+        text, data, served_by = await call_with_retries(
+            attempt,
+            limiter,
+            stats,
+            eval_id,
+            tokens=estimate_tokens(prompt),
+            trace=trace,
+        )
+    except Exception as e:
+        print(f"Error generating {eval_id}: {e}")
+        if errors is not None:
+            errors[eval_id] = f"{type(e).__name__}: {e}"
+        record_request(telemetry, eval_id, start, 0, trace)
+        return []
+    if cache:
+        # A fallback model's answer is stored under its own key, so it is
+        # never replayed as the primary model's
+        cache.put(cache_key(prompt, served_by, config), served_by, text)
+    record_request(telemetry, eval_id, start, shipment_count(data), trace)
+    return data
+
+
+async def stream_dataset_async(
+    eval_id,
+    prompt,
+    output_file,
+    llm,
+    limiter,
+    stats,
+    cache=None,
+    telemetry=None,
+    errors=None,
+):
+    """Streams one dataset straight to `output_file`, row by row.
+
+    Array elements are decoded as they arrive and written immediately, so
+    memory stays bounded by one record (plus the cached copy of the raw
+    text when a cache is used) and malformed output aborts the attempt as
+    soon as it is detected. Returns the number of rows written; errors are
+    stored as in `generate_dataset_async`.
+    """
+    start = time.monotonic()
+    model = getattr(llm, "model", MODEL_NAME)
+    config = generation_config()
+    key = cache_key(prompt, model, config) if cache else None
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            print(f"Cache hit for {eval_id}")
+            try:
+                data = parse_response_text(cached)
+                await asyncio.to_thread(
+                    save_dataset, data, output_file, telemetry, eval_id
+                )
+                record_request(telemetry, eval_id, start, len(data))
+                return len(data)
+            except ValueError:
+                print(f"Discarding unparseable cache entry for {eval_id}")
+
+    print(f"Streaming {eval_id}...")
+    trace = {}
+
+    async def attempt():
+        event = {"eval_id": eval_id, "attempt": trace["attempts"]}
+        sent = time.monotonic()
+        first_row = None
+        parse = write = 0.0
+        decoder = ArrayStreamDecoder()
+        from dataset_writer import open_stream_writer
+
+        writer = open_stream_writer(output_file)
+        chunks = [] if cache else None
+        served_by = model
+        try:
+            stream = await llm.aio.models.generate_content_stream(
+                model=model,
+                contents=prompt,
+                config=config,
+            )
+            try:
+                async for chunk in stream:
+                    event.setdefault("ttft_s", time.monotonic() - sent)
+                    event.setdefault(
+                        "model", getattr(chunk, "model_version", None) or model
+                    )
+                    served_by = getattr(chunk, "served_by", served_by)
+                    if getattr(chunk, "usage_metadata", None) is not None:
+                        usage = usage_tokens(chunk)
+                        event["prompt_tokens"], event["output_tokens"] = usage
+                    text = chunk.text or ""
+                    if chunks is not None:
+                        chunks.append(text)
+                    t = time.monotonic()
+                    records = decoder.feed(text)
+                    parse += time.monotonic() - t
+                    for record in records:
+                        if first_row is None:
+                            first_row = time.monotonic() - sent
+                        t = time.monotonic()
+                        writer.write(record)
+                        write += time.monotonic() - t
+            finally:
+                # A stream left unfinished releases its backend and connection now
+                if hasattr(stream, "aclose"):
+                    await stream.aclose()
+            decoder.close()
+            event["latency_s"] = time.monotonic() - sent
+            event["parse_s"] = parse
+            if not writer.received:
+                writer.discard()
+                return 0, None, served_by
+            t = time.monotonic()
+            await asyncio.to_thread(writer.close)
+            write += time.monotonic() - t
+        except BaseException as e:
+            event["error"] = type(e).__name__
+            writer.discard()
+            raise
+        finally:
+            if telemetry:
+                telemetry.record("attempt", **event)
+        print(
+            f"Saved {output_file} ({writer.rows} rows, first row after {first_row:.2f}s, "
+            f"total {time.monotonic() - sent:.2f}s)"
+        )
+        report_rejected(output_file, writer.issues)
+        if telemetry:
+            telemetry.record(
+                "write",
+                eval_id=eval_id,
+                path=output_file,
+                rows=writer.rows,
+                write_s=write,
+            )
+        text = "".join(chunks) if chunks is not None else None
+        return writer.rows, text, served_by
+
+    try:
+        rows, text, served_by = await call_with_retries(
+            attempt,
+            limiter,
+            stats,
+            eval_id,
+            tokens=estimate_tokens(prompt),
+            trace=trace,
+        )
+    except Exception as e:
+        print(f"Error generating {eval_id}: {e}")
+        if errors is not None:
+            errors[eval_id] = f"{type(e).__name__}: {e}"
+        record_request(telemetry, eval_id, start, 0, trace)
+        return 0
+    if cache and text:
+        cache.put(cache_key(prompt, served_by, config), served_by, text)
+    record_request(telemetry, eval_id, start, rows, trace)
+    return rows
+
+
+def save_dataset(data, output_file, telemetry=None, eval_id=None):
+    """Writes records (or a DataFrame) to `output_file` with the shipment schema.
+
+    The format follows the file extension. LLM records go through `ingest`,
+    which repairs malformed values and rejects records it cannot repair.
+    """
+    import pandas as pd
+    from dataset_writer import write_dataset
+    from shipment_schema import ingest
+
+    start = time.monotonic()
+    if isinstance(data, pd.DataFrame):
+        df, issues = data, []
+    else:
+        df, issues = ingest(data)
+    ingested = time.monotonic()
+    write_dataset(df, output_file)
+    if telemetry:
+        telemetry.record(
+            "write",
+            eval_id=eval_id,
+            path=output_file,
+            rows=len(df),
+            ingest_s=ingested - start,
+            write_s=time.monotonic() - ingested,
+        )
+    print(f"Saved {output_file}")
+    report_rejected(output_file, issues)
+
+
+def report_rejected(label, issues, limit=5):
+    if not issues:
+        return
+    print(f"Warning: {label} rejected {len(issues)} malformed record(s)")
+    for issue in issues[:limit]:
+        print(f"  {issue}")
+
+
+def export_excel(path):
+    """Writes an xlsx copy next to a dataset saved in another format."""
+    from dataset_writer import read_dataset, write_dataset
+
+    xlsx_path = os.path.splitext(path)[0] + FORMATS["xlsx"]
+    if path != xlsx_path and os.path.exists(path):
+        write_dataset(read_dataset(path), xlsx_path)
+        print(f"Exported {xlsx_path}")
+
+
+async def generate_all(
+    jobs,
+    refs,
+    llm,
+    concurrency=4,
+    rpm=10,
+    tpm=250000,
+    stats=None,
+    cache=None,
+    pack_size=1,
+    stream=False,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    solver=False,
+    repair=0,
+    repair_stats=None,
+    telemetry=None,
+    queue=None,
+):
+    """Runs (eval_id, eval_row, output_file) jobs with at most `concurrency` in flight.
+
+    With `pack_size` > 1, scenarios are packed into shared requests and the
+    keyed response is split back into per-eval outputs; scenarios missing
+    from a packed response fall back to their own request. With `stream`,
+    single-scenario jobs are decoded and written incrementally. Requests for
+    more than `chunk_size` shipments are split by `ChunkPlan` and generated
+    chunk by chunk (see `run_chunked`). With `solver`, prompts whose
+    constraints `parse_spec` understands are solved locally without an LLM
+    call. Solved, streamed and chunked scenarios are never packed. With
+    `repair` > 0, generated (non-streamed, non-chunked) datasets are
+    validated and failures repaired for up to `repair` attempts (see
+    `repair_loop`). A `Telemetry` records every request, attempt and write.
+    With a `JobQueue`, jobs are claimed from it instead of taken from
+    `jobs`, and each one is recorded as succeeded (its output exists) or
+    failed, with the reason. `llm`'s connections are closed (`aclose`) when
+    the run ends. Returns the number of datasets saved.
+    """
+    from constraint_solver import facility_for, parse_spec, solve
+    from dataset_writer import open_stream_writer
+    from repair import RepairStats, repair_loop
+    from shipment_schema import ingest
+    from validators import build_validators
+
+    limiter = RateLimiter(rpm=rpm, tpm=tpm)
+    stats = stats if stats is not None else RetryStats()
+    semaphore = asyncio.Semaphore(concurrency)
+    validators = build_validators() if repair else {}
+    repair_stats = repair_stats if repair_stats is not None else RepairStats()
+    # Why a request or job produced nothing, by label
+    errors = {}
+
+    async def ask(label, prompt):
+        async with semaphore:
+            return await generate_dataset_async(
+                label, prompt, llm, limiter, stats, cache, telemetry, errors
+            )
+
+    async def finish(eval_id, eval_row, data, output_file):
+        # Validates and repairs a generated dataset before saving it
+        validator = validators.get(eval_id)
+        if validator:
+            df, issues = ingest(data)
+            report_rejected(eval_id, issues)
+            data, _ = await repair_loop(
+                eval_id,
+                eval_row["User Prompt"],
+                df,
+                validator,
+                repair,
+                ask,
+                repair_stats,
+                full_tokens=estimate_tokens(generate_prompt(eval_row, refs)),
             )
-            text = response.text.strip()
-            # Clean markdown
-            if text.startswith("```json"):
-                text = text[7:]
-            if text.startswith("```"):
-                text = text[3:]
-            if text.endswith("```"):
-                text = text[:-3]
-            text = text.strip()
-
-            data = json.loads(text)
-            return data
+        await asyncio.to_thread(save_dataset, data, output_file, telemetry, eval_id)
+
+    async def run_chunked(eval_id, eval_row, output_file, plan):
+        # Chunks run concurrently but are merged in order, so the output is
+        # deterministic and rows go to disk as soon as their turn comes.
+        def label(chunk):
+            return f"{eval_id} chunk {chunk['index'] + 1}/{len(plan.chunks)}"
+
+        async def run_chunk(chunk):
+            chunk_row = dict(eval_row, **{"User Prompt": chunk["prompt"]})
+            prompt = generate_prompt(chunk_row, refs)
+            async with semaphore:
+                return await generate_dataset_async(
+                    label(chunk), prompt, llm, limiter, stats, cache, telemetry, errors
+                )
+
+        tasks = [asyncio.create_task(run_chunk(chunk)) for chunk in plan.chunks]
+        writer = open_stream_writer(output_file)
+        try:
+            for chunk, task in zip(plan.chunks, tasks):
+                data = await task
+                if not isinstance(data, list) or not data:
+                    reason = errors.pop(label(chunk), "no shipments returned")
+                    raise RuntimeError(
+                        f"chunk {chunk['index'] + 1} returned no data ({reason})"
+                    )
+                for record in data:
+                    # Anything but an object goes to ingest as is, to be rejected
+                    if isinstance(record, dict):
+                        record["shipmentId"] = plan.shipment_id(writer.received)
+                        plan.add(record)
+                    writer.write(record)
+            await asyncio.to_thread(writer.close)
         except Exception as e:
-            if "429" in str(e):
-                print(f"Rate limit hit for {eval_id}. Waiting 60s...")
-                time.sleep(60)
-                continue
+            for task in tasks:
+                task.cancel()
+            writer.discard()
             print(f"Error generating {eval_id}: {e}")
-            return []
-    return []
+            errors[eval_id] = str(e)
+            return 0
+        print(f"Saved {output_file} ({writer.rows} rows in {len(plan.chunks)} chunks)")
+        report_rejected(output_file, writer.issues)
+        for finding in plan.check(writer.rows):
+            print(f"Warning: {eval_id} {finding}")
+        return 1
+
+    async def run_solver(eval_id, spec, output_file):
+        df, findings = solve(spec, facility_for(spec, refs))
+        for finding in findings:
+            print(f"Warning: {eval_id} {finding}")
+        await asyncio.to_thread(save_dataset, df, output_file, telemetry, eval_id)
+        return 1
+
+    async def run_job(eval_id, eval_row, output_file):
+        spec = parse_spec(eval_row["User Prompt"]) if solver else None
+        if spec:
+            print(f"Solving {eval_id} locally...")
+            return await run_solver(eval_id, spec, output_file)
+        plan = ChunkPlan(eval_row["User Prompt"], chunk_size)
+        if plan.is_chunked:
+            return await run_chunked(eval_id, eval_row, output_file, plan)
+        prompt = generate_prompt(eval_row, refs)
+        if stream:
+            async with semaphore:
+                rows = await stream_dataset_async(
+                    eval_id,
+                    prompt,
+                    output_file,
+                    llm,
+                    limiter,
+                    stats,
+                    cache,
+                    telemetry,
+                    errors,
+                )
+            return 1 if rows else 0
+        async with semaphore:
+            data = await generate_dataset_async(
+                eval_id, prompt, llm, limiter, stats, cache, telemetry, errors
+            )
+        if not data:
+            return 0
+        await finish(eval_id, eval_row, data, output_file)
+        return 1
+
+    def packable(eval_row):
+        # Jobs the solver handles are solved locally, and jobs that are
+        # streamed or too large for one request run on their own
+        prompt = eval_row["User Prompt"]
+        if stream or (solver and parse_spec(prompt)):
+            return False
+        return not ChunkPlan(prompt, chunk_size).is_chunked
+
+    async def run_pack(pack):
+        single = [job for job in pack if not packable(job[1])]
+        pack = [job for job in pack if packable(job[1])]
+        if len(pack) < 2:
+            single, pack = single + pack, []
+        saved = 0
+        for job in single:
+            saved += await run_job(*job)
+        if not pack:
+            return saved
+        scenarios = [
+            (eval_id, eval_row["User Prompt"]) for eval_id, eval_row, _ in pack
+        ]
+        label = f"{pack[0][0]}..{pack[-1][0]}"
+        prompt = generate_packed_prompt(scenarios, refs)
+        async with semaphore:
+            result = await generate_dataset_async(
+                label, prompt, llm, limiter, stats, cache, telemetry, errors
+            )
+        if not isinstance(result, dict):
+            result = {}
+        for eval_id, eval_row, output_file in pack:
+            data = result.get(eval_id)
+            if isinstance(data, list) and data:
+                await finish(eval_id, eval_row, data, output_file)
+                saved += 1
+            else:
+                print(
+                    f"{eval_id} missing from packed response, generating individually"
+                )
+                saved += await run_job(eval_id, eval_row, output_file)
+        return saved
+
+    async def run_claimed(claimed):
+        batch = [(job["eval_id"], job["row"], job["output_file"]) for job in claimed]
+        # Outputs are renamed into place when complete, so one that exists
+        # (from an earlier run, or saved now) is a finished dataset
+        todo = [job for job in batch if not os.path.exists(job[2])]
+        todo_files = {output_file for _, _, output_file in todo}
+        error = None
+        try:
+            if len(todo) > 1:
+                await run_pack(todo)
+            elif todo:
+                await run_job(*todo[0])
+        except Exception as e:
+            print(f"Error generating {todo[0][0]}: {e}")
+            error = f"{type(e).__name__}: {e}"
+        saved = 0
+        for job in claimed:
+            if os.path.exists(job["output_file"]):
+                queue.succeed(job)
+                saved += job["output_file"] in todo_files
+            else:
+                reason = errors.pop(job["eval_id"], None) or error
+                queue.fail(job, reason or "no shipments returned")
+        return saved
+
+    async def drain():
+        saved = 0
+        while claimed := queue.claim(pack_size):
+            saved += await run_claimed(claimed)
+        return saved
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(queue.lease_seconds / 3)
+            queue.renew()
+
+    try:
+        if queue is not None:
+            renewing = asyncio.create_task(heartbeat())
+            try:
+                saved = await asyncio.gather(*(drain() for _ in range(concurrency)))
+            finally:
+                renewing.cancel()
+        else:
+            if pack_size > 1:
+                units = [
+                    run_pack(jobs[i : i + pack_size])
+                    for i in range(0, len(jobs), pack_size)
+                ]
+            else:
+                units = [run_job(*job) for job in jobs]
+            saved = await asyncio.gather(*units)
+    finally:
+        # HTTP connection pools belong to this run's event loop
+        if hasattr(llm, "aclose"):
+            await llm.aclose()
+    return sum(saved)
 
 
-def main():
-    # Load Eval Sets
+def context_report(jobs, refs):
+    """Prints estimated prompt tokens per eval with and without context compaction."""
+    from context_builder import LegacyContext, tokens_saved
+
+    legacy = LegacyContext(refs.frames)
+    total_saved = 0
+    for eval_id, eval_row, _ in jobs:
+        compact, full, saved = tokens_saved(
+            generate_prompt(eval_row, refs), generate_prompt(eval_row, legacy)
+        )
+        total_saved += saved
+        print(f"{eval_id}: ~{compact} tokens (was ~{full}, saved ~{saved})")
+    print(f"Total saved: ~{total_saved} tokens across {len(jobs)} prompts")
+
+
+def positive_int(text):
+    """argparse type for options that must be at least 1."""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {text}")
+    return value
+
+
+def add_arguments(parser):
+    parser.add_argument(
+        "--pack",
+        type=positive_int,
+        default=1,
+        help="Scenarios packed into one request (shares the reference context)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream responses and write rows as each shipment object arrives",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=positive_int,
+        default=DEFAULT_CHUNK_SIZE,
+        help="Max shipments per request; larger requests are generated in chunks",
+    )
+    parser.add_argument(
+        "--solver",
+        action="store_true",
+        help="Solve numeric constraints locally instead of asking the LLM",
+    )
+    parser.add_argument(
+        "--format",
+        choices=list(FORMATS),
+        default=DEFAULT_FORMAT,
+        help="Dataset file format (parquet and feather need pyarrow)",
+    )
+    parser.add_argument(
+        "--excel",
+        action="store_true",
+        help="Also export each generated dataset as xlsx",
+    )
+    parser.add_argument(
+        "--repair",
+        type=int,
+        default=0,
+        help="Validate each dataset and repair failures for up to N attempts",
+    )
+    parser.add_argument(
+        "--context-report",
+        action="store_true",
+        help="Print prompt tokens saved by context compaction and exit",
+    )
+    add_queue_arguments(parser)
+    add_backend_arguments(parser)
+
+
+def add_queue_arguments(parser):
+    """Options for the job queue that journals every dataset of a run."""
+    parser.add_argument(
+        "--variants",
+        type=int,
+        default=0,
+        help="Also generate N variants of each eval with other origin/destination cities",
+    )
+    parser.add_argument(
+        "--queue-path", default=DEFAULT_QUEUE_PATH, help="Job queue location"
+    )
+    parser.add_argument(
+        "--no-queue",
+        action="store_true",
+        help="Keep the job queue in memory (no resume across runs or workers)",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=DEFAULT_MAX_ATTEMPTS,
+        help="Attempts per dataset before its job is marked failed",
+    )
+    parser.add_argument(
+        "--lease",
+        type=float,
+        default=DEFAULT_LEASE_SECONDS,
+        help="Seconds without a heartbeat before another worker takes over a job",
+    )
+    parser.add_argument(
+        "--retry-failed",
+        nargs="*",
+        metavar="EVAL_ID",
+        help="Queue failed jobs again (all, or only these eval IDs)",
+    )
+    parser.add_argument(
+        "--queue-status",
+        action="store_true",
+        help="Print job counts and failed jobs, then exit",
+    )
+
+
+def add_backend_arguments(parser):
+    """Options for the LLM backend, rate limits, response cache and telemetry."""
+    parser.add_argument(
+        "--concurrency", type=positive_int, default=4, help="Max requests in flight"
+    )
+    parser.add_argument(
+        "--rpm", type=int, default=10, help="Requests per minute budget"
+    )
+    parser.add_argument(
+        "--tpm", type=int, default=250000, help="Input tokens per minute budget"
+    )
+    parser.add_argument(
+        "--models",
+        nargs="+",
+        default=[MODEL_NAME],
+        help="Primary model followed by fallbacks used when it is overloaded",
+    )
+    parser.add_argument(
+        "--dispatch",
+        choices=DISPATCH,
+        default=DISPATCH[0],
+        help="How requests are spread over API keys",
+    )
+    parser.add_argument(
+        "--openai-base-url",
+        help="Use an OpenAI-compatible server (key from OPENAI_API_KEY) instead of Gemini",
+    )
+    parser.add_argument(
+        "--fake",
+        action="store_true",
+        help="Use the local fake client instead of Gemini",
+    )
+    parser.add_argument(
+        "--fake-latency", type=float, default=1.0, help="Fake client latency (s)"
+    )
+    parser.add_argument(
+        "--fake-error-rate", type=float, default=0.0, help="Fake client 429 rate"
+    )
+    parser.add_argument(
+        "--fake-server-error-rate", type=float, default=0.0, help="Fake client 5xx rate"
+    )
+    parser.add_argument(
+        "--fake-keys", type=int, default=1, help="Simulated API keys for --fake"
+    )
+    parser.add_argument(
+        "--fake-fixtures",
+        help="JSON/JSONL shipment records for the fake client to replay",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Disable the on-disk response cache"
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached responses but store fresh ones",
+    )
+    parser.add_argument(
+        "--cache-path", default=DEFAULT_CACHE_PATH, help="Response cache location"
+    )
+    parser.add_argument(
+        "--cache-max-mb", type=int, default=256, help="Response cache size limit (MB)"
+    )
+    parser.add_argument(
+        "--telemetry",
+        default=DEFAULT_TELEMETRY_PATH,
+        help="JSONL file that per-call telemetry events are appended to",
+    )
+    parser.add_argument(
+        "--no-telemetry",
+        action="store_true",
+        help="Keep telemetry in memory for the summary only",
+    )
+
+
+def queue_report(queue, limit=10):
+    """Prints job counts and the first `limit` failed jobs with their errors."""
+    print(queue.summary())
+    failed = queue.failures(limit)
+    for eval_id, _, attempts, error in failed:
+        print(f"  {eval_id} failed after {attempts} attempt(s): {error}")
+    if failed:
+        print("Rerun with --retry-failed [EVAL_ID ...] to queue them again")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic shipment datasets."
+    )
+    add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def backend_clients(args):
+    """One client per API key (or per simulated key with `--fake`), by name."""
+    if args.fake:
+        fixtures = load_fixtures(args.fake_fixtures) if args.fake_fixtures else None
+        return {
+            f"fake{i + 1}": FakeClient(
+                latency=args.fake_latency,
+                error_rate=args.fake_error_rate,
+                server_error_rate=args.fake_server_error_rate,
+                fixtures=fixtures,
+                seed=i,
+            )
+            for i in range(args.fake_keys)
+        }
+    if args.openai_base_url:
+        return {
+            "openai": OpenAICompatibleClient(
+                args.openai_base_url, os.getenv("OPENAI_API_KEY")
+            )
+        }
+    keys = api_keys()
+    if not keys:
+        print(
+            "Warning: GEMINI_API_KEY not found in .env file; "
+            "only cached responses can be used."
+        )
+        return {"key1": default_client()}
+    return {f"key{i}": GeminiClient(key) for i, key in enumerate(keys, 1)}
+
+
+def main(argv=None):
+    run(parse_args(argv))
+
+
+def run(args):
+    # Load Eval Sets (with the csv module: a run with nothing to generate
+    # never needs pandas)
     try:
-        eval_meta = pd.read_csv("references/Eval_set.csv")
+        with open("references/Eval_set.csv", newline="", encoding="utf-8") as f:
+            eval_meta = list(csv.DictReader(f))
     except FileNotFoundError:
         print("Error: references/Eval_set.csv not found.")
         return
 
-    refs = load_references()
+    # Determine output filename
+    output_dir = "generated_data"
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
 
-    for index, row in eval_meta.iterrows():
-        eval_id = f"EVAL-{str(row['#']).zfill(3)}"
-        user_prompt = row["User Prompt"]
-
-        # Determine output filename
-        output_dir = "generated_data"
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
-        output_file = os.path.join(output_dir, f"{eval_id}_Output.xlsx")
+    scenarios = [(f"EVAL-{str(row['#']).zfill(3)}", row) for row in eval_meta]
+    if args.variants:
+        scenarios = expand_scenarios(scenarios, args.variants, load_cities())
+    jobs = []
+    for eval_id, row in scenarios:
+        output_file = dataset_path(output_dir, eval_id, args.format)
 
         if os.path.exists(output_file):
             print(f"Skipping {output_file} (already exists)")
             continue
 
-        full_prompt = generate_prompt(row, refs)
-
-        data = generate_dataset(eval_id, full_prompt)
-
-        if data:
-            df = pd.DataFrame(data)
-            # Ensure columns are in correct order as per schema (optional strictly, but good practice)
-            cols = [
-                "shipmentId",
-                "shipFromLocationCode",
-                "city",
-                "state",
-                "zipCode",
-                "countryCode",
-                "commodityCode",
-                "equipmentTypeCode",
-                "pickupFromDateTime",
-                "pickupToDateTime",
-                "deliveryFromDateTime",
-                "deliveryToDateTime",
-                "totalWeightLbs",
-                "totalVolumeCuFt",
-                "totalPalletCount",
-                "totalCaseCount",
-            ]
-
-            # Add missing cols with defaults if LLM missed them
-            for c in cols:
-                if c not in df.columns:
-                    df[c] = None
-
-            df = df[cols]
-            df.to_excel(output_file, index=False)
-            print(f"Saved {output_file}")
-
-        # A bit of wait to be nice to the API
-        time.sleep(5)
+        jobs.append((eval_id, row, output_file))
+
+    if args.context_report:
+        context_report(jobs, load_references())
+        return
+
+    # Every dataset still to make is journaled, so an interrupted run (or
+    # several workers sharing the queue file) resumes where it stopped
+    queue = JobQueue(
+        ":memory:" if args.no_queue else args.queue_path,
+        max_attempts=args.max_attempts,
+        lease_seconds=args.lease,
+    )
+    if args.retry_failed is not None:
+        print(f"Requeued {queue.retry(args.retry_failed)} failed job(s)")
+    queue.add(jobs)
+    counts = queue.counts(scoped=True)
+    if args.queue_status or not (counts["pending"] or counts["running"]):
+        queue_report(queue)
+        queue.close()
+        return
+
+    refs = load_references()
+
+    llm = ProviderPool(backend_clients(args), args.models, dispatch=args.dispatch)
+
+    cache = None
+    if not args.no_cache:
+        cache = ResponseCache(
+            args.cache_path,
+            max_bytes=args.cache_max_mb * 1024 * 1024,
+            refresh=args.refresh,
+        )
+
+    stats = RetryStats()
+    repair_stats = None
+    if args.repair:
+        from repair import RepairStats
+
+        repair_stats = RepairStats()
+    telemetry = Telemetry(
+        None if args.no_telemetry else args.telemetry, model=llm.model
+    )
+    start = time.monotonic()
+    saved = asyncio.run(
+        generate_all(
+            [],
+            refs,
+            llm,
+            concurrency=args.concurrency,
+            rpm=args.rpm,
+            tpm=args.tpm,
+            stats=stats,
+            cache=cache,
+            pack_size=args.pack,
+            stream=args.stream,
+            chunk_size=args.chunk_size,
+            solver=args.solver,
+            repair=args.repair,
+            repair_stats=repair_stats,
+            telemetry=telemetry,
+            queue=queue,
+        )
+    )
+    elapsed = time.monotonic() - start
+    rate = saved / (elapsed / 60) if elapsed > 0 else 0.0
+    print(
+        f"Generated {saved}/{len(queue.claimed)} datasets in {elapsed:.1f}s "
+        f"({rate:.2f} datasets/min)"
+    )
+    queue_report(queue)
+    queue.close()
+    if args.excel:
+        for _, _, output_file in jobs:
+            export_excel(output_file)
+    print(stats.summary())
+    if args.repair:
+        print(repair_stats.summary())
+    print(llm.summary())
+    print(telemetry.summary())
+    telemetry.close()
+    if cache:
+        print(cache.summary())
+        cache.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,175 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+from context_builder import REF_DIR, OriginIndex, load_reference_frames
+
+EARTH_RADIUS_KM = 6371.0088
+# Fastest plausible average over a lane: 55 mph with a team driving around
+# the clock. Roads are never shorter than the great circle, so a delivery
+# sooner than distance / speed after pickup cannot happen.
+MAX_TRUCK_KMH = 88.5
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; arguments are degrees and broadcast."""
+    lat1, lon1, lat2, lon2 = (
+        np.radians(np.asarray(x, dtype=float)) for x in (lat1, lon1, lat2, lon2)
+    )
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1)))
+
+
+def min_transit_hours(km):
+    return np.asarray(km, dtype=float) / MAX_TRUCK_KMH
+
+
+class GeoIndex:
+    """Origins on a uniform latitude/longitude grid, for nearest-facility lookups.
+
+    Facilities are bucketed into `cell_deg` cells (by default sized for about
+    one facility per cell); a query searches rings of cells outward from its
+    own until nothing outside the searched box can be closer, so a lookup
+    touches a few cells instead of every facility.
+    Every step is vectorized over the queries. Longitudes do not wrap at the
+    antimeridian.
+    """
+
+    def __init__(self, origins, cell_deg=None):
+        self.origins = origins
+        self.names = OriginIndex(origins)
+        lat = pd.to_numeric(origins["latitude"], errors="coerce").to_numpy(float)
+        lon = pd.to_numeric(origins["longitude"], errors="coerce").to_numpy(float)
+        self.lat, self.lon = lat, lon
+        located = np.flatnonzero(~np.isnan(lat) & ~np.isnan(lon))
+        if cell_deg is None and len(located):
+            area = np.ptp(lat[located]) * np.ptp(lon[located])
+            cell_deg = max(np.sqrt(area / len(located)), 0.1)
+        self.cell_deg = cell_deg or 1.0
+        keys = self._key(*self._cell(lat[located], lon[located]))
+        order = np.argsort(keys, kind="stable")
+        # Facilities sorted by cell; cell i holds members[starts[i]:starts[i + 1]]
+        self.members = located[order]
+        self.cells, starts = np.unique(keys[order], return_index=True)
+        self.starts = np.append(starts, len(order))
+        cy, cx = self._cell(lat[located], lon[located])
+        self.extent = (
+            cy.min(initial=0),
+            cy.max(initial=0),
+            cx.min(initial=0),
+            cx.max(initial=0),
+        )
+
+    def _cell(self, lat, lon):
+        return (
+            np.floor(lat / self.cell_deg).astype(np.int64),
+            np.floor(lon / self.cell_deg).astype(np.int64),
+        )
+
+    @staticmethod
+    def _key(cy, cx):
+        return (cy + 1000) * 10000 + (cx + 1000)
+
+    def nearest(self, lat, lon):
+        """Position (row in `origins`) and km of the nearest facility to each point.
+
+        Points without coordinates get position -1 and distance NaN.
+        """
+        lat = np.asarray(lat, dtype=float).reshape(-1)
+        lon = np.asarray(lon, dtype=float).reshape(-1)
+        best = np.full(len(lat), np.inf)
+        found = np.full(len(lat), -1, dtype=np.int64)
+        located = ~np.isnan(lat) & ~np.isnan(lon)
+        pending = np.flatnonzero(located) if len(self.members) else np.array([], int)
+        cy, cx = self._cell(np.where(located, lat, 0), np.where(located, lon, 0))
+        ring = 0
+        while len(pending):
+            for dy, dx in _ring(ring):
+                self._search(pending, cy + dy, cx + dx, lat, lon, best, found)
+            # Done once nothing beyond the searched box can be closer
+            y, x = cy[pending], cx[pending]
+            covered = (
+                (y - ring <= self.extent[0])
+                & (y + ring >= self.extent[1])
+                & (x - ring <= self.extent[2])
+                & (x + ring >= self.extent[3])
+            )
+            bound = self._outside_km(lat[pending], lon[pending], y, x, ring)
+            pending = pending[~covered & (best[pending] > bound)]
+            ring += 1
+        return found, np.where(found >= 0, best, np.nan)
+
+    def _search(self, pending, cy, cx, lat, lon, best, found):
+        """Updates best/found for `pending` points with the facilities of one cell each."""
+        keys = self._key(cy[pending], cx[pending])
+        slot = np.minimum(np.searchsorted(self.cells, keys), len(self.cells) - 1)
+        hit = self.cells[slot] == keys
+        points, slot = pending[hit], slot[hit]
+        counts = self.starts[slot + 1] - self.starts[slot]
+        point = np.repeat(points, counts)
+        offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        member = self.members[np.repeat(self.starts[slot], counts) + offset]
+        km = haversine_km(lat[point], lon[point], self.lat[member], self.lon[member])
+        np.minimum.at(best, point, km)
+        closest = km <= best[point]
+        found[point[closest]] = member[closest]
+
+    def _outside_km(self, lat, lon, cy, cx, ring):
+        """Lower bound on the distance from each point to anything outside its box."""
+        cell = self.cell_deg
+        dlat = np.minimum(lat - (cy - ring) * cell, (cy + ring + 1) * cell - lat)
+        dlon = np.minimum(lon - (cx - ring) * cell, (cx + ring + 1) * cell - lon)
+        # Distance from a point to a meridian dlon away
+        across = np.arcsin(
+            np.minimum(
+                1, np.sin(np.radians(np.minimum(dlon, 90))) * np.cos(np.radians(lat))
+            )
+        )
+        return EARTH_RADIUS_KM * np.minimum(np.radians(dlat), across)
+
+    def region(self, lat, lon):
+        """Region of the nearest facility to each point (missing if none)."""
+        positions, _ = self.nearest(lat, lon)
+        regions = self.origins["region"].to_numpy(object)
+        return np.where(positions >= 0, regions[np.maximum(positions, 0)], None)
+
+    def places(self, text):
+        """Positions of the facilities in the cities, metro areas or states named in `text`."""
+        labels = self.names.match(text)
+        return self.origins.index.get_indexer(labels)
+
+    def lane_km(self, lat, lon, text):
+        """Shortest distance from each point to any facility at the place named by `text`.
+
+        Places are resolved like `places`; NaN where nothing matches.
+        """
+        to = self.places(text)
+        to = to[~np.isnan(self.lat[to]) & ~np.isnan(self.lon[to])]
+        lat = np.asarray(lat, dtype=float).reshape(-1, 1)
+        lon = np.asarray(lon, dtype=float).reshape(-1, 1)
+        if not len(to):
+            return np.full(len(lat), np.nan)
+        return haversine_km(lat, lon, self.lat[to], self.lon[to]).min(axis=1)
+
+
+def _ring(r):
+    """Cell offsets at Chebyshev distance exactly `r`."""
+    if r == 0:
+        return [(0, 0)]
+    side = range(-r, r + 1)
+    return (
+        [(-r, dx) for dx in side]
+        + [(r, dx) for dx in side]
+        + [(dy, -r) for dy in side[1:-1]]
+        + [(dy, r) for dy in side[1:-1]]
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def load_geo_index(ref_dir=REF_DIR):
+    """GeoIndex over the reference origins, built once per process."""
+    return GeoIndex(load_reference_frames(ref_dir)["origins"])
@@ -0,0 +1,268 @@
+import csv
+import json
+import os
+import random
+import socket
+import sqlite3
+import time
+
+from chunk_planner import ROUTE_RE
+
+DEFAULT_QUEUE_PATH = os.path.join(".cache", "jobs.sqlite")
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_LEASE_SECONDS = 120
+
+PENDING, RUNNING, SUCCEEDED, FAILED = "pending", "running", "succeeded", "failed"
+STATES = (PENDING, RUNNING, SUCCEEDED, FAILED)
+
+HOST = socket.gethostname()
+
+
+def default_worker():
+    return f"{HOST}:{os.getpid()}"
+
+
+def _stopped(worker):
+    """Whether `worker` was a process on this host that is no longer running."""
+    host, _, pid = (worker or "").rpartition(":")
+    if host != HOST or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass
+    return False
+
+
+class JobQueue:
+    """Durable SQLite journal of generation jobs, shared by worker processes.
+
+    Each job is one dataset (eval ID, eval row and output file). A worker
+    `claim`s pending jobs, which marks them running under its name with a
+    lease, and records each outcome with `succeed` or `fail`. A failed job
+    goes back to pending until it has used `max_attempts` attempts, then
+    stays failed, with the last error kept, until `retry` requeues it.
+    Claims happen in one write transaction, so workers pulling from the same
+    file never take the same job. A worker only claims jobs it has `add`ed
+    itself, so jobs queued by runs with other parameters (another format,
+    other variants) are left alone. A worker renews its leases while it
+    runs; a job whose worker stopped (its lease ran out, or its process on
+    this host is gone) is claimed again.
+    """
+
+    def __init__(
+        self,
+        path=DEFAULT_QUEUE_PATH,
+        worker=None,
+        max_attempts=DEFAULT_MAX_ATTEMPTS,
+        lease_seconds=DEFAULT_LEASE_SECONDS,
+    ):
+        self.path = path
+        self.worker = worker or default_worker()
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        # IDs of the jobs this worker has claimed
+        self.claimed = set()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Autocommit; claims open their own write transaction
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                eval_id TEXT,
+                output_file TEXT UNIQUE,
+                scenario TEXT,
+                state TEXT,
+                attempts INTEGER,
+                worker TEXT,
+                lease_until REAL,
+                error TEXT,
+                created REAL,
+                updated REAL
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id)")
+        # The jobs this worker was given; temporary tables are per connection
+        self.conn.execute("CREATE TEMP TABLE scope (id INTEGER PRIMARY KEY)")
+
+    def add(self, jobs):
+        """Queues (eval_id, eval_row, output_file) jobs; returns how many are new.
+
+        Jobs already queued keep their state and attempts, except succeeded
+        ones, which are queued again (their output is missing). Either way
+        they become claimable by this worker.
+        """
+        now = time.time()
+        before = self.conn.total_changes
+        self.conn.executemany(
+            """INSERT INTO jobs (eval_id, output_file, scenario, state, attempts,
+                created, updated) VALUES (?, ?, ?, ?, 0, ?, ?)
+            ON CONFLICT (output_file) DO UPDATE SET state = excluded.state,
+                attempts = 0, error = NULL, updated = excluded.updated
+            WHERE jobs.state = 'succeeded'""",
+            [
+                (eval_id, output_file, json.dumps(row), PENDING, now, now)
+                for eval_id, row, output_file in jobs
+            ],
+        )
+        added = self.conn.total_changes - before
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO scope SELECT id FROM jobs WHERE output_file = ?",
+            [(output_file,) for _, _, output_file in jobs],
+        )
+        return added
+
+    def claim(self, limit=1):
+        """Marks up to `limit` pending jobs as running by this worker and returns them.
+
+        Jobs are dicts with id, eval_id, row, output_file and attempts (this
+        one included).
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._release_stopped(now)
+            rows = self.conn.execute(
+                "SELECT id, eval_id, scenario, output_file, attempts FROM jobs "
+                "WHERE state = ? AND id IN (SELECT id FROM scope) ORDER BY id LIMIT ?",
+                (PENDING, limit),
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, worker = ?, "
+                "lease_until = ?, updated = ? WHERE id = ?",
+                [
+                    (RUNNING, self.worker, now + self.lease_seconds, now, row[0])
+                    for row in rows
+                ],
+            )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.claimed.update(row[0] for row in rows)
+        return [
+            {
+                "id": job_id,
+                "eval_id": eval_id,
+                "row": json.loads(scenario),
+                "output_file": output_file,
+                "attempts": attempts + 1,
+            }
+            for job_id, eval_id, scenario, output_file, attempts in rows
+        ]
+
+    def _release_stopped(self, now):
+        stopped = [
+            job_id
+            for job_id, worker, lease_until in self.conn.execute(
+                "SELECT id, worker, lease_until FROM jobs WHERE state = ?", (RUNNING,)
+            )
+            if lease_until < now or _stopped(worker)
+        ]
+        self.conn.executemany(
+            "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+            "error = 'worker stopped before finishing', worker = NULL, "
+            "lease_until = NULL, updated = ? WHERE id = ?",
+            [(self.max_attempts, FAILED, PENDING, now, job_id) for job_id in stopped],
+        )
+
+    def renew(self):
+        """Extends the leases of this worker's running jobs."""
+        now = time.time()
+        self.conn.execute(
+            "UPDATE jobs SET lease_until = ?, updated = ? WHERE state = ? AND worker = ?",
+            (now + self.lease_seconds, now, RUNNING, self.worker),
+        )
+
+    def succeed(self, job):
+        self._finish(job, SUCCEEDED, None)
+
+    def fail(self, job, error):
+        state = FAILED if job["attempts"] >= self.max_attempts else PENDING
+        self._finish(job, state, error)
+
+    def _finish(self, job, state, error):
+        # A job released from this worker (lease ran out) belongs to its new claimant
+        self.conn.execute(
+            "UPDATE jobs SET state = ?, error = ?, worker = NULL, lease_until = NULL, "
+            "updated = ? WHERE id = ? AND state = ? AND worker = ?",
+            (state, error, time.time(), job["id"], RUNNING, self.worker),
+        )
+
+    def retry(self, eval_ids=None):
+        """Queues failed jobs (all, or those of `eval_ids`) again with fresh attempts."""
+        query = (
+            "UPDATE jobs SET state = ?, attempts = 0, error = NULL, updated = ? "
+            "WHERE state = ?"
+        )
+        params = [PENDING, time.time(), FAILED]
+        if eval_ids:
+            query += f" AND eval_id IN ({', '.join('?' * len(eval_ids))})"
+            params += list(eval_ids)
+        return self.conn.execute(query, params).rowcount
+
+    def counts(self, scoped=False):
+        """Jobs per state, of the whole queue or (`scoped`) of this worker's jobs."""
+        where = "WHERE id IN (SELECT id FROM scope)" if scoped else ""
+        counts = dict.fromkeys(STATES, 0)
+        counts.update(
+            self.conn.execute(
+                f"SELECT state, COUNT(*) FROM jobs {where} GROUP BY state"
+            )
+        )
+        return counts
+
+    def failures(self, limit=None):
+        """(eval_id, output_file, attempts, error) of failed jobs, oldest first."""
+        return self.conn.execute(
+            "SELECT eval_id, output_file, attempts, error FROM jobs WHERE state = ? "
+            "ORDER BY id LIMIT ?",
+            (FAILED, -1 if limit is None else limit),
+        ).fetchall()
+
+    def summary(self):
+        counts = self.counts()
+        return "Jobs: " + ", ".join(f"{counts[state]} {state}" for state in STATES)
+
+    def close(self):
+        self.conn.close()
+
+
+def load_cities(path=os.path.join("references", "Origins.csv")):
+    """Distinct origin city names, in file order."""
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(dict.fromkeys(row["city"] for row in csv.DictReader(f)))
+
+
+def expand_scenarios(scenarios, variants, cities):
+    """Adds `variants` route variants of each (eval_id, eval_row) scenario.
+
+    A variant is the same prompt with its "from X to Y" route replaced by
+    two other cities from `cities`, so it keeps every other constraint.
+    Variant IDs are the eval ID plus "-V" and a number; the same inputs
+    always give the same variants. Scenarios without a route are kept as
+    they are.
+    """
+    expanded = []
+    width = max(3, len(str(variants)))
+    for eval_id, row in scenarios:
+        expanded.append((eval_id, row))
+        route = ROUTE_RE.search(row["User Prompt"])
+        if not route or variants <= 0:
+            continue
+        prompt = row["User Prompt"]
+        for i in range(1, variants + 1):
+            origin, destination = random.Random(f"{eval_id}/{i}").sample(cities, 2)
+            variant = (
+                prompt[: route.start(1)]
+                + origin
+                + prompt[route.end(1) : route.start(2)]
+                + destination
+                + prompt[route.end(2) :]
+            )
+            expanded.append(
+                (f"{eval_id}-V{i:0{width}d}", dict(row, **{"User Prompt": variant}))
+            )
+    return expanded
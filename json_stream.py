@@ -0,0 +1,194 @@
+import json
+
+_WHITESPACE = " \t\r\n"
+
+
+class MalformedStreamError(json.JSONDecodeError):
+    """Raised as soon as streamed output can no longer be a JSON array.
+
+    Subclasses JSONDecodeError so the retry policy treats it as a parse failure.
+    """
+
+    def __init__(self, msg, doc="", pos=0):
+        super().__init__(msg, doc, pos)
+        self.args = (msg,)
+
+
+class ArrayStreamDecoder:
+    """Incrementally decodes a top-level JSON array fed in arbitrary text chunks.
+
+    `feed()` returns the elements completed by that chunk, so callers can act
+    on each object as soon as it closes. Only the text of the element being
+    received is buffered. A leading markdown fence (```json) is tolerated,
+    matching `parse_response_text`.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.state = "start"  # start -> items -> value -> items ... -> done
+        self.count = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        items = []
+        while self.pos < len(self.buffer):
+            if self.state == "start":
+                if not self._skip_prefix():
+                    break
+            elif self.state == "items":
+                if not self._between_items():
+                    break
+            elif self.state == "value":
+                item = self._scan_value()
+                if item is _INCOMPLETE:
+                    break
+                items.append(item)
+            else:  # done: ignore trailing fence/whitespace
+                self.pos = len(self.buffer)
+        self._compact()
+        return items
+
+    def close(self):
+        """Asserts that the array was closed."""
+        if self.state != "done":
+            raise MalformedStreamError(
+                f"Stream ended inside the JSON array after {self.count} elements"
+            )
+
+    def _compact(self):
+        # Drop consumed text so memory is bounded by the current element
+        if self.state != "value" and self.pos:
+            self.buffer = self.buffer[self.pos :]
+            self.pos = 0
+
+    def _skip_prefix(self):
+        rest = self.buffer[self.pos :].lstrip(_WHITESPACE)
+        self.pos = len(self.buffer) - len(rest)
+        if not rest:
+            return False
+        if rest.startswith("`"):
+            newline = rest.find("\n")
+            if newline == -1:
+                return False
+            self.pos += newline + 1
+            return True
+        if rest[0] != "[":
+            raise MalformedStreamError(f"Expected a JSON array, got {rest[:20]!r}")
+        self.pos += 1
+        self.state = "items"
+        return True
+
+    def _between_items(self):
+        while self.pos < len(self.buffer):
+            ch = self.buffer[self.pos]
+            if ch in _WHITESPACE or ch == ",":
+                self.pos += 1
+            elif ch == "]":
+                self.pos += 1
+                self.state = "done"
+                return True
+            else:
+                self.state = "value"
+                self.buffer = self.buffer[self.pos :]
+                self.pos = 0
+                self._depth = 0
+                return True
+        return False
+
+    def _scan_value(self):
+        buf = self.buffer
+        while self.pos < len(buf):
+            ch = buf[self.pos]
+            self.pos += 1
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 0:
+                    # End of the array right after a scalar element
+                    return self._finish(self.pos - 1)
+                self._depth -= 1
+                if self._depth == 0:
+                    return self._finish(self.pos)
+            elif ch == "," and self._depth == 0:
+                return self._finish(self.pos - 1)
+        return _INCOMPLETE
+
+    def _finish(self, end):
+        text = self.buffer[:end]
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise MalformedStreamError(f"Malformed element {self.count}: {e}") from e
+        self.count += 1
+        self.pos = end
+        self.state = "items"
+        return item
+
+
+_INCOMPLETE = object()
+
+
+def iter_json_array(f, chunk_size=1 << 20):
+    """Yields the elements of a top-level JSON array read from text file `f`.
+
+    The file is read `chunk_size` characters at a time and each element is
+    decoded by the C decoder straight from the buffer, so memory is bounded
+    by one chunk plus the element being decoded. A top-level object holding
+    the array (`{"orders": [...]}`) is read from its first array.
+    """
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size)
+    eof = not buffer
+    pos = 0
+    count = 0
+    # Find the opening bracket
+    while True:
+        start = buffer.find("[")
+        if start != -1:
+            pos = start + 1
+            break
+        if eof:
+            raise MalformedStreamError("Expected a JSON array")
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+    while True:
+        while pos < len(buffer) and (buffer[pos] in _WHITESPACE or buffer[pos] == ","):
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        if pos < len(buffer):
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise MalformedStreamError(f"Malformed element {count}: {e}") from e
+            else:
+                # A scalar ending at the buffer edge may continue in the next chunk
+                if end < len(buffer) or eof:
+                    count += 1
+                    pos = end
+                    yield item
+                    continue
+        elif eof:
+            raise MalformedStreamError(
+                f"Stream ended inside the JSON array after {count} elements"
+            )
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
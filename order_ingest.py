@@ -0,0 +1,546 @@
+"""Streams customer orders into the 16-column shipment schema.
+
+    python order_ingest.py orders.json
+    python order_ingest.py orders.jsonl --output generated_data/Orders_Output.csv
+
+Orders (a JSON array, possibly wrapped as `{"orders": [...]}`, or JSON
+lines) are read incrementally and mapped one batch at a time, so memory is
+bounded by `--batch-rows` whatever the input size. Pickup locations resolve
+to `Origins.csv` facilities, equipment names to `EquipmentTypes.csv` codes
+(the first size in the category that fits the weight and volume) and
+commodities to `CommodityCodes.csv` codes. Values the rules can't map go to
+the LLM, a batch of distinct values per request, and every answer is
+checked against the reference codes and reused for the rest of the run.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+
+from dataset_paths import DEFAULT_BATCH_ROWS, DEFAULT_FORMAT, FORMATS, dataset_path
+from generate_shipments import (
+    add_backend_arguments,
+    backend_clients,
+    generate_dataset_async,
+)
+from json_stream import iter_json_array
+from providers import ProviderPool
+from rate_limit import RateLimiter, RetryStats
+from response_cache import ResponseCache
+from telemetry import Telemetry
+
+# A 53ft dry van (4000 cu ft) holds 26 standard pallets
+MAX_PALLETS = 26
+CUFT_PER_PALLET = 4000 / MAX_PALLETS
+CASES_PER_PALLET = 60
+LBS_PER_CUFT = 1.8
+# Pickup and delivery windows open at 08:00 on date-only order dates
+WINDOW_START_HOURS = 8
+WINDOW_HOURS = 2
+# Distinct unmapped values sent in one LLM request
+LLM_BATCH = 50
+FIELDS = ["origins", "equipment", "commodities"]
+
+
+def read_orders(path, chunk_size=1 << 20):
+    """Yields orders one at a time from a JSON array or JSON lines file."""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from iter_json_array(f, chunk_size)
+
+
+def batches(items, size):
+    items = iter(items)
+    while batch := list(itertools.islice(items, size)):
+        yield batch
+
+
+def _text(value):
+    return "" if value is None else str(value).strip()
+
+
+def raw_fields(orders):
+    """The raw origin, equipment and commodity value of each order, by field."""
+    locations = [o.get("pickup_location") for o in orders]
+    locations = [loc if isinstance(loc, dict) else {} for loc in locations]
+    return {
+        "origins": [
+            (loc.get("city"), loc.get("state"), loc.get("zipcode", loc.get("zip_code")))
+            for loc in locations
+        ],
+        "equipment": [o.get("equipment_required") for o in orders],
+        "commodities": [o.get("commodity") for o in orders],
+    }
+
+
+def normalize(field, value):
+    if field == "origins":
+        city, state, zipcode = value
+        return _text(city), _text(state).upper(), _text(zipcode)
+    return _text(value)
+
+
+def origin_label(key):
+    city, state, zipcode = key
+    return f"{city}, {state} {zipcode}".strip()
+
+
+class OrderMapper:
+    """Resolves order fields to reference codes, once per distinct value.
+
+    Origins match on city (preferring the same state, then the same zip
+    code), or on metro area names ("Seattle" -> Seattle-Tacoma). Equipment
+    and commodities match on code, name or category, then on hint words
+    ("Food" -> Food & Beverage). Values nothing matches are unresolved
+    until `resolve_with_llm` maps them; rows still unresolved are written
+    with the code missing, for the validators to report.
+    """
+
+    def __init__(self, frames):
+        import pandas as pd
+        from context_builder import OriginIndex
+
+        self.origins = frames["origins"]
+        self.equipment = frames["equipment"]
+        self.commodities = frames["commodities"]
+        self.origin_index = OriginIndex(self.origins)
+        # Sizes to pick from, by category, or the one size when a code is named.
+        # Capacity limits; non-numeric ones ("Open deck") mean no fixed limit
+        self.options = {}
+        for code, category, payload, volume in zip(
+            self.equipment["equipment_code"],
+            self.equipment["equipment_category"],
+            pd.to_numeric(self.equipment["max_payload_lbs"], errors="coerce"),
+            pd.to_numeric(self.equipment["internal_volume_cuft"], errors="coerce"),
+        ):
+            self.options.setdefault(category, []).append((code, payload, volume))
+            self.options[code] = [(code, payload, volume)]
+        # Per field: value -> (resolved value or None, "rule"/"llm"/None)
+        self.resolved = {field: {} for field in FIELDS}
+        self.asked = {field: set() for field in FIELDS}
+        self.orders = 0
+        self.rejected = 0
+        self.incomplete = 0
+
+    def _origin(self, key):
+        city, state, zipcode = key
+        if not city:
+            return None
+        o = self.origins
+        labels = self.origin_index.index.get(city.lower(), set())
+        same_state = [label for label in labels if o.at[label, "state"] == state]
+        if not same_state:
+            # Another state only counts through a metro area ("Kansas City"),
+            # not a namesake city
+            if any(o.at[label, "city"].lower() == city.lower() for label in labels):
+                return None
+            same_state = list(labels)
+        if not same_state:
+            return None
+        label = min(
+            same_state,
+            key=lambda label: (str(o.at[label, "zip_code"]) != zipcode, label),
+        )
+        return o.at[label, "origin_id"]
+
+    def _equipment(self, name):
+        from context_builder import equipment_categories
+
+        text = name.lower()
+        e = self.equipment
+        for column in ("equipment_code", "equipment_name"):
+            match = e[e[column].str.lower() == text]
+            if len(match):
+                return match["equipment_code"].iloc[0]
+        match = e[e["equipment_category"].str.lower() == text]
+        if len(match):
+            return match["equipment_category"].iloc[0]
+        categories = equipment_categories(text)
+        return categories.pop() if len(categories) == 1 else None
+
+    def _commodity(self, name):
+        from context_builder import commodity_categories
+
+        text = name.lower()
+        c = self.commodities
+        for column in ("commodity_code", "commodity_name", "category"):
+            match = c[c[column].str.lower() == text]
+            if len(match):
+                return match["commodity_code"].iloc[0]
+        categories = commodity_categories(text, c)
+        if len(categories) != 1:
+            return None
+        return c.loc[c["category"] == categories.pop(), "commodity_code"].iloc[0]
+
+    def resolve(self, field, value):
+        """Reference code for `value`, or None.
+
+        Equipment resolves to a code or to a category to pick a size from.
+        """
+        known = self.resolved[field].get(value)
+        if known is None:
+            match = {
+                "origins": self._origin,
+                "equipment": self._equipment,
+                "commodities": self._commodity,
+            }[field](value)
+            known = (match, "rule" if match is not None else None)
+            self.resolved[field][value] = known
+        return known[0]
+
+    def resolve_all(self, field, raw):
+        """Resolves a column of raw values, normalizing each distinct one once."""
+        memo = {v: self.resolve(field, normalize(field, v)) for v in set(raw)}
+        return [memo[v] for v in raw]
+
+    def values(self, orders):
+        """Distinct normalized field values of `orders`, by field."""
+        orders = [o for o in orders if isinstance(o, dict)]
+        return {
+            field: {normalize(field, v) for v in set(raw)}
+            for field, raw in raw_fields(orders).items()
+        }
+
+    def unresolved(self, orders):
+        """Values of `orders` that no rule maps and the LLM hasn't been asked about."""
+        return {
+            field: sorted(
+                v
+                for v in values
+                if any(v)
+                and v not in self.asked[field]
+                and self.resolve(field, v) is None
+            )
+            for field, values in self.values(orders).items()
+        }
+
+    def mapping_prompt(self, values):
+        from context_builder import COMMODITY_COLUMNS, EQUIPMENT_COLUMNS
+
+        sections = {
+            "origins": (
+                "Origins (answer with origin_id)",
+                self.origins[["origin_id", "city", "state", "zip_code", "metro_area"]],
+            ),
+            "equipment": (
+                "Equipment (answer with equipment_code)",
+                self.equipment[EQUIPMENT_COLUMNS],
+            ),
+            "commodities": (
+                "Commodities (answer with commodity_code)",
+                self.commodities[COMMODITY_COLUMNS],
+            ),
+        }
+        reference = "\n\n".join(
+            f"**{title}:**\n{frame.to_csv(index=False).strip()}"
+            for field, (title, frame) in sections.items()
+            if values.get(field)
+        )
+        request = {
+            field: [origin_label(v) if field == "origins" else v for v in vals]
+            for field, vals in values.items()
+            if vals
+        }
+        return f"""
+    You map fields of customer freight orders to reference codes for a logistics company.
+
+    ### Reference Data
+    {reference}
+
+    ### Values to Map
+    {json.dumps(request, indent=2)}
+
+    Origins are pickup locations: pick the nearest facility. Return ONLY a JSON
+    object with the same keys, each mapping every value above to the best
+    matching code, or to null when nothing is a reasonable match.
+    """
+
+    def accept(self, field, values, answers):
+        """Records the LLM's `answers` for `values`, keeping only valid codes."""
+        labels = {origin_label(v) if field == "origins" else v: v for v in values}
+        answers = answers if isinstance(answers, dict) else {}
+        for label, value in labels.items():
+            self.asked[field].add(value)
+            code = answers.get(label)
+            if not isinstance(code, str):
+                code = None
+            if field == "origins":
+                valid = self.origins["origin_id"].eq(code).any()
+            elif field == "equipment":
+                rows = self.equipment[self.equipment["equipment_code"] == code]
+                valid = len(rows) > 0
+                code = rows["equipment_category"].iloc[0] if valid else None
+            else:
+                valid = self.commodities["commodity_code"].eq(code).any()
+            if valid:
+                self.resolved[field][value] = (code, "llm")
+
+    async def resolve_with_llm(
+        self, orders, llm, limiter, stats, cache=None, telemetry=None
+    ):
+        """Asks the LLM about the unmapped values of `orders`, LLM_BATCH per request."""
+        pending = [
+            (field, value)
+            for field, values in self.unresolved(orders).items()
+            for value in values
+        ]
+        requests = []
+        for i in range(0, len(pending), LLM_BATCH):
+            values = {}
+            for field, value in pending[i : i + LLM_BATCH]:
+                values.setdefault(field, []).append(value)
+            requests.append(values)
+        start = sum(len(asked) for asked in self.asked.values())
+        answers = await asyncio.gather(
+            *(
+                generate_dataset_async(
+                    f"ORDERS-MAP-{start + i * LLM_BATCH + 1}",
+                    self.mapping_prompt(values),
+                    llm,
+                    limiter,
+                    stats,
+                    cache=cache,
+                    telemetry=telemetry,
+                )
+                for i, values in enumerate(requests)
+            )
+        )
+        for values, answer in zip(requests, answers):
+            answer = answer if isinstance(answer, dict) else {}
+            for field, vals in values.items():
+                self.accept(field, vals, answer.get(field))
+
+    def _fit_equipment(self, categories, weights, volumes):
+        """Equipment code per row: the first size of its category that fits.
+
+        `volumes` above what any size carrying the weight can hold are
+        capped in place first, as the solver does. Rows nothing fits get the
+        category's first size (and fail the capacity check).
+        """
+        import numpy as np
+        import pandas as pd
+
+        codes = np.full(len(weights), None, dtype=object)
+        inverse, keys = pd.factorize(pd.Series(categories, dtype=object))
+        for k, category in enumerate(keys):
+            rows = np.flatnonzero(inverse == k)
+            options = self.options.get(category, [])
+            if not options:
+                continue
+            w, v = weights[rows], volumes[rows]
+            cap = np.full(len(rows), np.nan)
+            for _, payload, volume in options:
+                if volume == volume:
+                    cap = np.where(payload >= w, np.fmax(cap, volume), cap)
+            v = np.where(np.isnan(cap), v, np.minimum(v, cap))
+            volumes[rows] = v
+            fit = np.full(len(rows), options[0][0], dtype=object)
+            for code, payload, volume in reversed(options):
+                fit[~(payload < w) & ~(volume < v)] = code
+            codes[rows] = fit
+        return codes
+
+    def map_batch(self, orders):
+        """Builds a shipment frame from one batch of orders."""
+        import numpy as np
+        import pandas as pd
+        from shipment_schema import coerce_column
+
+        valid = [o for o in orders if isinstance(o, dict)]
+        self.rejected += len(orders) - len(valid)
+        self.orders += len(valid)
+        raw = raw_fields(valid)
+        origin_ids = self.resolve_all("origins", raw["origins"])
+        o = self.origins.set_index("origin_id")
+        place = o.reindex(pd.Index(origin_ids, dtype=object))
+        # "4,500 lbs" and the like are repaired as in LLM output
+        weights = coerce_column(
+            pd.Series([x.get("weight_lbs") for x in valid], dtype=object),
+            "totalWeightLbs",
+        ).to_numpy(dtype=float, na_value=np.nan)
+        volumes = np.rint(weights / LBS_PER_CUFT)
+        categories = self.resolve_all("equipment", raw["equipment"])
+        equipment = self._fit_equipment(categories, weights, volumes)
+        pallets = np.clip(np.ceil(volumes / CUFT_PER_PALLET), 1, MAX_PALLETS)
+        pickup = self._window_start([x.get("ready_date") for x in valid])
+        delivery = self._window_start([x.get("delivery_deadline") for x in valid])
+        window = np.timedelta64(WINDOW_HOURS, "h")
+        df = pd.DataFrame(
+            {
+                "shipmentId": [x.get("order_id") for x in valid],
+                "shipFromLocationCode": origin_ids,
+                "city": place["city"].to_numpy(),
+                "state": place["state"].to_numpy(),
+                "zipCode": place["zip_code"]
+                .astype("Int64")
+                .astype("string")
+                .to_numpy(),
+                "countryCode": "US",
+                "commodityCode": self.resolve_all("commodities", raw["commodities"]),
+                "equipmentTypeCode": equipment,
+                "pickupFromDateTime": pickup,
+                "pickupToDateTime": pickup + window,
+                "deliveryFromDateTime": delivery,
+                "deliveryToDateTime": delivery + window,
+                "totalWeightLbs": weights,
+                "totalVolumeCuFt": volumes,
+                "totalPalletCount": pallets,
+                "totalCaseCount": pallets * CASES_PER_PALLET,
+            }
+        )
+        codes = ["shipFromLocationCode", "commodityCode", "equipmentTypeCode"]
+        self.incomplete += int(df[codes].isna().any(axis=1).sum())
+        return df
+
+    def _window_start(self, values):
+        import numpy as np
+        import pandas as pd
+        from shipment_schema import coerce_column
+
+        # Order dates repeat heavily, so each distinct one is parsed once
+        codes, unique = pd.factorize(pd.Series(values, dtype=object))
+        dates = coerce_column(pd.Series(unique, dtype=object), "pickupFromDateTime")
+        # Date-only values open the window at WINDOW_START_HOURS
+        midnight = dates == dates.dt.normalize()
+        dates = dates.where(~midnight, dates + pd.Timedelta(hours=WINDOW_START_HOURS))
+        # Missing values (code -1) pick the NaT appended at the end
+        return np.append(dates.to_numpy(), np.datetime64("NaT", "ns"))[codes]
+
+    def summary(self):
+        parts = []
+        for field in FIELDS:
+            sources = [source for _, source in self.resolved[field].values()]
+            parts.append(
+                f"{field} {len(sources)} distinct ({sources.count('rule')} by rule, "
+                f"{sources.count('llm')} by LLM, {sources.count(None)} unresolved)"
+            )
+        return (
+            f"Mapped {self.orders} orders: {'; '.join(parts)}. "
+            f"{self.incomplete} rows with a missing code, {self.rejected} rejected"
+        )
+
+
+async def ingest_orders(
+    orders,
+    writer,
+    mapper,
+    batch_rows=DEFAULT_BATCH_ROWS,
+    llm=None,
+    limiter=None,
+    stats=None,
+    cache=None,
+    telemetry=None,
+):
+    """Maps `orders` (any iterable) batch by batch and writes each to `writer`."""
+    for batch in batches(orders, batch_rows):
+        if llm is not None:
+            await mapper.resolve_with_llm(batch, llm, limiter, stats, cache, telemetry)
+        writer.write_frame(mapper.map_batch(batch))
+
+
+def add_arguments(parser):
+    parser.add_argument(
+        "input", nargs="?", default="orders.json", help="Orders JSON or JSONL file"
+    )
+    parser.add_argument(
+        "--output", help="Output dataset (default: generated_data/Orders_Output.*)"
+    )
+    parser.add_argument(
+        "--format",
+        choices=list(FORMATS),
+        default=DEFAULT_FORMAT,
+        help="Output format when --output is not given",
+    )
+    parser.add_argument(
+        "--batch-rows",
+        type=int,
+        default=DEFAULT_BATCH_ROWS,
+        help="Orders mapped and written per batch",
+    )
+    parser.add_argument(
+        "--no-llm",
+        action="store_true",
+        help="Only map fields deterministically; leave the rest missing",
+    )
+    add_backend_arguments(parser)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convert customer orders into a shipment dataset."
+    )
+    add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    run(parse_args(argv))
+
+
+def run(args):
+    from context_builder import load_reference_frames
+    from dataset_writer import open_stream_writer
+
+    output = args.output or dataset_path("generated_data", "Orders", args.format)
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    mapper = OrderMapper(load_reference_frames())
+    llm = cache = None
+    if not args.no_llm:
+        llm = ProviderPool(backend_clients(args), args.models, dispatch=args.dispatch)
+        if not args.no_cache:
+            cache = ResponseCache(
+                args.cache_path,
+                max_bytes=args.cache_max_mb * 1024 * 1024,
+                refresh=args.refresh,
+            )
+    stats = RetryStats()
+    telemetry = Telemetry(
+        None if args.no_telemetry else args.telemetry,
+        model=llm.model if llm else None,
+    )
+    writer = open_stream_writer(output, args.batch_rows)
+    start = time.monotonic()
+    try:
+        asyncio.run(
+            ingest_orders(
+                read_orders(args.input),
+                writer,
+                mapper,
+                args.batch_rows,
+                llm=llm,
+                limiter=RateLimiter(rpm=args.rpm, tpm=args.tpm),
+                stats=stats,
+                cache=cache,
+                telemetry=telemetry,
+            )
+        )
+    except BaseException:
+        writer.discard()
+        raise
+    writer.close()
+    elapsed = time.monotonic() - start
+    rate = writer.rows / elapsed if elapsed > 0 else 0.0
+    print(
+        f"Wrote {writer.rows} shipments to {output} in {elapsed:.1f}s "
+        f"({rate:,.0f} rows/s)"
+    )
+    print(mapper.summary())
+    if llm:
+        print(stats.summary())
+        print(telemetry.summary())
+    telemetry.close()
+    if cache:
+        print(cache.summary())
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+import json
+import time
+
+from rate_limit import RATE_LIMIT, SERVER, classify_error, retry_delay_from_error
+
+ROUND_ROBIN = "round-robin"
+LEAST_LOADED = "least-loaded"
+DISPATCH = [ROUND_ROBIN, LEAST_LOADED]
+# Errors that mean "this key or model is busy", so another one is tried
+OVERLOAD = (RATE_LIMIT, SERVER)
+DEFAULT_COOLDOWN = 5.0
+
+
+class Backend:
+    """One pooled client (a provider and API key) serving one model."""
+
+    def __init__(self, name, client, model):
+        self.name = name
+        self.client = client
+        self.model = model
+        self.in_flight = 0
+        self.requests = 0
+        self.overloads = 0
+        self.cooldown_until = 0.0
+
+
+class ServedResponse:
+    """A backend's response (or stream chunk), tagged with the model that served it.
+
+    Every other attribute is the wrapped response's.
+    """
+
+    def __init__(self, response, served_by):
+        self._response = response
+        self.served_by = served_by
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+
+class _PoolModels:
+    def __init__(self, pool):
+        self._pool = pool
+
+    async def generate_content(self, model, contents, config=None):
+        return await self._pool.dispatch(
+            model,
+            lambda b: b.client.aio.models.generate_content(
+                model=b.model, contents=contents, config=config
+            ),
+        )
+
+    async def generate_content_stream(self, model, contents, config=None):
+        return await self._pool.dispatch(
+            model,
+            lambda b: b.client.aio.models.generate_content_stream(
+                model=b.model, contents=contents, config=config
+            ),
+            stream=True,
+        )
+
+
+class _PoolAio:
+    def __init__(self, pool):
+        self.models = _PoolModels(pool)
+
+
+class ProviderPool:
+    """Spreads requests over several API keys and models.
+
+    `clients` maps a name to a client with the `genai.Client` async surface
+    (one client per key, reused for every request so connections are
+    pooled); every client serves every model in `models`. The first model
+    is the primary one and the rest are fallbacks, in order. A request goes
+    to one of its model's backends, picked round-robin or least-loaded
+    among those not cooling down. A backend that answers 429/5xx cools
+    down (for the server's retry delay, if given) and the request moves on
+    to the next backend, then to the next model. When every backend is
+    overloaded the last error is raised for `call_with_retries` to handle.
+
+    Exposes `aio.models.generate_content(_stream)`, like `genai.Client`;
+    responses and stream chunks are `ServedResponse`s, so callers can tell
+    a fallback model's answer from the primary model's.
+    """
+
+    def __init__(
+        self, clients, models, dispatch=ROUND_ROBIN, cooldown=DEFAULT_COOLDOWN
+    ):
+        if dispatch not in DISPATCH:
+            raise ValueError(f"unknown dispatch {dispatch!r}")
+        self.models = list(models)
+        self.model = self.models[0]
+        self.dispatch_mode = dispatch
+        self.cooldown = cooldown
+        self.backends = {
+            model: [
+                Backend(f"{model}@{name}", client, model)
+                for name, client in clients.items()
+            ]
+            for model in self.models
+        }
+        self.fallbacks = 0
+        self._turn = {model: 0 for model in self.models}
+        self.aio = _PoolAio(self)
+
+    def _chain(self, model):
+        if model in self.models:
+            return self.models[self.models.index(model) :]
+        return self.models
+
+    def _order(self, model):
+        backends = self.backends[model]
+        if self.dispatch_mode == LEAST_LOADED:
+            return sorted(backends, key=lambda b: (b.in_flight, b.requests))
+        start = self._turn[model]
+        self._turn[model] = (start + 1) % len(backends)
+        return backends[start:] + backends[:start]
+
+    def candidates(self, model):
+        """Backends to try for `model`, in order, skipping those cooling down."""
+        now = time.monotonic()
+        ready = [
+            b
+            for m in self._chain(model)
+            for b in self._order(m)
+            if b.cooldown_until <= now
+        ]
+        if ready:
+            return ready
+        # Everything is cooling down: wait on the one that recovers first
+        return [
+            min(self.backends[self._chain(model)[0]], key=lambda b: b.cooldown_until)
+        ]
+
+    async def dispatch(self, model, call, stream=False):
+        error = None
+        for backend in self.candidates(model):
+            backend.in_flight += 1
+            backend.requests += 1
+            try:
+                response = await call(backend)
+            except Exception as e:
+                backend.in_flight -= 1
+                if classify_error(e) not in OVERLOAD:
+                    raise
+                backend.overloads += 1
+                delay = retry_delay_from_error(e) or self.cooldown
+                backend.cooldown_until = time.monotonic() + delay
+                error = e
+                continue
+            except BaseException:  # cancelled, e.g. by a request timeout
+                backend.in_flight -= 1
+                raise
+            if backend.model != self.model:
+                self.fallbacks += 1
+            if stream:
+                return self._hold(backend, response)
+            backend.in_flight -= 1
+            return ServedResponse(response, backend.model)
+        raise error
+
+    async def _hold(self, backend, stream):
+        # A stream keeps its backend busy until it is fully read or closed
+        try:
+            async for chunk in stream:
+                yield ServedResponse(chunk, backend.model)
+        finally:
+            backend.in_flight -= 1
+            if hasattr(stream, "aclose"):
+                await stream.aclose()
+
+    async def aclose(self):
+        """Closes the clients that hold connections (those with `aclose`)."""
+        for backend in self.backends[self.model]:
+            if hasattr(backend.client, "aclose"):
+                await backend.client.aclose()
+
+    def summary(self):
+        parts = [
+            f"{b.name} {b.requests} requests ({b.overloads} overloaded)"
+            for backends in self.backends.values()
+            for b in backends
+        ]
+        return (
+            f"Backends ({self.dispatch_mode}): {'; '.join(parts)}; "
+            f"fallback responses {self.fallbacks}"
+        )
+
+
+class ProviderError(Exception):
+    """HTTP error from an OpenAI-compatible endpoint, shaped like the SDK's."""
+
+    def __init__(self, response, message):
+        super().__init__(f"{response.status_code} {message}")
+        self.code = response.status_code
+        self.response = response
+        self.details = None
+
+
+class _Usage:
+    def __init__(self, usage):
+        self.prompt_token_count = usage.get("prompt_tokens")
+        self.candidates_token_count = usage.get("completion_tokens")
+        self.total_token_count = usage.get("total_tokens")
+
+
+class _Response:
+    def __init__(self, text, usage, model_version):
+        self.text = text
+        self.usage_metadata = _Usage(usage) if usage else None
+        self.model_version = model_version
+
+
+class _OpenAIModels:
+    def __init__(self, owner):
+        self._owner = owner
+
+    async def generate_content(self, model, contents, config=None):
+        body = self._owner.request_body(model, contents, config)
+        response = await self._owner.http.post("/chat/completions", json=body)
+        await self._owner.raise_for_status(response)
+        data = response.json()
+        text = "".join(
+            (choice.get("message") or {}).get("content") or ""
+            for choice in data.get("choices", [])
+        )
+        return _Response(text, data.get("usage"), data.get("model", model))
+
+    async def generate_content_stream(self, model, contents, config=None):
+        body = self._owner.request_body(model, contents, config, stream=True)
+        request = self._owner.http.build_request("POST", "/chat/completions", json=body)
+        response = await self._owner.http.send(request, stream=True)
+        await self._owner.raise_for_status(response)
+        return self._chunks(response, model)
+
+    async def _chunks(self, response, model):
+        try:
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                payload = line[5:].strip()
+                if payload == "[DONE]":
+                    break
+                event = json.loads(payload)
+                text = "".join(
+                    (choice.get("delta") or {}).get("content") or ""
+                    for choice in event.get("choices", [])
+                )
+                yield _Response(text, event.get("usage"), event.get("model", model))
+        finally:
+            await response.aclose()
+
+
+class _OpenAIAio:
+    def __init__(self, owner):
+        self.models = _OpenAIModels(owner)
+
+
+class OpenAICompatibleClient:
+    """`genai.Client` stand-in for OpenAI-compatible chat completion servers.
+
+    Works with local servers (vLLM, llama.cpp, Ollama, ...) as well as hosted
+    ones. Requests share one HTTP connection pool. Only the async surface
+    used by the generator is provided.
+    """
+
+    def __init__(self, base_url, api_key=None, timeout=120.0, max_connections=16):
+        import httpx  # deferred: only needed for this backend
+
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.http = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            headers=headers,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections),
+        )
+        self.aio = _OpenAIAio(self)
+
+    async def aclose(self):
+        await self.http.aclose()
+
+    def request_body(self, model, contents, config=None, stream=False):
+        body = {"model": model, "messages": [{"role": "user", "content": contents}]}
+        for field in ("temperature", "top_p"):
+            if isinstance(config, dict):
+                value = config.get(field)
+            else:
+                value = getattr(config, field, None)
+            if value is not None:
+                body[field] = value
+        if stream:
+            body["stream"] = True
+            body["stream_options"] = {"include_usage": True}
+        return body
+
+    async def raise_for_status(self, response):
+        if response.is_success:
+            return
+        await response.aread()
+        try:
+            message = response.json().get("error", response.text)
+        except ValueError:
+            message = response.text
+        await response.aclose()
+        raise ProviderError(response, message)
@@ -0,0 +1,209 @@
+import asyncio
+import random
+import re
+import time
+import json
+
+RATE_LIMIT = "rate_limit"
+TIMEOUT = "timeout"
+SERVER = "server"
+PARSE = "parse"
+
+
+def estimate_tokens(text):
+    """Rough token estimate (~4 characters per token) used for TPM budgeting."""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` tokens, refilled at `rate` tokens/second."""
+
+    def __init__(self, capacity, rate):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` tokens are available (0 if available now)."""
+        self._refill(time.monotonic())
+        # Requests larger than the bucket are allowed once it is full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Shared request and token buckets sized to a per-minute quota.
+
+    `pause()` lets a server-supplied retry delay hold back every caller,
+    not just the one that was throttled.
+    """
+
+    def __init__(self, rpm=10, tpm=250000):
+        self.requests = TokenBucket(rpm, rpm / 60) if rpm else None
+        self.tokens = TokenBucket(tpm, tpm / 60) if tpm else None
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, tokens=1):
+        """Waits until one request of `tokens` input tokens fits the quota.
+
+        Returns the number of seconds spent waiting.
+        """
+        waited = 0.0
+        async with self._lock:
+            while True:
+                wait = max(0.0, self.paused_until - time.monotonic())
+                if self.requests:
+                    wait = max(wait, self.requests.wait_time(1))
+                if self.tokens:
+                    wait = max(wait, self.tokens.wait_time(tokens))
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+                waited += wait
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+        return waited
+
+
+class RetryStats:
+    """Counters for retries by error class and time spent throttled."""
+
+    def __init__(self):
+        self.retries = {RATE_LIMIT: 0, TIMEOUT: 0, SERVER: 0, PARSE: 0}
+        self.throttled_seconds = 0.0
+        self.failures = 0
+
+    def summary(self):
+        retries = ", ".join(f"{k}={v}" for k, v in self.retries.items())
+        return (
+            f"Retries: {retries}; throttled {self.throttled_seconds:.1f}s; "
+            f"failed requests {self.failures}"
+        )
+
+
+def _error_code(e):
+    for attr in ("code", "status_code"):
+        code = getattr(e, attr, None)
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def classify_error(e):
+    """Returns the retry class for an exception, or None if it is not retryable."""
+    if isinstance(e, json.JSONDecodeError):
+        return PARSE
+    if (
+        isinstance(e, (asyncio.TimeoutError, TimeoutError))
+        or "Timeout" in type(e).__name__
+    ):
+        return TIMEOUT
+    code = _error_code(e)
+    if code == 429 or "RESOURCE_EXHAUSTED" in str(e):
+        return RATE_LIMIT
+    if code is not None and 500 <= code < 600:
+        return SERVER
+    if code is None and "429" in str(e):
+        return RATE_LIMIT
+    return None
+
+
+def _parse_seconds(value):
+    match = re.match(r"\s*([\d.]+)\s*s?\s*$", str(value))
+    return float(match.group(1)) if match else None
+
+
+def _find_retry_delay(obj):
+    if isinstance(obj, dict):
+        if "retryDelay" in obj:
+            return _parse_seconds(obj["retryDelay"])
+        obj = list(obj.values())
+    if isinstance(obj, list):
+        for item in obj:
+            delay = _find_retry_delay(item)
+            if delay is not None:
+                return delay
+    return None
+
+
+def retry_delay_from_error(e):
+    """Extracts a server-supplied retry delay (seconds) from an API error, if any."""
+    delay = _find_retry_delay(getattr(e, "details", None))
+    if delay is not None:
+        return delay
+    headers = getattr(getattr(e, "response", None), "headers", None)
+    if headers is not None and headers.get("retry-after"):
+        delay = _parse_seconds(headers.get("retry-after"))
+        if delay is not None:
+            return delay
+    match = re.search(r"retry in ([\d.]+)\s*s", str(e), re.IGNORECASE)
+    return float(match.group(1)) if match else None
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0, rng=random):
+    """Full-jitter exponential backoff for a 1-based attempt number."""
+    return rng.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+async def call_with_retries(
+    fn,
+    limiter,
+    stats,
+    label,
+    tokens=1,
+    max_attempts=5,
+    base_delay=1.0,
+    max_delay=60.0,
+    trace=None,
+):
+    """Awaits `fn()` under `limiter`, retrying transient failures.
+
+    Rate limits honour the server's retry delay (pausing the shared limiter);
+    timeouts, 5xx and parse failures use jittered exponential backoff.
+    Non-retryable errors and the final failed attempt are re-raised.
+    When a `trace` dict is given it is filled with this call's `attempts`,
+    `retries` (error classes, in order) and `throttled_seconds`.
+    """
+    trace = trace if trace is not None else {}
+    trace.update(attempts=0, retries=[], throttled_seconds=0.0)
+    for attempt in range(1, max_attempts + 1):
+        waited = await limiter.acquire(tokens)
+        stats.throttled_seconds += waited
+        trace["throttled_seconds"] += waited
+        trace["attempts"] = attempt
+        try:
+            return await fn()
+        except Exception as e:
+            kind = classify_error(e)
+            if kind is None or attempt == max_attempts:
+                stats.failures += 1
+                raise
+            delay = retry_delay_from_error(e) if kind == RATE_LIMIT else None
+            if delay is None:
+                delay = backoff_delay(attempt, base_delay, max_delay)
+            stats.retries[kind] += 1
+            trace["retries"].append(kind)
+            if kind == RATE_LIMIT:
+                stats.throttled_seconds += delay
+                trace["throttled_seconds"] += delay
+                limiter.pause(delay)
+            print(
+                f"{kind} error for {label} (attempt {attempt}). Retrying in {delay:.1f}s..."
+            )
+            await asyncio.sleep(delay)
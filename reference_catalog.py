@@ -0,0 +1,122 @@
+import functools
+import hashlib
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from context_builder import REF_DIR, load_reference_frames
+
+DEFAULT_CATALOG_CACHE = os.path.join(".cache", "reference_catalog.pkl")
+
+# Reference table -> (source CSV, key column)
+TABLES = {
+    "origins": ("Origins.csv", "origin_id"),
+    "equipment": ("EquipmentTypes.csv", "equipment_code"),
+    "commodities": ("CommodityCodes.csv", "commodity_code"),
+}
+
+# Columns kept per table, beyond the key; numeric ones are parsed as numbers
+FIELDS = {
+    "origins": [
+        "city",
+        "state",
+        "zip_code",
+        "dock_doors",
+        "operating_hours",
+        "latitude",
+        "longitude",
+    ],
+    "equipment": ["max_payload_lbs", "internal_volume_cuft"],
+    "commodities": [],
+}
+NUMERIC_FIELDS = {
+    "max_payload_lbs",
+    "internal_volume_cuft",
+    "dock_doors",
+    "latitude",
+    "longitude",
+}
+
+
+def catalog_fingerprint(ref_dir=REF_DIR):
+    """Hash of the reference CSVs' sizes and mtimes and the fields kept from them."""
+    h = hashlib.sha256()
+    # The kept fields are part of the cached tables' shape
+    h.update(repr(sorted(FIELDS.items())).encode("utf-8"))
+    for filename, _ in TABLES.values():
+        st = os.stat(os.path.join(ref_dir, filename))
+        h.update(f"{filename}:{st.st_size}:{st.st_mtime_ns}\0".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _build_tables(ref_dir):
+    frames = load_reference_frames(ref_dir)
+    tables = {}
+    for name, (filename, key) in TABLES.items():
+        df = frames[name][[key] + FIELDS[name]].copy()
+        for field in FIELDS[name]:
+            if field in NUMERIC_FIELDS:
+                # "Open deck" / "Variable" capacities mean no fixed limit
+                df[field] = pd.to_numeric(df[field], errors="coerce")
+            else:
+                df[field] = df[field].astype("string").str.strip()
+        tables[name] = df.set_index(df[key].astype("string").str.strip()).drop(
+            columns=key
+        )
+    return tables
+
+
+class ReferenceCatalog:
+    """Reference tables indexed by their code, for vectorized lookups.
+
+    `positions()` resolves a whole column of codes to table rows with one
+    hash-index probe per distinct code, so lookups scale to millions of rows.
+    """
+
+    def __init__(self, tables):
+        self.tables = tables
+
+    def positions(self, name, codes):
+        """Row position in table `name` for each code (-1 if unknown or missing)."""
+        index = self.tables[name].index
+        if isinstance(codes.dtype, pd.CategoricalDtype):
+            found = index.get_indexer(codes.cat.categories.astype("string"))
+            found = np.append(found, -1)  # category code -1 means missing
+            return found[codes.cat.codes.to_numpy()]
+        return index.get_indexer(codes.astype("string"))
+
+    def field(self, name, field, positions):
+        """Values of `field` at `positions`, missing where the position is -1."""
+        values = self.tables[name][field]
+        out = values.iloc[np.maximum(positions, 0)].reset_index(drop=True)
+        return out.mask(positions < 0)
+
+
+@functools.lru_cache(maxsize=None)
+def load_catalog(ref_dir=REF_DIR, cache_path=DEFAULT_CATALOG_CACHE):
+    """Loads the catalog once per process, from a pickle while the CSVs are unchanged."""
+    fingerprint = catalog_fingerprint(ref_dir)
+    try:
+        with open(cache_path, "rb") as f:
+            cached = pickle.load(f)
+        if cached["fingerprint"] == fingerprint:
+            return ReferenceCatalog(cached["tables"])
+    except (OSError, pickle.UnpicklingError, EOFError, KeyError):
+        pass
+    tables = _build_tables(ref_dir)
+    # Each process writes its own temporary file and renames it into place,
+    # so parallel workers never read a half-written cache
+    tmp_path = f"{cache_path}.{os.getpid()}.partial"
+    try:
+        if os.path.dirname(cache_path):
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"fingerprint": fingerprint, "tables": tables}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        print(f"Warning: Could not cache reference catalog: {e}")
+    return ReferenceCatalog(tables)
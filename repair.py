@@ -0,0 +1,202 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from constraint_solver import parse_spec, solve
+from rate_limit import estimate_tokens
+from reference_catalog import load_catalog
+from shipment_schema import coerce, ingest
+
+# Columns the local solver can recompute; codes and IDs are left to the LLM
+SOLVED_COLUMNS = [
+    "pickupFromDateTime",
+    "pickupToDateTime",
+    "deliveryFromDateTime",
+    "deliveryToDateTime",
+    "totalWeightLbs",
+    "totalVolumeCuFt",
+    "totalPalletCount",
+    "totalCaseCount",
+]
+# Frame-level failures are sent to the LLM as the whole dataset up to this size
+REPAIR_MAX_ROWS = 200
+
+
+def repair_prompt(user_prompt, findings, rows, full):
+    """Compact prompt asking the model to correct `rows` of a failed dataset."""
+    records = rows.to_json(orient="records", date_format="iso")
+    if full:
+        goal = f"Return the complete corrected dataset for this request: {user_prompt}"
+    else:
+        goal = (
+            f"Return exactly {len(rows)} shipments: corrected replacements for the "
+            f"rows below, in the same order. Other rows already pass. "
+            f"The original request was: {user_prompt}"
+        )
+    return f"""
+    You are repairing a synthetic shipment dataset that failed validation.
+
+    ### Validation Findings
+    {findings}
+
+    ### The Goal
+    {goal}
+
+    ### Rows To Fix
+    {records}
+
+    ### Instructions
+    1. Output ONLY a valid JSON array of shipment objects with the same fields. No markdown blocks.
+    2. Change only what is needed to meet the request; keep codes and locations unless a finding names them.
+    """
+
+
+def local_fixup(user_prompt, df, columns, seed=0):
+    """Recomputes the solver-managed `columns` locally, or returns None.
+
+    Only works for prompts `parse_spec` understands. Descriptive fields are
+    kept from `df`; if the row count is wrong, rows are repeated or dropped
+    to match the requested count.
+    """
+    spec = parse_spec(user_prompt)
+    if not spec:
+        return None
+    solved = coerce(solve(spec, _facility(df), seed=seed)[0])
+    if len(df) == len(solved):
+        fixed = df.reset_index(drop=True).copy()
+    elif len(df):
+        fixed = df.iloc[np.resize(np.arange(len(df)), len(solved))]
+        fixed = fixed.reset_index(drop=True)
+        fixed["shipmentId"] = solved["shipmentId"]
+    else:
+        return solved
+    fix = [c for c in SOLVED_COLUMNS if c in columns]
+    fixed[fix] = solved[fix]
+    return fixed
+
+
+def _facility(df):
+    """Capacity of the dataset's equipment, so solved volumes still fit it,
+    and the dock schedule of its origin when it has just one."""
+    if not len(df):
+        return {}
+    catalog = load_catalog()
+    facility = {}
+    origins = df["shipFromLocationCode"].dropna().unique()
+    if len(origins) == 1 and origins[0] in catalog.tables["origins"].index:
+        row = catalog.tables["origins"].loc[origins[0]]
+        if pd.notna(row["dock_doors"]):
+            facility["dock_doors"] = int(row["dock_doors"])
+        facility["operating_hours"] = row["operating_hours"]
+    code = df["equipmentTypeCode"].iloc[0]
+    equipment = catalog.tables["equipment"]
+    if pd.isna(code) or code not in equipment.index:
+        return facility
+    row = equipment.loc[code]
+    facility["equipment_code"] = code
+    facility["equipment_options"] = [
+        (code, row["max_payload_lbs"], row["internal_volume_cuft"])
+    ]
+    return facility
+
+
+def _better(new, old):
+    # An ERROR result (validation crashed) has no failed checks but is no fix
+    if new["status"] == "ERROR":
+        return False
+    return new["status"] == "PASS" or new["failed"] < old["failed"]
+
+
+def _describe(result):
+    findings = "; ".join(result["findings"]) or "no specific findings"
+    return f"{result['failed']} of {result['checked']} checks failed: {findings}"
+
+
+class RepairStats:
+    """Per-scenario repair attempts, token spend and time."""
+
+    def __init__(self):
+        self.scenarios = {}
+
+    def summary(self):
+        if not self.scenarios:
+            return "Repairs: none needed"
+        s = self.scenarios.values()
+        repaired = sum(1 for r in s if r["attempts"] and r["status"] == "PASS")
+        return (
+            f"Repairs: {sum(1 for r in s if r['attempts'])} scenarios repaired "
+            f"({repaired} now pass), {sum(r['local'] for r in s)} local and "
+            f"{sum(r['llm'] for r in s)} LLM attempts, "
+            f"~{sum(r['tokens'] for r in s)} prompt tokens, "
+            f"{sum(r['seconds'] for r in s):.1f}s"
+        )
+
+
+async def repair_loop(
+    eval_id, user_prompt, df, validator, budget, ask, stats, full_tokens=0
+):
+    """Validates `df` and repairs it for up to `budget` attempts.
+
+    Attempts use `local_fixup` while it keeps reducing the failed checks;
+    otherwise the findings and offending rows are sent to the model via
+    `ask(label, prompt)` (an awaitable returning parsed JSON). A candidate is
+    kept only if it fails fewer checks. Returns (df, result).
+    """
+    start = time.monotonic()
+    result = validator(df)
+    entry = {"attempts": 0, "local": 0, "llm": 0, "tokens": 0, "seconds": 0.0}
+    initial = result["failed"]
+    use_local = True
+    while result["status"] != "PASS" and entry["attempts"] < budget:
+        entry["attempts"] += 1
+        candidate = None
+        if use_local:
+            candidate = local_fixup(
+                user_prompt, df, validator.columns, entry["attempts"]
+            )
+        if candidate is not None:
+            entry["local"] += 1
+            new = validator(candidate)
+        if candidate is None or not _better(new, result):
+            use_local = False
+            candidate = await _ask_model(
+                eval_id, user_prompt, df, result, validator, ask, entry
+            )
+            if candidate is None:
+                break
+            new = validator(candidate)
+        if _better(new, result):
+            df, result = candidate, new
+    entry["status"] = result["status"]
+    entry["seconds"] = time.monotonic() - start
+    stats.scenarios[eval_id] = entry
+    if entry["attempts"]:
+        baseline = f" (full prompt ~{full_tokens})" if full_tokens else ""
+        print(
+            f"{eval_id} repair: {initial} -> {result['failed']} failed checks in "
+            f"{entry['attempts']} attempt(s) ({entry['local']} local, {entry['llm']} LLM), "
+            f"~{entry['tokens']} prompt tokens{baseline}, {entry['seconds']:.1f}s"
+        )
+    return df, result
+
+
+async def _ask_model(eval_id, user_prompt, df, result, validator, ask, entry):
+    bad = validator.failing_rows(df)
+    full = len(bad) == 0
+    if full and len(df) > REPAIR_MAX_ROWS:
+        return None
+    rows = df if full else df.loc[bad]
+    prompt = repair_prompt(user_prompt, _describe(result), rows, full)
+    entry["llm"] += 1
+    entry["tokens"] += estimate_tokens(prompt)
+    data = await ask(f"{eval_id} repair {entry['attempts']}", prompt)
+    replacement, _ = ingest(data if isinstance(data, list) else [])
+    if full:
+        return replacement if len(replacement) else None
+    if len(replacement) != len(rows):
+        return None
+    # Replaced rows keep their position and shipmentId
+    replacement.index = bad
+    replacement["shipmentId"] = df.loc[bad, "shipmentId"].to_numpy()
+    return coerce(pd.concat([df.drop(index=bad), replacement]).loc[df.index])
@@ -0,0 +1,88 @@
+import argparse
+import os
+
+from response_cache import DEFAULT_CACHE_PATH, ResponseCache
+from telemetry import DEFAULT_TELEMETRY_PATH, Telemetry
+
+RESULTS_PATH = "Eval_result.xlsx"
+
+
+def telemetry_report(path, run_id=None):
+    if not os.path.exists(path):
+        print(f"No telemetry at {path}")
+        return
+    telemetry = Telemetry.load(path, run_id)
+    if not telemetry.events:
+        print(f"No telemetry events for run {run_id} in {path}")
+        return
+    print(f"Generation run {telemetry.run_id}")
+    print(telemetry.summary())
+
+
+def validation_report(path, limit=5):
+    if not os.path.exists(path):
+        print(f"No validation results at {path}")
+        return
+    import pandas as pd
+
+    results = pd.read_excel(path)
+    counts = results["Status"].value_counts()
+    print(
+        f"Validation results ({path}): "
+        + ", ".join(f"{status} {n}" for status, n in counts.items())
+    )
+    failed = results[~results["Status"].isin(["PASS"])]
+    for _, row in failed.head(limit).iterrows():
+        findings = str(row["Findings"]) if pd.notna(row["Findings"]) else ""
+        if len(findings) > 100:
+            findings = findings[:97] + "..."
+        print(f"  {row['Eval_Set_ID']}: {row['Status']} {findings}")
+    if len(failed) > limit:
+        print(f"  ... and {len(failed) - limit} more")
+
+
+def cache_report(path):
+    if not os.path.exists(path):
+        return
+    cache = ResponseCache(path)
+    entries = cache.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    print(
+        f"Response cache ({path}): {entries} responses, "
+        f"{cache.total_bytes() / 1024:.1f} KiB"
+    )
+    cache.close()
+
+
+def add_arguments(parser):
+    parser.add_argument(
+        "--telemetry", default=DEFAULT_TELEMETRY_PATH, help="Telemetry JSONL file"
+    )
+    parser.add_argument("--run-id", help="Telemetry run to report (default: latest)")
+    parser.add_argument(
+        "--results", default=RESULTS_PATH, help="Validation results workbook"
+    )
+    parser.add_argument(
+        "--cache-path", default=DEFAULT_CACHE_PATH, help="Response cache location"
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Summarise the last generation and validation runs."
+    )
+    add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    run(parse_args(argv))
+
+
+def run(args):
+    telemetry_report(args.telemetry, args.run_id)
+    validation_report(args.results)
+    cache_report(args.cache_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "responses.sqlite")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def config_fingerprint(config):
+    """Stable JSON form of a GenerateContentConfig (or plain dict)."""
+    if config is None:
+        return "null"
+    if hasattr(config, "model_dump"):
+        config = config.model_dump(mode="json", exclude_none=True)
+    return json.dumps(config, sort_keys=True, default=str)
+
+
+def cache_key(prompt, model, config):
+    """Content address of a generation request."""
+    h = hashlib.sha256()
+    for part in (model, config_fingerprint(config), prompt):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class ResponseCache:
+    """On-disk SQLite cache of raw LLM responses with size-based LRU eviction.
+
+    With `refresh=True` lookups always miss but fresh responses are still
+    stored, so a rerun repopulates the cache.
+    """
+
+    def __init__(
+        self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, refresh=False
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT,
+                size INTEGER,
+                created REAL,
+                last_access REAL
+            )""")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)"
+        )
+        self.conn.commit()
+
+    def get(self, key):
+        if self.refresh:
+            self.stats["misses"] += 1
+            return None
+        row = self.conn.execute(
+            "SELECT response FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+        self.conn.execute(
+            "UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key)
+        )
+        self.conn.commit()
+        self.stats["hits"] += 1
+        return row[0]
+
+    def put(self, key, model, response):
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+            (key, model, response, len(response.encode("utf-8")), now, now),
+        )
+        self.stats["writes"] += 1
+        self._evict()
+        self.conn.commit()
+
+    def total_bytes(self):
+        return self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def _evict(self):
+        excess = self.total_bytes() - self.max_bytes
+        if excess <= 0:
+            return
+        freed = 0
+        for key, size in self.conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access"
+        ).fetchall():
+            if freed >= excess:
+                break
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            freed += size
+            self.stats["evictions"] += 1
+
+    def summary(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        hit_rate = self.stats["hits"] / lookups if lookups else 0.0
+        return (
+            f"Cache: {self.stats['hits']} hits, {self.stats['misses']} misses "
+            f"({hit_rate:.0%} hit rate), {self.stats['writes']} writes, "
+            f"{self.stats['evictions']} evictions, {self.total_bytes() / 1024:.1f} KiB on disk"
+        )
+
+    def close(self):
+        self.conn.close()
@@ -1,38 +1,141 @@
+import argparse
+import functools
 import os
-import pandas as pd
-from validators import (
-    validate_eval_001,
-    validate_eval_002,
-    validate_eval_003,
-    validate_eval_004,
-    validate_eval_005,
-    validate_eval_006,
-    validate_eval_007,
-    validate_eval_008,
-    validate_eval_009,
-    validate_eval_010,
-    validate_eval_011,
-    validate_eval_012,
-)
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataset_paths import find_dataset
+from validation_cache import DEFAULT_VALIDATION_CACHE_PATH, ValidationCache
 from datetime import datetime
 
-VALIDATORS = {
-    "EVAL-001": validate_eval_001,
-    "EVAL-002": validate_eval_002,
-    "EVAL-003": validate_eval_003,
-    "EVAL-004": validate_eval_004,
-    "EVAL-005": validate_eval_005,
-    "EVAL-006": validate_eval_006,
-    "EVAL-007": validate_eval_007,
-    "EVAL-008": validate_eval_008,
-    "EVAL-009": validate_eval_009,
-    "EVAL-010": validate_eval_010,
-    "EVAL-011": validate_eval_011,
-    "EVAL-012": validate_eval_012,
-}
-
-
-def main():
+# pandas and the validators are imported on first use, so `--help` starts
+# quickly; worker processes compile the validators once each.
+
+
+@functools.lru_cache(maxsize=None)
+def get_validators():
+    from validators import build_validators
+
+    return build_validators()
+
+
+def result_row(val_res, start):
+    """Report columns for a validator's results; `start` is a perf_counter time."""
+    return {
+        "Status": val_res["status"],
+        "Total_Checks": val_res["checked"],
+        "Passed_Checks": val_res["passed"],
+        "Failed_Checks": val_res["failed"],
+        "Findings": "; ".join(val_res["findings"]),
+        "Seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def validate_file(eval_id, file_path, chunk_rows=None):
+    """Reads and validates one generated file; runs inside a worker process.
+
+    With `chunk_rows`, the file is read and validated that many rows at a
+    time instead of loaded whole.
+    """
+    from dataset_writer import read_dataset
+
+    start = time.perf_counter()
+    validator = get_validators().get(eval_id)
+    if not validator:
+        return {
+            "Status": "NOT RUN",
+            "Findings": "Validator not implemented",
+            "Seconds": round(time.perf_counter() - start, 3),
+        }
+    if chunk_rows:
+        return result_row(
+            validate_parts(eval_id, file_path, chunk_rows).results(), start
+        )
+    df = read_dataset(file_path, columns=validator.columns)
+    return result_row(validator(df), start)
+
+
+def validate_parts(eval_id, file_path, chunk_rows, parts=None):
+    """Validates a file (or just its `parts`) in chunks; returns the mergeable state."""
+    from dataset_writer import iter_dataset
+
+    validator = get_validators()[eval_id]
+    state = validator.chunked()
+    for df in iter_dataset(file_path, validator.columns, chunk_rows, parts):
+        state.update(df)
+    return state
+
+
+def part_groups(file_path, workers):
+    """Splits a file's parts into up to `workers` runs of consecutive parts.
+
+    Returns None when the file has a single part or can only be read front
+    to back (CSV, xlsx).
+    """
+    from dataset_writer import dataset_parts
+
+    parts = dataset_parts(file_path)
+    if not parts or len(parts) < 2 or workers < 2:
+        return None
+    n = min(workers, len(parts))
+    return [
+        list(range(i * len(parts) // n, (i + 1) * len(parts) // n)) for i in range(n)
+    ]
+
+
+def merge_parts(futures, start):
+    """Merges the states of a file's part groups, in order, into a report row."""
+    state = futures[0].result()
+    for future in futures[1:]:
+        state.merge(future.result())
+    return result_row(state.results(), start)
+
+
+def _replay(result, error):
+    if error is not None:
+        raise error
+    return result
+
+
+def add_arguments(parser):
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes for reading and validating files (1 runs serially)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-validate every file instead of reusing unchanged results",
+    )
+    parser.add_argument(
+        "--cache-path",
+        default=DEFAULT_VALIDATION_CACHE_PATH,
+        help="Validation result cache location",
+    )
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        help="Validate each file N rows at a time instead of loading it whole; "
+        "Parquet/Feather files are also split across the workers",
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Validate generated datasets.")
+    add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    run(parse_args(argv))
+
+
+def run(args):
+    import pandas as pd
+
+    validators = get_validators()
     results_list = []
 
     # Read Eval Set to get prompts
@@ -45,7 +148,7 @@ def main():
     for index, row in eval_meta.iterrows():
         eval_id = f"EVAL-{str(row['#']).zfill(3)}"
         user_prompt = row["User Prompt"]
-        file_path = os.path.join("generated_data", f"{eval_id}_Output.xlsx")
+        file_path = find_dataset("generated_data", eval_id)
 
         entry = {
             "Eval_Set_ID": eval_id,
@@ -55,33 +158,128 @@ def main():
             "Passed_Checks": 0,
             "Failed_Checks": 0,
             "Findings": "",
+            "Seconds": 0.0,
             "Timestamp": datetime.now().isoformat(),
         }
 
-        if os.path.exists(file_path):
-            try:
-                df = pd.read_excel(file_path)
-                validator = VALIDATORS.get(eval_id)
-                if validator:
-                    val_res = validator(df)
-                    entry["Status"] = val_res["status"]
-                    entry["Total_Checks"] = val_res["checked"]
-                    entry["Passed_Checks"] = val_res["passed"]
-                    entry["Failed_Checks"] = val_res["failed"]
-                    entry["Findings"] = "; ".join(val_res["findings"])
-                else:
-                    entry["Findings"] = "Validator not implemented"
-            except Exception as e:
-                entry["Status"] = "ERROR"
-                entry["Findings"] = str(e)
-        else:
+        if file_path is None:
             entry["Status"] = "MISSING"
             entry["Findings"] = "Output file not found"
+        results_list.append((entry, file_path))
+
+    start = time.perf_counter()
+    cache = None if args.no_cache else ValidationCache(args.cache_path)
+    pending = []
+    fingerprints = {}
+    for entry, path in results_list:
+        if entry["Status"] == "MISSING":
+            continue
+        eval_id = entry["Eval_Set_ID"]
+        validator = validators.get(eval_id)
+        if cache and validator:
+            fingerprints[eval_id] = cache.fingerprint(eval_id, path)
+            cached = cache.get(eval_id, fingerprints[eval_id], validator.version)
+            if cached is not None:
+                # Re-store so a touched but unchanged file is not hashed again
+                cache.put(
+                    eval_id, path, fingerprints[eval_id], validator.version, cached
+                )
+                entry.update(cached)
+                print(f"{eval_id}: {entry['Status']} (unchanged)")
+                continue
+        pending.append((entry, path))
+    workers = max(1, min(args.workers, len(pending) or 1))
+    if args.chunk_rows:
+        # Chunks of one large file can keep every worker busy
+        workers = max(1, args.workers)
+
+    def record(entry, outcome):
+        eval_id = entry["Eval_Set_ID"]
+        try:
+            result = outcome()
+        except Exception as e:
+            # A crashing file (or worker) becomes an ERROR row instead of aborting the run
+            entry["Status"] = "ERROR"
+            entry["Findings"] = str(e) or type(e).__name__
+        else:
+            entry.update(result)
+            if eval_id in fingerprints:
+                cache.put(
+                    eval_id,
+                    path_of[eval_id],
+                    fingerprints[eval_id],
+                    validators[eval_id].version,
+                    result,
+                )
+        print(f"{eval_id}: {entry['Status']} in {entry['Seconds']:.2f}s")
+
+    path_of = {entry["Eval_Set_ID"]: path for entry, path in pending}
+
+    def submit(pool, entry, path, size):
+        """Queues one file on `pool`; returns a callable that gives its result."""
+        eval_id = entry["Eval_Set_ID"]
+        groups = None
+        if args.chunk_rows and eval_id in validators:
+            groups = part_groups(path, size)
+        if groups:
+            parts = [
+                pool.submit(validate_parts, eval_id, path, args.chunk_rows, group)
+                for group in groups
+            ]
+            return functools.partial(merge_parts, parts, time.perf_counter())
+        return pool.submit(validate_file, eval_id, path, args.chunk_rows).result
+
+    if workers == 1:
+        for entry, path in pending:
+            record(
+                entry,
+                lambda: validate_file(entry["Eval_Set_ID"], path, args.chunk_rows),
+            )
+    else:
+        # eval_id -> (result, error), pool by pool. A worker that dies breaks
+        # its pool, so the files left without a result go to a fresh pool
+        # with one worker, where the first one to break it is the culprit.
+        settled = {}
+        queue = list(pending)
+        size = workers
+        while queue:
+            with ProcessPoolExecutor(max_workers=size) as pool:
+                outcomes = [
+                    (entry, submit(pool, entry, path, size)) for entry, path in queue
+                ]
+                blamed = size > 1
+                for entry, outcome in outcomes:
+                    eval_id = entry["Eval_Set_ID"]
+                    try:
+                        settled[eval_id] = (outcome(), None)
+                    except BrokenProcessPool as e:
+                        if not blamed:
+                            settled[eval_id] = (None, e)
+                            blamed = True
+                    except Exception as e:
+                        settled[eval_id] = (None, e)
+            queue = [
+                (entry, path)
+                for entry, path in queue
+                if entry["Eval_Set_ID"] not in settled
+            ]
+            if queue and size > 1:
+                print(f"A worker process died; retrying {len(queue)} file(s)")
+                size = 1
+        # Recorded in submission order so the report order is deterministic
+        for entry, _ in pending:
+            record(entry, functools.partial(_replay, *settled[entry["Eval_Set_ID"]]))
 
-        results_list.append(entry)
+    print(
+        f"Validated {len(pending)} files in {time.perf_counter() - start:.2f}s "
+        f"with {workers} worker(s)"
+    )
+    if cache:
+        print(cache.summary())
+        cache.close()
 
     # Save Results
-    results_df = pd.DataFrame(results_list)
+    results_df = pd.DataFrame([entry for entry, _ in results_list])
     results_df.to_excel("Eval_result.xlsx", index=False)
     print("Validation complete. Results saved to Eval_result.xlsx")
 
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+# Typed layout of the 16 shipment fields, shared by the generator, the dataset
+# readers/writers and the validators. Location and product codes repeat across
+# rows, so they are stored as categoricals; quantities are nullable 32-bit ints.
+SHIPMENT_SCHEMA = {
+    "shipmentId": "string",
+    "shipFromLocationCode": "category",
+    "city": "category",
+    "state": "category",
+    "zipCode": "category",
+    "countryCode": "category",
+    "commodityCode": "category",
+    "equipmentTypeCode": "category",
+    "pickupFromDateTime": "datetime64[ns]",
+    "pickupToDateTime": "datetime64[ns]",
+    "deliveryFromDateTime": "datetime64[ns]",
+    "deliveryToDateTime": "datetime64[ns]",
+    "totalWeightLbs": "Int32",
+    "totalVolumeCuFt": "Int32",
+    "totalPalletCount": "Int32",
+    "totalCaseCount": "Int32",
+}
+
+SHIPMENT_COLUMNS = list(SHIPMENT_SCHEMA)
+
+INT32_MAX = np.iinfo(np.int32).max
+
+# Trailing "Z" or "+05:00" offsets; timestamps keep their wall-clock time
+_TZ_SUFFIX = r"(?:Z|[+-]\d{2}:?\d{2})$"
+# Leading number of values such as "4,500 lbs"
+_NUMBER = r"^\s*(-?\d+(?:\.\d+)?)"
+
+
+def _to_int(col):
+    if col.dtype == object or pd.api.types.is_string_dtype(col):
+        text = col.astype("string").str.replace(",", "", regex=False)
+        col = text.str.extract(_NUMBER, expand=False)
+    values = pd.to_numeric(col, errors="coerce").round()
+    return values.where(values.abs() <= INT32_MAX).astype("Int32")
+
+
+def _to_datetime(col, dtype):
+    if col.dtype == object or pd.api.types.is_string_dtype(col):
+        col = col.astype("string").str.strip().str.replace(_TZ_SUFFIX, "", regex=True)
+        values = pd.to_datetime(col, errors="coerce", format="ISO8601")
+        retry = values.isna() & col.notna()
+        if retry.any():
+            # Slow per-value parsing only for the non-ISO stragglers
+            values[retry] = pd.to_datetime(col[retry], errors="coerce", format="mixed")
+        return values.astype(dtype)
+    if isinstance(col.dtype, pd.DatetimeTZDtype):
+        return col.dt.tz_localize(None).astype(dtype)
+    return pd.to_datetime(col, errors="coerce").astype(dtype)
+
+
+def _to_text(col, dtype):
+    if pd.api.types.is_float_dtype(col) and (col.dropna() % 1 == 0).all():
+        # Codes such as zip codes come back as floats when a value is missing
+        return col.astype("Int64").astype("string").astype(dtype)
+    if col.dtype == object:
+        # Nested values cannot be stored in a text column
+        col = col.map(
+            lambda v: str(v) if isinstance(v, (dict, list)) else v, na_action="ignore"
+        )
+    return col.astype("string").astype(dtype)
+
+
+def coerce_column(col, name):
+    """Converts `col` to the schema dtype of column `name`; unparseable values become missing."""
+    dtype = SHIPMENT_SCHEMA[name]
+    if str(col.dtype) == dtype:
+        return col
+    if dtype == "Int32":
+        return _to_int(col)
+    if dtype.startswith("datetime64"):
+        return _to_datetime(col, dtype)
+    return _to_text(col, dtype)
+
+
+def coerce(df, columns=None):
+    """Returns `df` restricted to schema `columns` (default: all), in order and typed.
+
+    Missing columns are added empty.
+    """
+    columns = columns or SHIPMENT_COLUMNS
+    out = pd.DataFrame(index=df.index)
+    for c in columns:
+        col = (
+            df[c] if c in df.columns else pd.Series(None, index=df.index, dtype=object)
+        )
+        out[c] = coerce_column(col, c)
+    return out
+
+
+def ingest(records, offset=0):
+    """Builds a typed frame from raw LLM records, repairing what it can.
+
+    Numbers written as text ("4,500 lbs"), fractional quantities, timezone
+    suffixes and non-ISO timestamps are repaired. Records that are not
+    objects, or that hold a value which still cannot be parsed, are rejected.
+    Returns (df, issues) where `issues` describes each rejected record by its
+    position (plus `offset`, for records that are part of a longer stream).
+    """
+    issues = []
+    rows = []
+    positions = []
+    for i, record in enumerate(records, offset):
+        if isinstance(record, dict):
+            rows.append(record)
+            positions.append(i)
+        else:
+            issues.append(f"record {i}: not an object")
+    raw = pd.DataFrame(rows, columns=SHIPMENT_COLUMNS)
+    # Blank strings count as missing rather than malformed
+    for c in raw.columns:
+        if raw[c].dtype == object or pd.api.types.is_string_dtype(raw[c]):
+            blank = raw[c].astype("string").str.strip().eq("").fillna(False)
+            raw[c] = raw[c].mask(blank)
+    df = coerce(raw)
+    bad = raw.notna().to_numpy() & df.isna().to_numpy()
+    for i in np.flatnonzero(bad.any(axis=1)):
+        fields = [c for c, b in zip(SHIPMENT_COLUMNS, bad[i]) if b]
+        values = ", ".join(f"{c}={raw.iloc[i][c]!r}" for c in fields)
+        issues.append(f"record {positions[i]}: unparseable {values}")
+    df = df[~bad.any(axis=1)].reset_index(drop=True)
+    return df, issues
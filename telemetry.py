@@ -0,0 +1,135 @@
+import json
+import os
+import time
+
+DEFAULT_TELEMETRY_PATH = "telemetry.jsonl"
+
+# USD per 1M tokens (input, output); thinking tokens are billed as output
+MODEL_PRICES = {
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+
+def usage_tokens(response):
+    """(prompt, output) token counts from a response's usage_metadata, or Nones."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None, None
+    prompt = getattr(usage, "prompt_token_count", None)
+    output = [
+        getattr(usage, name, None)
+        for name in ("candidates_token_count", "thoughts_token_count")
+    ]
+    output = [n for n in output if n is not None]
+    return prompt, sum(output) if output else None
+
+
+def _percentiles(values):
+    if not values:
+        return "n/a"
+    import numpy as np  # deferred: only needed for the end-of-run summary
+
+    p50, p95 = np.percentile(values, [50, 95])
+    return f"p50 {p50:.3f}s / p95 {p95:.3f}s"
+
+
+class Telemetry:
+    """Structured per-attempt, per-request and per-write events.
+
+    Events are kept in memory for `summary()` and, when `path` is given,
+    appended to it as JSON lines tagged with this run's `run_id`.
+    """
+
+    def __init__(self, path=None, model=None):
+        self.path = path
+        self.model = model
+        # The pid keeps workers started in the same second apart
+        self.run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self.events = []
+        self._file = None
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+
+    @classmethod
+    def load(cls, path, run_id=None, model=None):
+        """Telemetry holding the events of run `run_id` (default: the latest) in `path`."""
+        telemetry = cls(model=model)
+        events = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    events.append(json.loads(line))
+        if events:
+            telemetry.run_id = run_id or events[-1]["run_id"]
+            telemetry.events = [e for e in events if e["run_id"] == telemetry.run_id]
+        return telemetry
+
+    def record(self, event, **fields):
+        entry = {"run_id": self.run_id, "ts": round(time.time(), 3), "event": event}
+        entry.update(
+            (k, round(v, 4) if isinstance(v, float) else v) for k, v in fields.items()
+        )
+        self.events.append(entry)
+        if self._file:
+            self._file.write(json.dumps(entry, default=str) + "\n")
+            self._file.flush()
+
+    def _values(self, event, field, **match):
+        return [
+            e[field]
+            for e in self.events
+            if e["event"] == event
+            and e.get(field) is not None
+            and all(e.get(k) == v for k, v in match.items())
+        ]
+
+    def cost(self):
+        """Estimated USD spent, priced per attempt by the model that answered.
+
+        Versioned model names (e.g. "gemini-2.5-flash-001") use the price of
+        their longest listed prefix; unknown models count as free.
+        """
+        total = 0.0
+        for e in self.events:
+            if e["event"] != "attempt":
+                continue
+            model = e.get("model") or self.model or ""
+            names = [name for name in MODEL_PRICES if model.startswith(name)]
+            if not names:
+                continue
+            price_in, price_out = MODEL_PRICES[max(names, key=len)]
+            total += (e.get("prompt_tokens") or 0) * price_in
+            total += (e.get("output_tokens") or 0) * price_out
+        return total / 1e6
+
+    def summary(self):
+        requests = [e for e in self.events if e["event"] == "request"]
+        attempts = [e for e in self.events if e["event"] == "attempt"]
+        prompt_tokens = sum(self._values("attempt", "prompt_tokens"))
+        output_tokens = sum(self._values("attempt", "output_tokens"))
+        # Cache hits cost no tokens, so they do not count towards the average
+        shipments = sum(self._values("request", "shipments", cached=False))
+        per_shipment = output_tokens / shipments if shipments else 0.0
+        lines = [
+            f"Telemetry: {len(requests)} requests, {len(attempts)} attempts "
+            f"({sum(e.get('retries', 0) for e in requests)} retries), "
+            f"throttled {sum(self._values('request', 'throttled_s')):.1f}s",
+            f"  Latency per attempt {_percentiles(self._values('attempt', 'latency_s'))}; "
+            f"TTFT {_percentiles(self._values('attempt', 'ttft_s'))}",
+            f"  Parse {_percentiles(self._values('attempt', 'parse_s'))}; "
+            f"write {_percentiles(self._values('write', 'write_s'))}",
+            f"  Tokens: {prompt_tokens} prompt + {output_tokens} output "
+            f"(~{per_shipment:.0f} output tokens/shipment); "
+            f"est. cost ${self.cost():.4f}",
+        ]
+        if self.path:
+            lines.append(f"  Events appended to {self.path}")
+        return "\n".join(lines)
+
+    def close(self):
+        if self._file:
+            self._file.close()
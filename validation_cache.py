@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+DEFAULT_VALIDATION_CACHE_PATH = os.path.join(".cache", "validations.sqlite")
+
+
+def file_hash(path, block_size=1 << 20):
+    """SHA-256 of a file's contents."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ValidationCache:
+    """SQLite store of validation results keyed by data hash and validator version.
+
+    A dataset is re-validated only when its contents or its validator change.
+    Files whose size and mtime match the stored entry reuse the stored hash
+    instead of being read again.
+    """
+
+    def __init__(self, path=DEFAULT_VALIDATION_CACHE_PATH):
+        self.path = path
+        self.stats = {"hits": 0, "misses": 0, "hashed": 0}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS results (
+                eval_id TEXT PRIMARY KEY,
+                file_path TEXT,
+                size INTEGER,
+                mtime_ns INTEGER,
+                data_hash TEXT,
+                validator_version TEXT,
+                result TEXT,
+                updated REAL
+            )""")
+        self.conn.commit()
+
+    def fingerprint(self, eval_id, file_path):
+        """Returns (size, mtime_ns, data_hash) for the file validated as `eval_id`."""
+        st = os.stat(file_path)
+        row = self.conn.execute(
+            "SELECT file_path, size, mtime_ns, data_hash FROM results WHERE eval_id = ?",
+            (eval_id,),
+        ).fetchone()
+        if row and row[:3] == (file_path, st.st_size, st.st_mtime_ns):
+            return st.st_size, st.st_mtime_ns, row[3]
+        self.stats["hashed"] += 1
+        return st.st_size, st.st_mtime_ns, file_hash(file_path)
+
+    def get(self, eval_id, fingerprint, version):
+        row = self.conn.execute(
+            "SELECT data_hash, validator_version, result FROM results WHERE eval_id = ?",
+            (eval_id,),
+        ).fetchone()
+        if row is None or row[:2] != (fingerprint[2], version):
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return json.loads(row[2])
+
+    def put(self, eval_id, file_path, fingerprint, version, result):
+        size, mtime_ns, data_hash = fingerprint
+        self.conn.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                eval_id,
+                file_path,
+                size,
+                mtime_ns,
+                data_hash,
+                version,
+                json.dumps(result),
+                time.time(),
+            ),
+        )
+        self.conn.commit()
+
+    def summary(self):
+        return (
+            f"Validation cache: {self.stats['hits']} reused, "
+            f"{self.stats['misses']} re-validated, {self.stats['hashed']} files hashed"
+        )
+
+    def close(self):
+        self.conn.close()
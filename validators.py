@@ -1,382 +1,989 @@
-import pandas as pd
+import hashlib
+import json
+import os
+
 import numpy as np
-from datetime import datetime, timedelta
+import pandas as pd
+from shipment_schema import SHIPMENT_SCHEMA, coerce_column
+from reference_catalog import REF_DIR, catalog_fingerprint, load_catalog
+import geo_index
+import reference_catalog
+import shipment_schema
+import window_conflicts
+from geo_index import load_geo_index, min_transit_hours
+from window_conflicts import outside_hours, over_capacity
+
+# Validators are compiled from the declarative rules in references/Eval_rules.json.
+# Each rule is evaluated as a vectorized column operation over the whole frame;
+# parsed columns and aggregates are computed once per frame and shared by every
+# rule that needs them.
+
+RULES_PATH = os.path.join("references", "Eval_rules.json")
+
+# Changes to the engine itself invalidate cached validation results too, as
+# do changes to the reference data (see `compile_rules`)
+_engine = hashlib.sha256()
+for _path in (
+    __file__,
+    geo_index.__file__,
+    reference_catalog.__file__,
+    shipment_schema.__file__,
+    window_conflicts.__file__,
+):
+    with open(_path, "rb") as _f:
+        _engine.update(_f.read())
+ENGINE_VERSION = _engine.hexdigest()
+
+
+def _new_results():
+    return {"status": "PASS", "findings": [], "checked": 0, "passed": 0, "failed": 0}
+
+
+def _check(results, ok, finding=None):
+    """Records one check."""
+    results["checked"] += 1
+    if ok:
+        results["passed"] += 1
+    else:
+        results["failed"] += 1
+        results["status"] = "FAIL"
+        if finding:
+            results["findings"].append(finding)
+
+
+def _as_bool(mask):
+    """Boolean array of `mask`, treating missing values (nullable dtypes) as failures."""
+    if isinstance(mask, pd.Series):
+        mask = mask.fillna(False)
+    return np.asarray(mask, dtype=bool)
+
+
+def _check_rows(results, mask, describe=None):
+    """Records one check per row; `describe(i)` renders a finding for failed row i."""
+    mask = _as_bool(mask)
+    failed = int((~mask).sum())
+    results["checked"] += len(mask)
+    results["passed"] += len(mask) - failed
+    if failed:
+        results["failed"] += failed
+        results["status"] = "FAIL"
+        if describe:
+            results["findings"].extend(describe(i) for i in np.flatnonzero(~mask))
+
+
+def _fail(results, count=1, status=True):
+    """Counts failures without counting checks (kept from the original scoring)."""
+    if count:
+        results["failed"] += count
+        if status:
+            results["status"] = "FAIL"
 
 
-def validate_eval_001(df):
-    results = {"status": "PASS", "findings": [], "checked": 0, "passed": 0, "failed": 0}
-    try:
-        results["checked"] += 1
-        if len(df) != 5:
-            results["failed"] += 1
-            results["status"] = "FAIL"
-            results["findings"].append(f"Expected 5 shipments, found {len(df)}")
-        else:
-            results["passed"] += 1
-
-        for i, row in df.iterrows():
-            results["checked"] += 1
-            if row["totalWeightLbs"] != 4500:
-                results["failed"] += 1
-                results["status"] = "FAIL"
-                results["findings"].append(
-                    f"Row {i} weight {row['totalWeightLbs']} != 4500"
-                )
-            else:
-                results["passed"] += 1
-    except Exception as e:
-        results["status"] = "ERROR"
-        results["findings"].append(str(e))
-    return results
-
-
-def validate_eval_002(df):
-    results = {"status": "PASS", "findings": [], "checked": 0, "passed": 0, "failed": 0}
-    try:
-        results["checked"] += 1
-        if len(df) != 8:
-            results["failed"] += 1
-            results["status"] = "FAIL"
-        else:
-            results["passed"] += 1
-
-        for i, row in df.iterrows():
-            results["checked"] += 1
-            if not (3000 <= row["totalWeightLbs"] <= 5000):
-                results["failed"] += 1
-                results["status"] = "FAIL"
-            else:
-                results["passed"] += 1
-    except Exception as e:
-        results["status"] = "ERROR"
-    return results
-
-
-def validate_eval_003(df):
-    results = {"status": "PASS", "findings": [], "checked": 0, "passed": 0, "failed": 0}
-    try:
-        if len(df) != 6:
-            results["failed"] += 1
-            results["status"] = "FAIL"
-        else:
-            results["passed"] += 1
+class FrameContext:
+    """Per-frame memo of parsed columns and aggregates shared across rules."""
 
-        results["checked"] += 1
-        if df["totalWeightLbs"].sum() != 30000:
-            results["failed"] += 1
-            results["status"] = "FAIL"
-        else:
-            results["passed"] += 1
-    except Exception as e:
-        results["status"] = "ERROR"
-    return results
+    def __init__(self, df, ref_dir=REF_DIR):
+        self.df = df
+        self.ref_dir = ref_dir
+        self._memo = {}
 
+    def _get(self, key, compute):
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
 
-def validate_eval_004(df):
-    results = {"status": "PASS", "findings": [], "checked": 0, "passed": 0, "failed": 0}
-    try:
-        if len(df) != 12:
-            results["failed"] += 1
-            results["status"] = "FAIL"
-        for i, row in df.iterrows():
-            results["checked"] += 2
-            if not (4000 <= row["totalWeightLbs"] <= 5000):
-                results["failed"] += 1
-                results["status"] = "FAIL"
-            else:
-                results["passed"] += 1
-            if not (2800 <= row["totalVolumeCuFt"] <= 3200):
-                results["failed"] += 1
-                results["status"] = "FAIL"
-            else:
-                results["passed"] += 1
-    except:
-        results["status"] = "ERROR"
-    return results
-
-
-def validate_eval_005(df):
-    results = {"status": "PASS", "findings": [], "checked": 0, "passed": 0, "failed": 0}
-    try:
-        if len(df) != 15:
-            results["failed"] += 1
-            results["status"] = "FAIL"
-        for i, row in df.iterrows():
-            results["checked"] += 2
-            if not (22 <= row["totalPalletCount"] <= 26):
-                results["failed"] += 1
-                results["status"] = "FAIL"
-            else:
-                results["passed"] += 1
-            if not (1320 <= row["totalCaseCount"] <= 1560):
-                results["failed"] += 1
-                results["status"] = "FAIL"
-            else:
-                results["passed"] += 1
-    except:
-        results["status"] = "ERROR"
-    return results
-
-
-def validate_eval_006(df):
-    results = {"status": "PASS", "findings": [], "checked": 0, "passed": 0, "failed": 0}
-    try:
-        if len(df) != 10:
-            results["failed"] += 1
-            results["status"] = "FAIL"
-        for i, row in df.iterrows():
-            results["checked"] += 4
-            if row["totalWeightLbs"] != 5000:
-                results["failed"] += 1
-                results["status"] = "FAIL"
-            else:
-                results["passed"] += 1
-            if row["totalVolumeCuFt"] != 3000:
-                results["failed"] += 1
-                results["status"] = "FAIL"
-            else:
-                results["passed"] += 1
-            if row["totalPalletCount"] != 24:
-                results["failed"] += 1
-                results["status"] = "FAIL"
-            else:
-                results["passed"] += 1
-            if row["totalCaseCount"] != 1440:
-                results["failed"] += 1
-                results["status"] = "FAIL"
-            else:
-                results["passed"] += 1
-    except:
-        results["status"] = "ERROR"
-    return results
-
-
-def validate_eval_007(df):
-    results = {"status": "PASS", "findings": [], "checked": 0, "passed": 0, "failed": 0}
-    try:
-        if len(df) != 12:
-            results["failed"] += 1
-            results["status"] = "FAIL"
-        windows = []
-        for i, row in df.iterrows():
-            d_start = pd.to_datetime(row["deliveryFromDateTime"])
-            d_end = pd.to_datetime(row["deliveryToDateTime"])
-            duration = (d_end - d_start).total_seconds() / 3600
-
-            results["checked"] += 1
-            if not (1.9 <= duration <= 2.1):
-                results["failed"] += 1
-                results["status"] = "FAIL"
-                results["findings"].append(f"Row {i} dur {duration}")
-            else:
-                results["passed"] += 1
-
-            results["checked"] += 1
-            if d_start.hour not in [6, 9, 12, 15, 18]:
-                results["failed"] += 1
-                results["status"] = "FAIL"
-            else:
-                results["passed"] += 1
-
-            windows.append((d_start, d_end))
-
-        # Overlap
-        results["checked"] += 1
-        windows.sort()
-        overlap = False
-        for k in range(len(windows) - 1):
-            if windows[k][1] > windows[k + 1][0]:
-                overlap = True
-        if overlap:
-            results["failed"] += 1
-            results["status"] = "FAIL"
-            results["findings"].append("Overlap")
-        else:
-            results["passed"] += 1
-    except Exception as e:
-        results["status"] = "ERROR"
-        results["findings"].append(str(e))
-    return results
-
-
-def validate_eval_008(df):
-    results = {"status": "PASS", "findings": [], "checked": 0, "passed": 0, "failed": 0}
-    try:
-        if len(df) != 15:
-            results["failed"] += 1
-        weights = df["totalWeightLbs"].tolist()
-
-        results["checked"] += 1
-        if sum(weights) != 90000:
-            results["failed"] += 1
-            results["status"] = "FAIL"
-            results["findings"].append(f"Sum {sum(weights)}")
-        else:
-            results["passed"] += 1
+    def column(self, name):
+        """Column `name` with its schema dtype (a no-op for frames read via the schema)."""
+        if name not in SHIPMENT_SCHEMA:
+            return self.df[name]
+        return self._get(("column", name), lambda: coerce_column(self.df[name], name))
 
-        for w in weights:
-            if w % 500 != 0:
-                results["failed"] += 1
-                results["status"] = "FAIL"
+    def agg(self, name, how):
+        def compute():
+            col = self.column(name)
+            value = col.std(ddof=0) if how == "std" else getattr(col, how)()
+            return np.nan if pd.isna(value) else value
 
-        results["checked"] += 1
-        if not (1100 <= np.std(weights) <= 1300):
-            results["failed"] += 1
-            results["status"] = "FAIL"
-        else:
-            results["passed"] += 1
+        return self._get(("agg", name, how), compute)
 
-        results["checked"] += 1
-        if len(set(weights)) != len(weights):
-            results["failed"] += 1
-            results["status"] = "FAIL"
-        else:
-            results["passed"] += 1
-    except Exception as e:
-        results["status"] = "ERROR"
-    return results
+    def datetime(self, name):
+        col = self.column(name)
+        if pd.api.types.is_datetime64_dtype(col):
+            return col
+        return self._get(("datetime", name), lambda: pd.to_datetime(col))
 
+    def day(self, name):
+        return self._get(("day", name), lambda: self.datetime(name).dt.normalize())
 
-def validate_eval_009(df):
-    results = {"status": "PASS", "findings": [], "checked": 0, "passed": 0, "failed": 0}
-    try:
-        if len(df) != 20:
-            results["failed"] += 1
-            results["status"] = "FAIL"
+    def days(self, name):
+        """Distinct days of a date column, in order; missing dates are not a day."""
+        return self._get(
+            ("days", name), lambda: sorted(self.day(name).dropna().unique())
+        )
 
-        tot_pal = df["totalPalletCount"].sum()
-        tot_cas = df["totalCaseCount"].sum()
-        tot_w = df["totalWeightLbs"].sum()
-        tot_v = df["totalVolumeCuFt"].sum()
+    def lookup(self, reference, key):
+        """Row positions of column `key`'s codes in reference table `reference`."""
+        return self._get(
+            ("lookup", reference, key),
+            lambda: load_catalog(self.ref_dir).positions(reference, self.column(key)),
+        )
 
-        results["checked"] += 1
-        if tot_pal == 0 or abs(tot_cas / tot_pal - 60) > 0.1:
-            results["failed"] += 1
-            results["status"] = "FAIL"
-        else:
-            results["passed"] += 1
+    def reference_field(self, reference, key, field):
+        return self._get(
+            ("reference_field", reference, key, field),
+            lambda: load_catalog(self.ref_dir).field(
+                reference, field, self.lookup(reference, key)
+            ),
+        )
 
-        results["checked"] += 1
-        if tot_v == 0 or abs(tot_w / tot_v - 1.8) > 0.1:
-            results["failed"] += 1
-            results["status"] = "FAIL"
-        else:
-            results["passed"] += 1
+    def daily_sum(self, date_column, name):
+        return self._get(
+            ("daily_sum", date_column, name),
+            # Widened so per-day totals of 32-bit columns cannot overflow
+            lambda: self.column(name)
+            .astype("Int64")
+            .groupby(self.day(date_column))
+            .sum()
+            .reindex(self.days(date_column)),
+        )
 
-        results["checked"] += 1
-        if abs(df["totalPalletCount"].mean() - 24) > 0.5:
-            results["failed"] += 1
-            results["status"] = "FAIL"
-        else:
-            results["passed"] += 1
-
-        for w in df["totalWeightLbs"]:
-            if not (5000 <= w <= 8000):
-                results["failed"] += 1
-                results["status"] = "FAIL"
-    except Exception as e:
-        results["status"] = "ERROR"
-    return results
-
-
-def validate_eval_010(df):
-    results = {"status": "PASS", "findings": [], "checked": 0, "passed": 0, "failed": 0}
-    try:
-        if len(df) != 18:
-            results["failed"] += 1
-            results["status"] = "FAIL"
-        w_sorted = sorted(df["totalWeightLbs"].tolist())
-        diffs = [w_sorted[i + 1] - w_sorted[i] for i in range(len(w_sorted) - 1)]
-        results["checked"] += 1
-        if len(set(diffs)) > 1:
-            results["failed"] += 1
-            results["status"] = "FAIL"
-        else:
-            results["passed"] += 1
 
-        results["checked"] += 1
-        if sum(w_sorted) != 108000:
-            results["failed"] += 1
-            results["status"] = "FAIL"
-        else:
-            results["passed"] += 1
-    except Exception as e:
-        results["status"] = "ERROR"
-    return results
-
-
-def validate_eval_011(df):
-    results = {"status": "PASS", "findings": [], "checked": 0, "passed": 0, "failed": 0}
-    try:
-        if len(df) != 15:
-            results["failed"] += 1
-        expected_pals = sorted([8, 13, 21, 34, 55] * 3)
-        actual_pals = sorted(df["totalPalletCount"].tolist())
-
-        results["checked"] += 1
-        if actual_pals != expected_pals:
-            results["failed"] += 1
-            results["status"] = "FAIL"
-        else:
-            results["passed"] += 1
+# Each rule returns (ok, value). `ok` is a bool for frame-level rules or a
+# boolean Series (one entry per row or per day) for row-level rules; `value`
+# is what findings report as {actual} or {value}.
 
-        expected_cases = 18000
-        results["checked"] += 1
-        if abs(df["totalCaseCount"].sum() - 18000) > 100:
-            results["failed"] += 1
-            results["status"] = "FAIL"
-        else:
-            results["passed"] += 1
 
-    except Exception as e:
-        results["status"] = "ERROR"
-    return results
+def _row_count(ctx, rule):
+    return len(ctx.df) == rule["equals"], len(ctx.df)
 
 
-def validate_eval_012(df):
-    results = {"status": "PASS", "findings": [], "checked": 0, "passed": 0, "failed": 0}
-    try:
-        df["date"] = pd.to_datetime(df["pickupFromDateTime"]).dt.date
-        days = sorted(df["date"].unique())
+def _equals(ctx, rule):
+    col = ctx.column(rule["column"])
+    return col == rule["value"], col
 
-        results["checked"] += 1
-        if len(days) != 7:
-            results["failed"] += 1
-            results["status"] = "FAIL"
+
+def _range(ctx, rule):
+    col = ctx.column(rule["column"])
+    return col.between(rule["min"], rule["max"]), col
+
+
+def _multiple_of(ctx, rule):
+    col = ctx.column(rule["column"])
+    return col % rule["value"] == 0, col
+
+
+def _near(actual, rule):
+    if "tolerance" in rule:
+        return not abs(actual - rule["equals"]) > rule["tolerance"]
+    if "equals" in rule:
+        return actual == rule["equals"]
+    return rule["min"] <= actual <= rule["max"]
+
+
+def _aggregate(ctx, rule):
+    actual = ctx.agg(rule["column"], rule["agg"])
+    return _near(actual, rule), actual
+
+
+def _ratio(ctx, rule):
+    num = ctx.agg(rule["numerator"], "sum")
+    den = ctx.agg(rule["denominator"], "sum")
+    if den == 0:
+        return False, None
+    return _near(num / den, rule), num / den
+
+
+def _unique(ctx, rule):
+    col = ctx.column(rule["column"])
+    return col.nunique(dropna=False) == len(col), col.nunique(dropna=False)
+
+
+def _values(ctx, name):
+    return ctx.column(name).to_numpy(dtype=float, na_value=np.nan)
+
+
+def _arithmetic_sequence(ctx, rule):
+    diffs = np.diff(np.sort(_values(ctx, rule["column"])))
+    return np.unique(diffs).size <= 1, diffs
+
+
+def _sorted_equals(ctx, rule):
+    actual = np.sort(_values(ctx, rule["column"]))
+    return np.array_equal(actual, np.sort(np.array(rule["values"]))), actual
+
+
+def _duration_hours(ctx, rule):
+    start = ctx.datetime(rule["start"])
+    end = ctx.datetime(rule["end"])
+    return (end - start).dt.total_seconds() / 3600
+
+
+def _window_duration(ctx, rule):
+    duration = _duration_hours(ctx, rule)
+    return duration.between(rule["min_hours"], rule["max_hours"]), duration
+
+
+def _start_hour_in(ctx, rule):
+    hour = ctx.datetime(rule["column"]).dt.hour
+    return hour.isin(rule["hours"]), hour
+
+
+def _no_overlap(ctx, rule):
+    # Sort windows by (start, end) and compare each end with the next start
+    start = ctx.datetime(rule["start"]).to_numpy()
+    end = ctx.datetime(rule["end"]).to_numpy()
+    order = np.lexsort((end, start))
+    return not (end[order][:-1] > start[order][1:]).any(), None
+
+
+def _day_count(ctx, rule):
+    days = ctx.days(rule["date_column"])
+    return len(days) == rule["equals"], len(days)
+
+
+def _per_day_count(ctx, rule):
+    date_column = rule["date_column"]
+    per_day = ctx.day(date_column).value_counts().reindex(ctx.days(date_column))
+    return per_day == rule["equals"], per_day
+
+
+def _per_day_categories(ctx, rule):
+    """Each day holds exactly one row from every category range."""
+    date_column = rule["date_column"]
+    col = ctx.column(rule["column"])
+    categories = rule["categories"]
+    category = pd.Series(
+        np.select(
+            [
+                col.between(lo, hi).fillna(False).to_numpy(bool)
+                for lo, hi in categories.values()
+            ],
+            list(categories),
+            default="",
+        ),
+        index=ctx.df.index,
+    )
+    counts = pd.crosstab(ctx.day(date_column), category).reindex(
+        index=ctx.days(date_column), columns=list(categories), fill_value=0
+    )
+    return counts.eq(1).all(axis=1), counts
+
+
+def _increasing_daily_totals(ctx, rule):
+    totals = ctx.daily_sum(rule["date_column"], rule["column"]).to_numpy()
+    return bool((np.diff(totals) > 0).all()), totals
+
+
+def _known_code(ctx, rule):
+    unknown = int((ctx.lookup(rule["reference"], rule["column"]) < 0).sum())
+    return unknown == 0, unknown
+
+
+def _normalized(values):
+    return pd.Series(values, dtype="string").str.strip().str.casefold().to_numpy()
+
+
+def _matches_reference(ctx, rule):
+    """Column agrees with the reference row its `key` code points to.
+
+    Compared once per distinct (reference row, value) pair, not per row.
+    """
+    positions = ctx.lookup(rule["reference"], rule["key"])
+    codes, uniques = pd.factorize(ctx.column(rule["column"]))
+    inverse, pairs = pd.factorize(
+        positions.astype(np.int64) * (len(uniques) + 1) + codes + 1
+    )
+    pair_rows, pair_codes = np.divmod(pairs, len(uniques) + 1)
+    table = load_catalog(ctx.ref_dir).tables[rule["reference"]]
+    expected = _normalized(table[rule["field"]].to_numpy())[np.maximum(pair_rows, 0)]
+    actual = np.append(_normalized(np.asarray(uniques, dtype=object)), pd.NA)
+    actual = actual[pair_codes - 1]
+    bad = pd.array(expected, dtype="string") != pd.array(actual, dtype="string")
+    bad = np.asarray(bad.fillna(True), dtype=bool) & (pair_rows >= 0)
+    mismatched = int(bad[inverse].sum())
+    return mismatched == 0, mismatched
+
+
+def _within_reference(ctx, rule):
+    """Column does not exceed the reference limit its `key` code points to."""
+    limit = ctx.reference_field(rule["reference"], rule["key"], rule["field"])
+    values = ctx.column(rule["column"]).reset_index(drop=True)
+    over = int(values.gt(limit).fillna(False).sum())
+    return over == 0, over
+
+
+def _dock_capacity(ctx, rule):
+    """No window starts while every place at its `key` location is taken.
+
+    A location's capacity is its reference `field` (dock doors); locations
+    without one are not limited.
+    """
+    capacity = ctx.reference_field(rule["reference"], rule["key"], rule["field"])
+    over = over_capacity(
+        ctx.datetime(rule["start"]),
+        ctx.datetime(rule["end"]),
+        ctx.column(rule["key"]),
+        capacity.to_numpy(float),
+    )
+    return not over.any(), int(over.sum())
+
+
+def _within_hours(ctx, rule):
+    """Windows fit the operating hours (reference `field`) of their `key` location."""
+    hours = ctx.reference_field(rule["reference"], rule["key"], rule["field"])
+    outside = int(
+        outside_hours(
+            ctx.datetime(rule["start"]), ctx.datetime(rule["end"]), hours
+        ).sum()
+    )
+    return outside == 0, outside
+
+
+def _transit_time(ctx, rule):
+    """Deliveries end no sooner after pickup than the lane distance allows.
+
+    The lane runs from the `key` origin to the closest facility at the
+    `destination` place (a city, metro area or state in Origins.csv).
+    """
+    geo = load_geo_index(ctx.ref_dir)
+    if not len(geo.places(rule["destination"])):
+        raise ValueError(f"Unknown destination: {rule['destination']}")
+    # Lanes are measured once per distinct origin, not per row
+    inverse, positions = pd.factorize(ctx.lookup("origins", rule["key"]))
+    catalog = load_catalog(ctx.ref_dir)
+    lat = catalog.field("origins", "latitude", positions).to_numpy(float)
+    lon = catalog.field("origins", "longitude", positions).to_numpy(float)
+    lane_hours = min_transit_hours(geo.lane_km(lat, lon, rule["destination"]))
+    start = ctx.datetime(rule["start"]).reset_index(drop=True)
+    end = ctx.datetime(rule["end"]).reset_index(drop=True)
+    hours = ((end - start) / pd.Timedelta(hours=1)).to_numpy(float)
+    too_soon = int((hours < lane_hours[inverse]).sum())
+    return too_soon == 0, too_soon
+
+
+RULES = {
+    "row_count": _row_count,
+    "equals": _equals,
+    "range": _range,
+    "multiple_of": _multiple_of,
+    "aggregate": _aggregate,
+    "ratio": _ratio,
+    "unique": _unique,
+    "arithmetic_sequence": _arithmetic_sequence,
+    "sorted_equals": _sorted_equals,
+    "window_duration": _window_duration,
+    "start_hour_in": _start_hour_in,
+    "no_overlap": _no_overlap,
+    "day_count": _day_count,
+    "per_day_count": _per_day_count,
+    "per_day_categories": _per_day_categories,
+    "increasing_daily_totals": _increasing_daily_totals,
+    "known_code": _known_code,
+    "matches_reference": _matches_reference,
+    "within_reference": _within_reference,
+    "dock_capacity": _dock_capacity,
+    "within_hours": _within_hours,
+    "transit_time": _transit_time,
+}
+
+# How a rule's outcome is scored:
+#   check      one check for the whole frame
+#   rows       one check per row (or per day)
+#   failures   failures are counted but no checks are
+#   uncounted  a pass or a failure is counted but no check is
+SCORES = ("check", "rows", "failures", "uncounted")
+
+# Rule keys that name dataset columns
+COLUMN_KEYS = (
+    "column",
+    "key",
+    "start",
+    "end",
+    "date_column",
+    "numerator",
+    "denominator",
+)
+
+# Rules file entry applied to every eval
+COMMON_RULES = "*"
+
+
+def _record(results, rule, ok, value):
+    score = rule.get("score", "check")
+    template = rule.get("finding")
+    if score == "rows":
+        describe = None
+        if template:
+            describe = lambda i: template.format(row=ok.index[i], value=value.iloc[i])
+        _check_rows(results, ok, describe)
+    elif score == "failures":
+        failed = int((~_as_bool(ok)).sum())
+        _fail(results, failed, status=rule.get("status", True))
+    elif score == "uncounted" and ok:
+        results["passed"] += 1
+    elif score == "uncounted":
+        _fail(results, status=rule.get("status", True))
+    else:
+        finding = None
+        if template:
+            finding = template.format(actual=value, expected=rule.get("equals"))
+        _check(results, ok, finding)
+
+
+# Chunked validation: each rule keeps a small mergeable state that is updated
+# one batch of rows at a time and finalised into the same (ok, value) its
+# whole-frame function returns, so a dataset never has to be in memory at once
+# and batches can be validated in separate processes and merged.
+
+
+class _RowChecks:
+    """Rules judged row by row: each batch is scored as it arrives."""
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.results = _new_results()
+
+    def update(self, ctx):
+        ok, value = RULES[self.rule["rule"]](ctx, self.rule)
+        _record(self.results, self.rule, ok, value)
+
+    def merge(self, other):
+        _add_results(self.results, other.results)
+
+    def record(self, results):
+        _add_results(results, self.results)
+
+
+def _add_results(results, other):
+    for key in ("checked", "passed", "failed"):
+        results[key] += other[key]
+    results["findings"].extend(other["findings"])
+    if other["status"] != "PASS":
+        results["status"] = other["status"]
+
+
+class _Total:
+    """Rules that count offending rows (reference checks) or rows."""
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.total = 0
+
+    def update(self, ctx):
+        if self.rule["rule"] == "row_count":
+            self.total += len(ctx.df)
         else:
-            results["passed"] += 1
-
-        daily_totals = []
-        for d in days:
-            day_df = df[df["date"] == d]
-            if len(day_df) != 4:
-                results["failed"] += 1
-                results["status"] = "FAIL"
-
-            weights = day_df["totalWeightLbs"].tolist()
-            cats_found = {"L": 0, "M": 0, "H": 0, "S": 0}
-            for w in weights:
-                if 2000 <= w <= 3000:
-                    cats_found["L"] += 1
-                elif 4000 <= w <= 5000:
-                    cats_found["M"] += 1
-                elif 6000 <= w <= 7000:
-                    cats_found["H"] += 1
-                elif 8000 <= w <= 9000:
-                    cats_found["S"] += 1
-
-            if not all(v == 1 for v in cats_found.values()):
-                results["failed"] += 1
-                results["status"] = "FAIL"
-            daily_totals.append(sum(weights))
-
-        results["checked"] += 1
-        if daily_totals != sorted(list(set(daily_totals))):
-            results["failed"] += 1
-            results["status"] = "FAIL"
+            self.total += RULES[self.rule["rule"]](ctx, self.rule)[1]
+
+    def merge(self, other):
+        self.total += other.total
+
+    def finish(self):
+        if self.rule["rule"] == "row_count":
+            return self.total == self.rule["equals"], self.total
+        return self.total == 0, self.total
+
+    def record(self, results):
+        _record(results, self.rule, *self.finish())
+
+
+class _Moments:
+    """Count, exact sum, min/max and Welford mean/variance of a column."""
+
+    def __init__(self, column):
+        self.column = column
+        self.count = 0
+        self.sum = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.nan
+        self.max = np.nan
+
+    def update(self, ctx):
+        col = ctx.column(self.column).dropna()
+        if not len(col):
+            return
+        values = col.to_numpy()
+        if pd.api.types.is_integer_dtype(col):
+            values = values.astype(np.int64)
+        other = _Moments(self.column)
+        other.count = len(values)
+        # Integer sums are kept as Python ints so they stay exact at any size
+        other.sum = values.sum().item()
+        other.mean = other.sum / other.count
+        other.m2 = float(((values - other.mean) ** 2).sum())
+        other.min = values.min().item()
+        other.max = values.max().item()
+        self.merge(other)
+
+    def merge(self, other):
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        # Chan et al.'s pairwise update of the mean and sum of squared deviations
+        self.m2 += other.m2 + delta**2 * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.sum += other.sum
+        self.min = other.min if np.isnan(self.min) else min(self.min, other.min)
+        self.max = other.max if np.isnan(self.max) else max(self.max, other.max)
+
+    def value(self, how):
+        if how == "sum":
+            return self.sum
+        if not self.count:
+            return np.nan
+        if how == "mean":
+            return self.sum / self.count
+        if how == "std":
+            return float(np.sqrt(self.m2 / self.count))
+        return getattr(self, how)
+
+
+class _Aggregate:
+    HOWS = ("sum", "mean", "std", "min", "max")
+
+    def __init__(self, rule):
+        if rule["agg"] not in self.HOWS:
+            raise ValueError(f"Aggregate {rule['agg']!r} cannot be computed in chunks")
+        self.rule = rule
+        self.moments = _Moments(rule["column"])
+
+    def update(self, ctx):
+        self.moments.update(ctx)
+
+    def merge(self, other):
+        self.moments.merge(other.moments)
+
+    def finish(self):
+        actual = self.moments.value(self.rule["agg"])
+        return _near(actual, self.rule), actual
+
+    def record(self, results):
+        _record(results, self.rule, *self.finish())
+
+
+class _Ratio(_Aggregate):
+    def __init__(self, rule):
+        self.rule = rule
+        self.moments = (_Moments(rule["numerator"]), _Moments(rule["denominator"]))
+
+    def update(self, ctx):
+        for moments in self.moments:
+            moments.update(ctx)
+
+    def merge(self, other):
+        for mine, theirs in zip(self.moments, other.moments):
+            mine.merge(theirs)
+
+    def finish(self):
+        num, den = (moments.sum for moments in self.moments)
+        if den == 0:
+            return False, None
+        return _near(num / den, self.rule), num / den
+
+
+class _Distinct(_Aggregate):
+    """Sorted distinct values of a column, for `unique` and `arithmetic_sequence`.
+
+    Exact, since both rules need an exact answer; memory grows with the
+    number of distinct values, not rows. Batches' values are merged lazily,
+    whenever the pending ones outnumber those already merged.
+    """
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.rows = 0
+        self.missing = 0
+        self.values = np.array([])
+        self.pending = []
+
+    def update(self, ctx):
+        col = ctx.column(self.rule["column"])
+        self.rows += len(col)
+        self.missing += int(col.isna().sum())
+        self.pending.append(pd.unique(col.dropna().to_numpy()))
+        self._compact()
+
+    def _compact(self, force=False):
+        if self.pending and (
+            force or sum(len(v) for v in self.pending) > len(self.values)
+        ):
+            self.values = np.unique(np.concatenate([self.values, *self.pending]))
+            self.pending = []
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.missing += other.missing
+        self.pending.extend([other.values, *other.pending])
+        self._compact()
+
+    def finish(self):
+        self._compact(force=True)
+        values = self.values
+        if self.rule["rule"] == "unique":
+            count = len(values) + (self.missing > 0)
+            return count == self.rows, count
+        diffs = np.diff(values)
+        if self.missing:
+            # Missing values sort last and make every diff they touch NaN
+            return self.rows - self.missing <= 1, diffs
+        duplicates = len(values) < self.rows
+        return (
+            len(values) <= 1 or (not duplicates and np.unique(diffs).size <= 1),
+            diffs,
+        )
+
+
+class _Multiset(_Aggregate):
+    """Counts of the expected values (anything else is counted as `other`)."""
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.expected = pd.Series(rule["values"], dtype=float).value_counts()
+        self.counts = pd.Series(0, index=self.expected.index, dtype=np.int64)
+        self.other = 0
+
+    def update(self, ctx):
+        values = pd.Series(_values(ctx, self.rule["column"]))
+        counts = values.value_counts(dropna=False)
+        known = counts.index.isin(self.expected.index)
+        self.counts = self.counts.add(counts[known], fill_value=0).astype(np.int64)
+        self.other += int(counts[~known].sum())
+
+    def merge(self, other):
+        self.counts = self.counts.add(other.counts, fill_value=0).astype(np.int64)
+        self.other += other.other
+
+    def finish(self):
+        counts = self.counts.reindex(self.expected.index)
+        return self.other == 0 and bool((counts == self.expected).all()), counts
+
+
+class _Windows(_Aggregate):
+    """Time windows seen so far, for `no_overlap`.
+
+    Windows that touch (one ends as the next starts) are merged, so memory
+    grows with the gaps between windows rather than the rows. Rows missing
+    either end are ignored, and once an overlap is found nothing more is
+    kept.
+    """
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.overlap = False
+        self.start = np.array([], dtype="datetime64[ns]")
+        self.end = np.array([], dtype="datetime64[ns]")
+
+    def update(self, ctx):
+        start = ctx.datetime(self.rule["start"]).to_numpy(dtype="datetime64[ns]")
+        end = ctx.datetime(self.rule["end"]).to_numpy(dtype="datetime64[ns]")
+        self._add(start, end)
+
+    def _add(self, start, end):
+        if self.overlap:
+            return
+        start = np.concatenate([self.start, start])
+        end = np.concatenate([self.end, end])
+        known = ~(np.isnat(start) | np.isnat(end))
+        start, end = start[known], end[known]
+        order = np.lexsort((end, start))
+        start, end = start[order], end[order]
+        if (end[:-1] > start[1:]).any():
+            self.overlap = True
+            self.start = self.end = np.array([], dtype="datetime64[ns]")
+            return
+        # Keep the first start and last end of each run of touching windows
+        breaks = np.flatnonzero(end[:-1] != start[1:])
+        self.start = start[np.r_[0, breaks + 1]] if len(start) else start
+        self.end = end[np.r_[breaks, len(end) - 1]] if len(end) else end
+
+    def merge(self, other):
+        self.overlap |= other.overlap
+        self._add(other.start, other.end)
+
+    def finish(self):
+        return not self.overlap, None
+
+
+class _Daily(_Aggregate):
+    """Per-day counts, category counts or totals, for the per-day rules.
+
+    Rows without a date are not counted.
+    """
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.table = None
+
+    def update(self, ctx):
+        rule = self.rule
+        day = ctx.day(rule["date_column"])
+        if rule["rule"] == "per_day_categories":
+            col = ctx.column(rule["column"])
+            categories = rule["categories"]
+            category = np.select(
+                [
+                    col.between(lo, hi).fillna(False).to_numpy(bool)
+                    for lo, hi in categories.values()
+                ],
+                list(categories),
+                default="",
+            )
+            table = pd.crosstab(day, pd.Series(category, index=ctx.df.index))
+        elif rule["rule"] == "increasing_daily_totals":
+            table = ctx.daily_sum(rule["date_column"], rule["column"])
+        else:
+            table = day.value_counts()
+        table = table[table.index.notna()]
+        self._add(table)
+
+    def _add(self, table):
+        if self.table is None:
+            self.table = table
+        else:
+            self.table = self.table.add(table, fill_value=0)
+
+    def merge(self, other):
+        if other.table is not None:
+            self._add(other.table)
+
+    def finish(self):
+        rule = self.rule
+        if rule["rule"] == "per_day_categories":
+            table = self.table if self.table is not None else pd.DataFrame()
+            counts = (
+                table.sort_index()
+                .reindex(columns=list(rule["categories"]))
+                # add() leaves a day/category cell blank when neither side has it
+                .fillna(0)
+                .astype(np.int64)
+            )
+            return counts.eq(1).all(axis=1), counts
+        table = self.table if self.table is not None else pd.Series(dtype=np.int64)
+        table = table.sort_index().astype(np.int64)
+        if rule["rule"] == "day_count":
+            return len(table) == rule["equals"], len(table)
+        if rule["rule"] == "per_day_count":
+            return table == rule["equals"], table
+        totals = table.to_numpy()
+        return bool((np.diff(totals) > 0).all()), totals
+
+
+class _DockLoad(_Aggregate):
+    """Windows starting and ending per (location, time), for `dock_capacity`.
+
+    Memory grows with the distinct times windows start or end at each
+    location, not with rows.
+    """
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.events = None
+        self.capacity = pd.Series(dtype=float)
+
+    def update(self, ctx):
+        rule = self.rule
+        capacity = ctx.reference_field(rule["reference"], rule["key"], rule["field"])
+        capacity = capacity.to_numpy(float)
+        start = ctx.datetime(rule["start"]).to_numpy("datetime64[ns]")
+        end = ctx.datetime(rule["end"]).to_numpy("datetime64[ns]")
+        # Unlimited (unknown or missing) locations never conflict
+        keep = ~np.isnan(capacity) & ~np.isnat(start) & ~np.isnat(end) & (end > start)
+        location = ctx.column(rule["key"]).astype("string").to_numpy()[keep]
+        count = len(location)
+        events = (
+            pd.DataFrame(
+                {
+                    "location": np.concatenate([location, location]),
+                    "time": np.concatenate([start[keep], end[keep]]),
+                    "starts": np.repeat([1, 0], count),
+                    "ends": np.repeat([0, 1], count),
+                }
+            )
+            .groupby(["location", "time"])
+            .sum()
+        )
+        capacity = pd.Series(capacity[keep], index=location)
+        self._add(events, capacity[~capacity.index.duplicated()])
+
+    def _add(self, events, capacity):
+        if self.events is None:
+            self.events = events
         else:
-            results["passed"] += 1
-    except Exception as e:
-        results["status"] = "ERROR"
-        results["findings"].append(str(e))
-    return results
+            self.events = self.events.add(events, fill_value=0)
+        self.capacity = self.capacity.combine_first(capacity)
+
+    def merge(self, other):
+        if other.events is not None:
+            self._add(other.events, other.capacity)
+
+    def finish(self):
+        if self.events is None:
+            return True, 0
+        events = self.events.sort_index()
+        location = events.index.get_level_values("location")
+        starts = events["starts"].to_numpy()
+        # Open windows after each instant's ends and then its starts; windows
+        # starting together beyond the capacity are the ones over it
+        after = (
+            pd.Series(starts - events["ends"].to_numpy())
+            .groupby(location.to_numpy())
+            .cumsum()
+            .to_numpy()
+        )
+        capacity = self.capacity.reindex(location).to_numpy()
+        over = int(np.clip(after - capacity, 0, starts).sum())
+        return over == 0, over
+
+
+CHUNKED_RULES = {
+    "row_count": _Total,
+    "equals": _RowChecks,
+    "range": _RowChecks,
+    "multiple_of": _RowChecks,
+    "aggregate": _Aggregate,
+    "ratio": _Ratio,
+    "unique": _Distinct,
+    "arithmetic_sequence": _Distinct,
+    "sorted_equals": _Multiset,
+    "window_duration": _RowChecks,
+    "start_hour_in": _RowChecks,
+    "no_overlap": _Windows,
+    "day_count": _Daily,
+    "per_day_count": _Daily,
+    "per_day_categories": _Daily,
+    "increasing_daily_totals": _Daily,
+    "known_code": _Total,
+    "matches_reference": _Total,
+    "within_reference": _Total,
+    "dock_capacity": _DockLoad,
+    "within_hours": _Total,
+    "transit_time": _Total,
+}
+
+
+class ChunkedValidation:
+    """Running validation state for a dataset read in batches.
+
+    `update(df)` takes the next batch of rows (indexed by their position in
+    the whole dataset, so findings name the same rows); `merge(other)` folds
+    in the state of a later part validated elsewhere, e.g. in another
+    process; `results()` gives what the validator returns for the whole
+    dataset. Memory is bounded by the batch plus each rule's state:
+    distinct values for `unique`/`arithmetic_sequence`, non-touching windows
+    for `no_overlap`, per-day tables for the per-day rules, a few numbers
+    for the rest.
+    """
+
+    def __init__(self, rules, ref_dir=REF_DIR):
+        self.ref_dir = ref_dir
+        self.rules = [CHUNKED_RULES[rule["rule"]](rule) for rule in rules]
+        self.error = None
+
+    def update(self, df):
+        if self.error:
+            return
+        ctx = FrameContext(df, self.ref_dir)
+        try:
+            for state in self.rules:
+                state.update(ctx)
+        except Exception as e:
+            self.error = str(e)
+
+    def merge(self, other):
+        self.error = self.error or other.error
+        for state, later in zip(self.rules, other.rules):
+            state.merge(later)
+        return self
+
+    def results(self):
+        results = _new_results()
+        try:
+            if self.error:
+                raise ValueError(self.error)
+            for state in self.rules:
+                state.record(results)
+        except Exception as e:
+            results["status"] = "ERROR"
+            results["findings"].append(str(e))
+        return results
+
+
+def compile_rules(rules, ref_dir=REF_DIR):
+    """Builds a validator function from a list of rule dicts.
+
+    The validator's `columns` attribute lists the dataset columns the rules use;
+    `version` hashes the rules, the engine source and the reference CSVs
+    in `ref_dir`; `failing_rows(df)`
+    returns the rows that break a row-level rule; `chunked()` starts a
+    `ChunkedValidation` of the same rules.
+    """
+    for rule in rules:
+        if rule.get("rule") not in RULES:
+            raise ValueError(f"Unknown rule: {rule.get('rule')}")
+        if rule.get("score", "check") not in SCORES:
+            raise ValueError(f"Unknown score: {rule.get('score')}")
+    plan = [(RULES[rule["rule"]], rule) for rule in rules]
+    columns = []
+    for rule in rules:
+        for key in COLUMN_KEYS:
+            if key in rule and rule[key] not in columns:
+                columns.append(rule[key])
+
+    def validate(df):
+        results = _new_results()
+        ctx = FrameContext(df, ref_dir)
+        try:
+            for func, rule in plan:
+                ok, value = func(ctx, rule)
+                _record(results, rule, ok, value)
+        except Exception as e:
+            results["status"] = "ERROR"
+            results["findings"].append(str(e))
+        return results
+
+    def failing_rows(df):
+        """Index labels of rows that fail at least one row-level rule."""
+        ctx = FrameContext(df, ref_dir)
+        bad = np.zeros(len(df), dtype=bool)
+        for func, rule in plan:
+            ok, _ = func(ctx, rule)
+            if isinstance(ok, pd.Series) and ok.index.equals(df.index):
+                bad |= ~_as_bool(ok)
+        return df.index[bad]
+
+    # Readers can load just these columns
+    validate.columns = columns
+    validate.failing_rows = failing_rows
+    # For datasets validated batch by batch (see ChunkedValidation)
+    validate.chunked = lambda: ChunkedValidation(rules, ref_dir)
+    validate.version = hashlib.sha256(
+        (
+            ENGINE_VERSION
+            + catalog_fingerprint(ref_dir)
+            + json.dumps(rules, sort_keys=True)
+        ).encode("utf-8")
+    ).hexdigest()
+    return validate
+
+
+def load_rules(path=RULES_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def build_validators(path=RULES_PATH):
+    """Maps each eval ID in the rules file to its compiled validator.
+
+    Rules under COMMON_RULES are appended to every eval's rules. Reference
+    tables are looked up next to the rules file.
+    """
+    rules = load_rules(path)
+    common = rules.pop(COMMON_RULES, [])
+    ref_dir = os.path.dirname(path)
+    return {
+        eval_id: compile_rules(eval_rules + common, ref_dir)
+        for eval_id, eval_rules in rules.items()
+    }
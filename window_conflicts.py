@@ -0,0 +1,227 @@
+import numpy as np
+import pandas as pd
+
+# Scheduling conflicts between time windows that share a location (an
+# origin's dock doors). Windows are half-open [start, end) intervals, so one
+# ending as another starts does not overlap it. Everything is a vectorized
+# sweep over sorted start/end events: no Python loop over windows, so
+# millions of windows take seconds.
+
+HOUR = np.int64(3600 * 10**9)
+DAY = 24 * HOUR
+
+# Opening hours (local hour of day) behind the Origins.csv operating_hours labels
+OPERATING_HOURS = {
+    "24/7": (0, 24),
+    "Extended Hours": (6, 22),
+    "Business Hours": (8, 17),
+}
+
+
+def _nanoseconds(values):
+    values = np.asarray(values, dtype="datetime64[ns]")
+    return values.view(np.int64), ~np.isnat(values)
+
+
+def _group_codes(group, n):
+    """Integer code per window's group (-1 where the group is missing)."""
+    if group is None:
+        return np.zeros(n, dtype=np.int64)
+    codes, _ = pd.factorize(pd.Series(group).reset_index(drop=True))
+    return codes.astype(np.int64)
+
+
+def _windows(start, end, group):
+    """Positions, start/end nanoseconds and group codes of the usable windows.
+
+    A window is usable when it has a start, an end after it and a group.
+    """
+    start, has_start = _nanoseconds(start)
+    end, has_end = _nanoseconds(end)
+    codes = _group_codes(group, len(start))
+    rows = np.flatnonzero(has_start & has_end & (codes >= 0) & (end > start))
+    return rows, start[rows], end[rows], codes[rows], len(start)
+
+
+def _sort_events(codes, times):
+    """Order of events by (group, time), ties in input order; `times` >= 0."""
+    # Times usually lie on a coarse grid (whole minutes or hours). In units of
+    # that grid, group, time and position pack into one unique integer key,
+    # which sorts several times faster than a two-key lexsort
+    unit = np.gcd.reduce(times) or 1
+    span = int(times.max(initial=0) // unit) + 1
+    if (int(codes.max(initial=0)) + 1) * span * len(times) < 2**63:
+        key = (codes * span + times // unit) * len(times) + np.arange(len(times))
+        return np.argsort(key)
+    return np.lexsort((times, codes))
+
+
+def window_loads(start, end, group=None):
+    """Windows open in each window's group as it starts, itself included.
+
+    Windows starting together take their places in row order. Windows with
+    a missing start, end or group, or that do not end after they start,
+    occupy nothing and get a load of 0.
+    """
+    rows, start, end, codes, n = _windows(start, end, group)
+    count = len(rows)
+    # Events sort by (group, time), ends before starts at the same instant
+    # (the low bit); each group's events sum to zero, so one running sum
+    # over all groups restarts at every group
+    times = np.concatenate([start, end])
+    times -= times.min(initial=0)
+    times = times // (np.gcd.reduce(times) or 1) * 2
+    times[:count] += 1
+    order = _sort_events(np.concatenate([codes, codes]), times)
+    is_start = order < count
+    running = np.cumsum(np.where(is_start, 1, -1))
+    loads = np.zeros(n, dtype=np.int64)
+    loads[rows[order[is_start]]] = running[is_start]
+    return loads
+
+
+def _capacity(capacity, n):
+    """Per-window capacity as floats; missing capacity means unlimited."""
+    capacity = np.broadcast_to(np.asarray(capacity, dtype=float), (n,))
+    return np.where(np.isnan(capacity), np.inf, capacity)
+
+
+def over_capacity(start, end, group=None, capacity=1):
+    """Windows that start while all of their group's `capacity` places are taken.
+
+    `capacity` is a number or one value per window (the window's group
+    capacity); NaN means unlimited.
+    """
+    loads = window_loads(start, end, group)
+    return loads > _capacity(capacity, len(loads))
+
+
+def conflict_pairs(start, end, group=None, capacity=1, limit=None, block=1 << 20):
+    """Row positions of the windows each over-capacity window collides with.
+
+    Every window that starts over capacity (see `over_capacity`) is paired
+    with each window of its group already open when it starts: `first`
+    holds a place, `second` is the window that found none. With a capacity
+    of 1 these are all overlapping pairs. Returns a DataFrame with `first`
+    and `second` columns, by group and then `second`'s start; with `limit`,
+    only the first `limit` pairs. Candidates are checked about `block` at a
+    time, so memory stays bounded however overbooked a group is.
+    """
+    over = over_capacity(start, end, group, capacity)
+    rows, start, end, codes, _ = _windows(start, end, group)
+    # Windows sorted by (group, start, row); candidates for a window are the
+    # ones sorted before it that started less than the longest window ago
+    order = _sort_events(codes, start - start.min(initial=0))
+    rows, start, end, codes = rows[order], start[order], end[order], codes[order]
+    times = np.unique(start)
+    keys = codes * (len(times) + 1) + np.searchsorted(times, start)
+    late = np.flatnonzero(over[rows])
+    earliest = start[late] - (end - start).max(initial=0)
+    lo = np.searchsorted(
+        keys,
+        codes[late] * (len(times) + 1) + np.searchsorted(times, earliest, side="right"),
+    )
+    counts = late - lo
+    firsts, seconds, found = [], [], 0
+    bounds = np.searchsorted(np.cumsum(counts), np.arange(block, counts.sum(), block))
+    for part in np.split(np.arange(len(late)), np.unique(bounds)):
+        if limit is not None and found >= limit:
+            break
+        n = counts[part]
+        second = np.repeat(late[part], n)
+        first = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+        first += np.repeat(lo[part], n)
+        # Keep candidates still open when the later window starts
+        keep = end[first] > start[second]
+        firsts.append(rows[first[keep]])
+        seconds.append(rows[second[keep]])
+        found += int(keep.sum())
+    pairs = pd.DataFrame(
+        {
+            "first": np.concatenate(firsts or [np.array([], np.int64)]),
+            "second": np.concatenate(seconds or [np.array([], np.int64)]),
+        }
+    )
+    return pairs if limit is None else pairs.head(limit)
+
+
+def _opening_hours(hours, n):
+    """(open, close) hour arrays for OPERATING_HOURS labels; unknown labels are NaN."""
+    if hours is None:
+        return np.zeros(n), np.full(n, 24.0)
+    # Labels repeat heavily, so each distinct one is looked up once
+    codes, labels = pd.factorize(pd.Series(hours).reset_index(drop=True))
+    known = [OPERATING_HOURS.get(label, (np.nan, np.nan)) for label in labels]
+    table = np.array(known + [(np.nan, np.nan)], dtype=float).reshape(-1, 2)
+    return table[codes, 0], table[codes, 1]
+
+
+def outside_hours(start, end, hours):
+    """Windows that do not fit the opening hours of the day they start.
+
+    `hours` holds an OPERATING_HOURS label per window. Round-the-clock
+    locations never close, so their windows may cross midnight. Windows
+    with a missing time or an unknown label are never outside.
+    """
+    start, has_start = _nanoseconds(start)
+    end, has_end = _nanoseconds(end)
+    opens, closes = _opening_hours(hours, len(start))
+    day = start - start % DAY
+    always = (opens == 0) & (closes == 24)
+    early = (start - day) / HOUR < opens
+    late = (end - day) / HOUR > closes
+    return has_start & has_end & ~always & (early | late)
+
+
+def plan_windows(start, duration_hours, group=None, capacity=1, hours=None):
+    """Start times that keep windows within opening hours and capacity.
+
+    Each day's opening hours (`hours`, as in `outside_hours`; round the
+    clock if None) are cut into back-to-back slots of `duration_hours`, and
+    each window takes a slot at or after its requested `start` that still
+    has a free place for its group, keeping the requested order. Windows
+    without a group only move into opening hours. Returns datetime64[h]
+    start times, NaT where `start` is missing.
+    """
+    start, has_start = _nanoseconds(start)
+    n = len(start)
+    opens, closes = _opening_hours(hours, n)
+    opens = np.nan_to_num(opens, nan=0).astype(np.int64)
+    closes = np.nan_to_num(closes, nan=24).astype(np.int64)
+    per_day = (closes - opens) // duration_hours
+    if (per_day < 1).any():
+        raise ValueError(f"A {duration_hours}-hour window does not fit opening hours")
+    # Requested start rounded up to the next slot, as a slot number
+    hour = -(-start // HOUR)
+    day, slot = np.divmod(hour - opens, 24)
+    slot = -(-slot // duration_hours)
+    # After the last slot of the day: the first one of the next day
+    late = slot >= per_day
+    day, slot = day + late, np.where(late, 0, slot)
+    requested = day * per_day + slot
+    requested = np.where(has_start, requested, 0)
+    codes = np.where(has_start, _group_codes(group, n), -1)
+    capacity = _capacity(capacity, n)
+    capacity = np.where(codes < 0, n, np.minimum(capacity, n)).astype(np.int64)
+    # Each group's windows are dealt round-robin over `capacity` lanes; a lane
+    # holds one window per slot, so a window takes the later of its requested
+    # slot and the slot after its lane's previous window
+    codes = np.where(codes < 0, np.arange(n) + codes.max(initial=0) + 1, codes)
+    order = _sort_events(codes, requested - requested.min(initial=0))
+    sorted_codes = codes[order]
+    first = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    rank = np.arange(n) - np.repeat(first, np.diff(np.r_[first, n]))
+    lane, index = rank % capacity[order], rank // capacity[order]
+    latest = (
+        pd.Series(requested[order] - index)
+        .groupby([sorted_codes, lane])
+        .cummax()
+        .to_numpy()
+    )
+    planned = np.empty(n, dtype=np.int64)
+    planned[order] = latest + index
+    day, slot = np.divmod(planned, per_day)
+    hours_out = day * 24 + opens + slot * duration_hours
+    return np.where(has_start, hours_out, np.datetime64("NaT").view(np.int64)).astype(
+        "datetime64[h]"
+    )